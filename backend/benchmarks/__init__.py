@@ -0,0 +1 @@
+# Benchmarks de carga y latencia del stack (FastAPI → Django). Uso: python -m benchmarks --help
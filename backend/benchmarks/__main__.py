@@ -0,0 +1,150 @@
+"""
+CLI de benchmarks de auth.
+
+    cd backend
+    python -m benchmarks --escenarios login,me,refresh --concurrency 20 --duration 30
+    python -m benchmarks --escenarios registro --rate 10 --duration 20 --output bench.json
+    python -m benchmarks --in-process --escenarios me --baseline bench.json --max-regresion 10
+
+Imprime (o guarda con --output) un JSON con p50/p95/p99 y throughput por paso.
+Con --baseline añade la comparación y con --max-regresion sale con código 1 si algún
+p95 empeora más de ese porcentaje.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from shared.config import get_fastapi_internal_url
+
+from .escenarios import ESCENARIOS, Contexto, _django_orm, login_worker
+from .runner import Medidor, ejecutar_carga
+
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks de carga del módulo auth.")
+    destino = p.add_mutually_exclusive_group()
+    destino.add_argument("--base-url", default=get_fastapi_internal_url(), help="URL de FastAPI (FASTAPI_INTERNAL_URL)")
+    destino.add_argument("--in-process", action="store_true",
+                         help="App FastAPI con Django montado en este proceso (sin red)")
+    p.add_argument("--escenarios", default="login,me,refresh,sesiones",
+                   help=f"Lista separada por comas: {','.join(ESCENARIOS)}")
+    p.add_argument("--concurrency", type=int, default=10, help="Workers (lazo cerrado) o máximo en vuelo (lazo abierto)")
+    p.add_argument("--rate", type=float, default=None, help="Llegadas/s (Poisson). Sin valor: lazo cerrado")
+    p.add_argument("--duration", type=float, default=10.0, help="Segundos por escenario")
+    p.add_argument("--iterations", type=int, default=None, help="Máximo de iteraciones por escenario")
+    p.add_argument("--email", default="demo@safelease.local", help="Usuario para login/me/refresh/sesiones")
+    p.add_argument("--password", default="password")
+    p.add_argument("--seed", type=int, default=None, help="Semilla de las llegadas Poisson")
+    p.add_argument("--output", help="Fichero JSON de salida (por defecto stdout)")
+    p.add_argument("--baseline", help="JSON de una ejecución anterior para comparar")
+    p.add_argument("--max-regresion", type=float, default=None,
+                   help="%% máximo de empeoramiento del p95 respecto a --baseline")
+    return p.parse_args(argv)
+
+
+@asynccontextmanager
+async def _cliente(args):
+    if not args.in_process:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=30.0) as client:
+            yield client
+        return
+    os.environ["FASTAPI_DJANGO_INPROCESS"] = "1"
+    os.environ.setdefault("FASTAPI_RATE_LIMIT", "0")  # mismos email e IP en todas las iteraciones
+    from fastapi_app.main import app
+
+    async with app.router.lifespan_context(app):
+        # El Host llega a Django: tiene que estar en DJANGO_ALLOWED_HOSTS (localhost en .env.example y con DEBUG)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://localhost", timeout=30.0) as client:
+            yield client
+
+
+async def _ejecutar(args) -> dict:
+    nombres = [n.strip() for n in args.escenarios.split(",") if n.strip()]
+    desconocidos = [n for n in nombres if n not in ESCENARIOS]
+    if desconocidos:
+        raise SystemExit(f"Escenarios desconocidos: {', '.join(desconocidos)}")
+    if any(ESCENARIOS[n][2] for n in nombres):
+        _django_orm()
+    reporte = {
+        "meta": {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "objetivo": "in-process" if args.in_process else args.base_url,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "duration": args.duration,
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "escenarios": {},
+    }
+    async with _cliente(args) as client:
+        for nombre in nombres:
+            escenario, necesita_login, _ = ESCENARIOS[nombre]
+            ctx = Contexto(client=client, medidor=Medidor(), email=args.email, password=args.password)
+            if necesita_login:
+                await asyncio.gather(*(login_worker(ctx, w) for w in range(args.concurrency)))
+            inicio = time.perf_counter()
+            cont = await ejecutar_carga(
+                lambda w, ctx=ctx, escenario=escenario: escenario(ctx, w),
+                concurrency=args.concurrency,
+                duracion=args.duration,
+                rate=args.rate,
+                max_iteraciones=args.iterations,
+                seed=args.seed,
+            )
+            duracion = time.perf_counter() - inicio
+            reporte["escenarios"][nombre] = {
+                **cont,
+                "duracion_s": round(duracion, 3),
+                "throughput_it_s": round((cont["iteraciones"] - cont["fallidas"]) / duracion, 2),
+                "pasos": ctx.medidor.resumen(duracion),
+            }
+    return reporte
+
+
+def comparar(actual: dict, base: dict) -> dict:
+    """Cociente actual/base por paso (p50, p95, p99, throughput); >1 en latencia = peor."""
+    comparacion = {}
+    for esc, datos in actual["escenarios"].items():
+        for paso, m in datos["pasos"].items():
+            b = base.get("escenarios", {}).get(esc, {}).get("pasos", {}).get(paso)
+            if not b:
+                continue
+            comparacion[f"{esc}.{paso}"] = {
+                k: round(m[k] / b[k], 3) if b[k] else None
+                for k in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+            }
+    return comparacion
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    reporte = asyncio.run(_ejecutar(args))
+    codigo = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            reporte["vs_baseline"] = comparar(reporte, json.load(f))
+        if args.max_regresion is not None:
+            limite = 1 + args.max_regresion / 100
+            peores = {k: v["p95_ms"] for k, v in reporte["vs_baseline"].items() if v["p95_ms"] and v["p95_ms"] > limite}
+            reporte["regresiones"] = peores
+            codigo = 1 if peores else 0
+    salida = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(salida + "\n")
+    else:
+        print(salida)
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
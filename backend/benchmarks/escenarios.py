@@ -0,0 +1,133 @@
+"""
+Escenarios del módulo 1 (auth) contra la API FastAPI.
+
+Cada escenario es `async def (ctx, worker_id)` y mide sus pasos con `ctx.medidor`.
+`registro` recorre registro → verificar-email → verificar-otp; como el email sale por
+el backend de consola, el token y el OTP se emiten con el backend de tokens de Django sobre la
+misma BD PostgreSQL o la misma cache compartida (AUTH_TOKENS_BACKEND=cache con DJANGO_CACHE_URL)
+y ese acceso no se incluye en las latencias.
+"""
+import asyncio
+import os
+import sys
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+from .runner import Medidor
+
+_DJANGO_DIR = Path(__file__).resolve().parent.parent / "django_app"
+
+PASSWORD_REGISTRO = "Bench-Passw0rd!"
+OTP_BENCH = "246810"
+
+
+@dataclass
+class Contexto:
+    client: httpx.AsyncClient
+    medidor: Medidor
+    email: str
+    password: str
+    tokens: dict = field(default_factory=dict)  # worker_id -> {"access", "refresh"}
+
+
+# --- Acceso directo a la BD (solo fixtures del escenario registro) ---
+
+def _django_orm() -> None:
+    if str(_DJANGO_DIR) not in sys.path:
+        sys.path.insert(0, str(_DJANGO_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_app.settings")
+    import django
+    django.setup()
+
+
+def _token_verificacion(email: str) -> str:
+    """El enlace real solo viaja por email: se emite otro token del mismo backend (bd o cache compartida)."""
+    from datetime import timedelta
+    from core.models import Usuario
+    from core.services.tokens import get_tokens
+    usuario_id = Usuario.objects.por_email(email).values_list("pk", flat=True).get()
+    return get_tokens().crear_token("verificacion", usuario_id, timedelta(hours=1))
+
+
+def _fijar_otp(usuario_id: int, codigo: str) -> None:
+    """El OTP real solo viaja por email: se emite uno conocido (en bd queda junto al pendiente)."""
+    from datetime import timedelta
+    from core.services.tokens import get_tokens
+    get_tokens().crear_otp(usuario_id, codigo, timedelta(minutes=10))
+
+
+# --- Preparación por worker ---
+
+async def login_worker(ctx: Contexto, worker_id: int) -> None:
+    """Obtiene access/refresh para el worker (no se mide)."""
+    r = await ctx.client.post("/api/auth/login/", json={"email": ctx.email, "password": ctx.password})
+    r.raise_for_status()
+    ctx.tokens[worker_id] = r.json()
+
+
+def _auth(ctx: Contexto, worker_id: int) -> dict:
+    return {"Authorization": f"Bearer {ctx.tokens[worker_id]['access']}"}
+
+
+# --- Escenarios ---
+
+async def escenario_login(ctx: Contexto, worker_id: int) -> None:
+    await ctx.medidor.medir(
+        "login", ctx.client.post("/api/auth/login/", json={"email": ctx.email, "password": ctx.password})
+    )
+
+
+async def escenario_refresh(ctx: Contexto, worker_id: int) -> None:
+    # Con ROTATE_REFRESH_TOKENS el refresh usado queda en blacklist: cada worker encadena el nuevo
+    tokens = ctx.tokens[worker_id]
+    r = await ctx.medidor.medir(
+        "token_refresh", ctx.client.post("/api/auth/token/refresh/", json={"refresh": tokens["refresh"]})
+    )
+    data = r.json()
+    tokens["access"] = data["access"]
+    tokens["refresh"] = data.get("refresh", tokens["refresh"])
+
+
+async def escenario_me(ctx: Contexto, worker_id: int) -> None:
+    await ctx.medidor.medir("me", ctx.client.get("/api/auth/me/", headers=_auth(ctx, worker_id)))
+
+
+async def escenario_sesiones(ctx: Contexto, worker_id: int) -> None:
+    await ctx.medidor.medir("sesiones", ctx.client.get("/api/auth/sesiones/", headers=_auth(ctx, worker_id)))
+
+
+async def escenario_registro(ctx: Contexto, worker_id: int) -> None:
+    email = f"bench-{uuid.uuid4().hex[:16]}@bench.local"
+    await ctx.medidor.medir(
+        "registro",
+        ctx.client.post("/api/auth/registro/", json={
+            "email": email,
+            "password": PASSWORD_REGISTRO,
+            "password_confirm": PASSWORD_REGISTRO,
+            "nombre": "Bench",
+            "apellido": f"W{worker_id}",
+            "aceptar_terminos": True,
+        }),
+        esperado=(201,),
+    )
+    token = await asyncio.to_thread(_token_verificacion, email)
+    r = await ctx.medidor.medir("verificar_email", ctx.client.post("/api/auth/verificar-email/", json={"token": token}))
+    usuario_id = r.json()["usuario_id"]
+    await asyncio.to_thread(_fijar_otp, usuario_id, OTP_BENCH)
+    await ctx.medidor.medir(
+        "verificar_otp",
+        ctx.client.post("/api/auth/verificar-otp/", json={"usuario_id": usuario_id, "codigo": OTP_BENCH}),
+    )
+
+
+# nombre -> (escenario, necesita login previo por worker, necesita ORM de Django)
+ESCENARIOS = {
+    "registro": (escenario_registro, False, True),
+    "login": (escenario_login, False, False),
+    "refresh": (escenario_refresh, True, False),
+    "me": (escenario_me, True, False),
+    "sesiones": (escenario_sesiones, True, False),
+}
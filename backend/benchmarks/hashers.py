@@ -0,0 +1,103 @@
+"""
+Benchmark de hashers de contraseña: logins/s por core (una verificación = un login).
+
+    cd backend
+    python -m benchmarks.hashers --duration 5 --procesos 4
+    PASSWORD_ARGON2_MEMORY_COST=65536 python -m benchmarks.hashers --hashers argon2
+
+Cada hasher se mide con los parámetros de settings (PASSWORD_PBKDF2_*, PASSWORD_ARGON2_*):
+primero en un solo proceso y luego con --procesos en paralelo. Mide el throughput del hasher
+en bruto, con un ProcessPoolExecutor propio, no a través del pool de core/hashing.py: es el
+techo de logins/s que ese pool puede dar con PASSWORD_HASH_WORKERS=--procesos (sin la
+serialización ni la cola). Los no instalados (argon2-cffi) se omiten.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .escenarios import _django_orm
+
+HASHERS = {
+    "pbkdf2": "core.hashers.PBKDF2ConfigurablePasswordHasher",
+    "argon2": "core.hashers.Argon2idConfigurablePasswordHasher",
+}
+PASSWORD = "Bench-Passw0rd!"
+
+
+def _hasher(ruta: str):
+    from django.utils.module_loading import import_string
+    return import_string(ruta)()
+
+
+def _verificar_durante(ruta: str, encoded: str, segundos: float) -> int:
+    """En un proceso del pool: verificaciones completadas en `segundos`."""
+    _django_orm()
+    hasher = _hasher(ruta)
+    n, fin = 0, time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        hasher.verify(PASSWORD, encoded)
+        n += 1
+    return n
+
+
+def _parametros(hasher) -> dict:
+    if hasher.algorithm.startswith("pbkdf2"):
+        return {"iterations": hasher.iterations}
+    return {"time_cost": hasher.time_cost, "memory_cost_kib": hasher.memory_cost, "parallelism": hasher.parallelism}
+
+
+def medir(nombre: str, segundos: float, procesos: int) -> dict:
+    hasher = _hasher(HASHERS[nombre])
+    try:
+        encoded = hasher.encode(PASSWORD, hasher.salt())
+    except ValueError as e:  # librería no instalada
+        return {"disponible": False, "motivo": str(e)}
+    uno = _verificar_durante(HASHERS[nombre], encoded, segundos)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=ctx, initializer=_django_orm) as ex:
+        total = sum(ex.map(_verificar_durante, [HASHERS[nombre]] * procesos, [encoded] * procesos,
+                           [segundos] * procesos))
+    cores = min(procesos, os.cpu_count() or procesos)
+    return {
+        "disponible": True,
+        "algoritmo": hasher.algorithm,
+        "parametros": _parametros(hasher),
+        "ms_por_login": round(1000 * segundos / uno, 2) if uno else None,
+        "logins_s_1_proceso": round(uno / segundos, 2),
+        "logins_s_total": round(total / segundos, 2),
+        "logins_s_por_core": round(total / segundos / cores, 2),
+    }
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.hashers", description="Logins/s por core por hasher.")
+    p.add_argument("--hashers", default=",".join(HASHERS), help=f"Lista separada por comas: {','.join(HASHERS)}")
+    p.add_argument("--duration", type=float, default=5.0, help="Segundos por medición")
+    p.add_argument("--procesos", type=int, default=os.cpu_count() or 1, help="Procesos en paralelo (por defecto, nº de cores)")
+    p.add_argument("--output", help="Fichero JSON de salida (por defecto stdout)")
+    args = p.parse_args(argv)
+    nombres = [n.strip() for n in args.hashers.split(",") if n.strip()]
+    desconocidos = [n for n in nombres if n not in HASHERS]
+    if desconocidos:
+        raise SystemExit(f"Hashers desconocidos: {', '.join(desconocidos)}")
+    _django_orm()
+    reporte = {
+        "meta": {"fecha": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "cores": os.cpu_count(), "procesos": args.procesos,
+                 "duration": args.duration},
+        "hashers": {n: medir(n, args.duration, args.procesos) for n in nombres},
+    }
+    salida = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(salida + "\n")
+    else:
+        print(salida)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Generador de carga asyncio y agregación de latencias.
+
+- Lazo cerrado (`rate=None`): `concurrency` workers ejecutan iteraciones seguidas.
+- Lazo abierto (`rate=R`): llegadas Poisson a R iteraciones/s, con `concurrency` como
+  máximo de iteraciones en vuelo (las llegadas que no caben se cuentan como descartadas).
+"""
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional
+
+
+def percentil(valores: list, p: float) -> float:
+    """Percentil con interpolación lineal sobre una lista ya ordenada."""
+    if not valores:
+        return 0.0
+    k = (len(valores) - 1) * p / 100
+    i = int(k)
+    if i + 1 >= len(valores):
+        return valores[-1]
+    return valores[i] + (valores[i + 1] - valores[i]) * (k - i)
+
+
+class Medidor:
+    """Acumula latencias (ms) y errores por paso de escenario."""
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.detalle_errores = defaultdict(lambda: defaultdict(int))
+
+    async def medir(self, paso: str, coro: Awaitable, esperado=(200,)):
+        """Mide `coro` (una petición httpx); status fuera de `esperado` cuenta como error."""
+        inicio = time.perf_counter()
+        try:
+            r = await coro
+        except Exception as e:
+            self.errores[paso] += 1
+            self.detalle_errores[paso][type(e).__name__] += 1
+            raise
+        ms = (time.perf_counter() - inicio) * 1000
+        if r.status_code not in esperado:
+            self.errores[paso] += 1
+            self.detalle_errores[paso][str(r.status_code)] += 1
+            raise ErrorPaso(f"{paso}: HTTP {r.status_code}")
+        self.latencias[paso].append(ms)
+        return r
+
+    def resumen(self, duracion: float) -> dict:
+        pasos = {}
+        for paso in sorted(set(self.latencias) | set(self.errores)):
+            lat = sorted(self.latencias[paso])
+            pasos[paso] = {
+                "ok": len(lat),
+                "errores": self.errores[paso],
+                "detalle_errores": dict(self.detalle_errores[paso]),
+                "throughput_rps": round(len(lat) / duracion, 2) if duracion else 0.0,
+                "media_ms": round(sum(lat) / len(lat), 2) if lat else 0.0,
+                "p50_ms": round(percentil(lat, 50), 2),
+                "p95_ms": round(percentil(lat, 95), 2),
+                "p99_ms": round(percentil(lat, 99), 2),
+                "max_ms": round(lat[-1], 2) if lat else 0.0,
+            }
+        return pasos
+
+
+class ErrorPaso(Exception):
+    pass
+
+
+async def ejecutar_carga(
+    iteracion: Callable[[int], Awaitable],
+    concurrency: int,
+    duracion: float,
+    rate: Optional[float] = None,
+    max_iteraciones: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> dict:
+    """
+    Ejecuta `iteracion(worker_id)` según el modo de carga hasta agotar `duracion`
+    (segundos) o `max_iteraciones`. Devuelve contadores de iteraciones.
+    """
+    fin = time.monotonic() + duracion
+    cont = {"iteraciones": 0, "fallidas": 0, "descartadas": 0}
+
+    async def una(worker_id: int):
+        try:
+            await iteracion(worker_id)
+        except Exception:
+            cont["fallidas"] += 1
+        finally:
+            cont["iteraciones"] += 1
+
+    def quedan() -> bool:
+        lanzadas = cont["iteraciones"] + en_vuelo[0]
+        return time.monotonic() < fin and (max_iteraciones is None or lanzadas < max_iteraciones)
+
+    en_vuelo = [0]
+    if rate is None:
+        async def worker(worker_id: int):
+            while quedan():
+                en_vuelo[0] += 1
+                try:
+                    await una(worker_id)
+                finally:
+                    en_vuelo[0] -= 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        return cont
+
+    rng = random.Random(seed)
+    semaforo = asyncio.Semaphore(concurrency)
+    tareas = set()
+
+    async def lanzar(worker_id: int):
+        try:
+            await una(worker_id)
+        finally:
+            en_vuelo[0] -= 1
+            semaforo.release()
+
+    n = 0
+    while quedan():
+        await asyncio.sleep(rng.expovariate(rate))
+        if semaforo.locked():
+            cont["descartadas"] += 1
+            continue
+        await semaforo.acquire()
+        en_vuelo[0] += 1
+        tarea = asyncio.create_task(lanzar(n % concurrency))
+        tareas.add(tarea)
+        tarea.add_done_callback(tareas.discard)
+        n += 1
+    if tareas:
+        await asyncio.gather(*tareas)
+    return cont
@@ -1,6 +1,7 @@
 from django.contrib import admin
+from django.utils import timezone
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import Rol, Usuario, Perfil, VerificacionEmail, VerificacionOTP, Sesion, TOTP2FA
+from .models import Rol, Usuario, Perfil, VerificacionEmail, VerificacionOTP, Sesion, TOTP2FA, EmailSaliente, Tarea
 
 
 @admin.register(Rol)
@@ -48,3 +49,35 @@ class SesionAdmin(admin.ModelAdmin):
 @admin.register(TOTP2FA)
 class TOTP2FAAdmin(admin.ModelAdmin):
     list_display = ("usuario", "activo", "creado_en")
+
+
+@admin.register(EmailSaliente)
+class EmailSalienteAdmin(admin.ModelAdmin):
+    list_display = ("tipo", "destinatario", "estado", "intentos", "proximo_intento", "creado_en", "enviado_en")
+    list_filter = ("estado", "tipo")
+    search_fields = ("destinatario",)
+    readonly_fields = ("ultimo_error",)
+    actions = ("reintentar",)
+
+    @admin.action(description="Reintentar envío (vuelve a pendiente)")
+    def reintentar(self, request, queryset):
+        n = queryset.exclude(estado=EmailSaliente.ENVIADO).update(
+            estado=EmailSaliente.PENDIENTE, intentos=0, proximo_intento=timezone.now()
+        )
+        self.message_user(request, f"{n} email(s) en cola de nuevo.")
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ("nombre", "estado", "prioridad", "intentos", "ejecutar_en", "creado_en", "terminada_en")
+    list_filter = ("estado", "nombre")
+    search_fields = ("nombre", "clave_unica")
+    readonly_fields = ("ultimo_error",)
+    actions = ("reintentar",)
+
+    @admin.action(description="Reintentar (vuelve a pendiente)")
+    def reintentar(self, request, queryset):
+        n = queryset.filter(estado=Tarea.MUERTA).update(
+            estado=Tarea.PENDIENTE, intentos=0, ejecutar_en=timezone.now()
+        )
+        self.message_user(request, f"{n} tarea(s) en cola de nuevo.")
@@ -5,3 +5,7 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
     verbose_name = "Core (Identidad y Acceso)"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .jobs import tareas  # noqa: F401  (registro de la cola de tareas)
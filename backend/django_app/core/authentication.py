@@ -0,0 +1,50 @@
+"""
+Autenticación DRF: JWTAuthentication de SimpleJWT sin leer core_usuario (snapshot en cache),
+revocación por generación/sesión y actividad de la sesión.
+"""
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from core import revocacion, snapshot
+from core.sesiones import registro_sesiones
+
+
+class JWTSesionAuthentication(JWTAuthentication):
+    """
+    Rechaza access de una generación o sesión revocada (claims `ver` / `sid`), construye
+    request.user desde el snapshot del usuario (core/snapshot.py; AUTH_SNAPSHOT_TTL=0 lo lee
+    de la BD como SimpleJWT) y marca la última actividad de la sesión en el buffer write-behind.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        try:
+            revocacion.comprobar(token.payload)
+        except TokenError as e:
+            raise InvalidToken({"detail": str(e), "code": "token_revoked"})
+        return token
+
+    def get_user(self, validated_token):
+        if not settings.AUTH_SNAPSHOT_TTL or api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        try:
+            usuario_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        user = snapshot.obtener(usuario_id, validated_token.get(revocacion.CLAIM, 0))
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+    def authenticate(self, request):
+        resultado = super().authenticate(request)
+        if resultado is not None:
+            sid = resultado[1].get("sid")
+            if sid:
+                registro_sesiones.tocar(str(sid))
+        return resultado
@@ -0,0 +1,311 @@
+"""
+Blacklist de refresh tokens en memoria para la rotación (ROTATE_REFRESH_TOKENS + BLACKLIST_AFTER_ROTATION).
+
+SimpleJWT, en cada /token/refresh/, consulta BlacklistedToken (JOIN con OutstandingToken) e
+inserta el refresh viejo en la blacklist y el nuevo en OutstandingToken, leyendo el usuario dos
+veces más. Aquí:
+
+- Comprobación: filtro de Bloom por proceso con los jti en blacklist, un filtro por día de
+  expiración (el `exp` del token dice en cuál mirar; los de días pasados se descartan). Un
+  "no está" es definitivo y no toca la BD; un "puede estar" se confirma en el buffer pendiente
+  o en la BD (falsos positivos ≈ BLACKLIST_BLOOM_ERROR).
+- Sincronización entre procesos: un hilo lee las filas nuevas de token_blacklist_blacklistedtoken
+  por id creciente cada BLACKLIST_SYNC_INTERVAL_MS (la carga inicial, solo las no expiradas; hasta
+  completarla se consulta la BD). Para que dos rotaciones simultáneas del mismo refresh en
+  procesos distintos no ganen ambas, el que rota reclama el jti con `cache.add` en la cache
+  compartida (settings exige DJANGO_CACHE_URL o un único proceso). Opcional, BLACKLIST_ROTACION_BD:
+  insertando en el acto su BlacklistedToken, cuyo token_id es único. Solo uno gana en ambos casos.
+- Escrituras: OutstandingToken (login y refresh nuevo) y BlacklistedToken (refresh rotado) se
+  escriben en lote cada BLACKLIST_FLUSH_INTERVAL_MS o BLACKLIST_FLUSH_BATCH registros, con
+  bulk_create(ignore_conflicts). Cota de durabilidad: un intervalo de flush (atexit vacía).
+- BLACKLIST_FILTRO=0: comportamiento de SimpleJWT sin cambios.
+"""
+import atexit
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from core import revocacion
+from django_app.metrics import BLACKLIST_CHECKS, BLACKLIST_PENDIENTES
+
+logger = logging.getLogger(__name__)
+
+_DIA = 86400
+
+
+class Bloom:
+    """Filtro de Bloom de tamaño fijo; k posiciones por doble hash de blake2b."""
+
+    def __init__(self, capacidad: int, error: float):
+        self.m = max(8, int(-capacidad * math.log(error) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / capacidad * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+
+    def _posiciones(self, clave: str):
+        digest = hashlib.blake2b(clave.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.m for i in range(self.k))
+
+    def añadir(self, clave: str) -> None:
+        for p in self._posiciones(clave):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, clave: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._posiciones(clave))
+
+
+class FiltroBlacklist:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filtros: dict = {}        # día de exp -> Bloom
+        self._ultimo_id = 0             # último BlacklistedToken.id sincronizado
+        self._listo = False             # carga inicial completa
+        self._outstanding: dict = {}    # jti -> OutstandingToken sin guardar
+        self._blacklist: set = set()    # jti pendientes de BlacklistedToken
+        self._despertar = threading.Event()
+        self._hilo = None
+
+    # --- API ---
+
+    def contiene(self, jti: str, exp: int) -> bool:
+        """True si el jti está en la blacklist; la BD solo se consulta si el filtro duda."""
+        self._arrancar()
+        if self._listo:
+            with self._lock:
+                filtro = self._filtros.get(exp // _DIA)
+                if filtro is None or jti not in filtro:
+                    BLACKLIST_CHECKS.labels("memoria").inc()
+                    return False
+                if jti in self._blacklist:
+                    BLACKLIST_CHECKS.labels("pendiente").inc()
+                    return True
+        esta = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        BLACKLIST_CHECKS.labels("bd" if esta else ("bd_falso_positivo" if self._listo else "bd_sin_cargar")).inc()
+        return esta
+
+    def revocar(self, jti: str, exp: int, user_id, token: str) -> bool:
+        """Pone el jti en la blacklist; False si otro proceso lo acaba de revocar (rotación repetida)."""
+        expira = datetime_from_epoch(exp)
+        if settings.BLACKLIST_ROTACION_BD:
+            if not self._reclamar_en_bd(jti, expira, user_id, token):
+                return False
+            with self._lock:
+                self._marcar(jti, exp)
+            return True
+        ttl = max(int(exp - time.time()), 1)
+        if not caches[settings.AUTH_TOKENS_CACHE].add(f"blacklist:{jti}", 1, timeout=ttl):
+            return False
+        with self._lock:
+            self._marcar(jti, exp)
+            self._blacklist.add(jti)
+            self._outstanding.setdefault(
+                jti, OutstandingToken(jti=jti, user_id=user_id, token=token, created_at=timezone.now(), expires_at=expira)
+            )
+        self._encolado()
+        return True
+
+    def emitir(self, jti: str, exp: int, user_id, token: str) -> None:
+        """Registra un refresh nuevo en OutstandingToken (en el próximo flush)."""
+        self._arrancar()  # la carga inicial empieza con el login, antes del primer refresh
+        with self._lock:
+            self._outstanding[jti] = OutstandingToken(
+                jti=jti, user_id=user_id, token=token, created_at=timezone.now(), expires_at=datetime_from_epoch(exp)
+            )
+        self._encolado()
+
+    def flush(self) -> None:
+        with self._lock:
+            outstanding, self._outstanding = self._outstanding, {}
+            blacklist, self._blacklist = self._blacklist, set()
+        if not outstanding and not blacklist:
+            return
+        try:
+            close_old_connections()
+            try:
+                self._guardar(list(outstanding.values()), blacklist)
+            except IntegrityError:
+                # Usuario borrado con tokens pendientes: OutstandingToken.user admite NULL (como SimpleJWT)
+                existentes = set(
+                    get_user_model().objects.filter(pk__in={o.user_id for o in outstanding.values()})
+                    .values_list("pk", flat=True)
+                )
+                for fila in outstanding.values():
+                    if fila.user_id is not None and int(fila.user_id) not in existentes:
+                        fila.user_id = None
+                self._guardar(list(outstanding.values()), blacklist)
+        except Exception:
+            logger.exception("blacklist: flush fallido (%d outstanding, %d blacklist)", len(outstanding), len(blacklist))
+            with self._lock:
+                for jti, fila in outstanding.items():
+                    self._outstanding.setdefault(jti, fila)
+                self._blacklist |= blacklist
+        finally:
+            BLACKLIST_PENDIENTES.set(self.pendientes())
+
+    def esperar_carga(self, timeout: float = 10.0) -> bool:
+        """Arranca la sincronización y espera la carga inicial (tests, arranque de workers)."""
+        self._arrancar()
+        limite = time.monotonic() + timeout
+        while not self._listo and time.monotonic() < limite:
+            time.sleep(0.05)
+        return self._listo
+
+    def pendientes(self) -> int:
+        return len(self._outstanding) + len(self._blacklist)
+
+    # --- Interno ---
+
+    @staticmethod
+    def _reclamar_en_bd(jti: str, expira, user_id, token: str) -> bool:
+        """INSERT del BlacklistedToken (y su OutstandingToken si aún está en un buffer); True si lo insertó este."""
+        outstanding = OutstandingToken._meta.db_table
+        blacklisted = BlacklistedToken._meta.db_table
+        ahora = timezone.now()
+        fila = [jti, user_id, token, ahora, expira]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == "postgresql":
+                    cursor.execute(
+                        f"WITH o AS (INSERT INTO {outstanding} (jti, user_id, token, created_at, expires_at) "
+                        f"VALUES (%s, %s, %s, %s, %s) ON CONFLICT (jti) DO UPDATE SET jti = EXCLUDED.jti RETURNING id) "
+                        f"INSERT INTO {blacklisted} (token_id, blacklisted_at) SELECT id, %s FROM o "
+                        f"ON CONFLICT (token_id) DO NOTHING RETURNING id",
+                        [*fila, ahora],
+                    )
+                    return cursor.fetchone() is not None
+                with transaction.atomic():
+                    cursor.execute(
+                        f"INSERT INTO {outstanding} (jti, user_id, token, created_at, expires_at) "
+                        f"VALUES (%s, %s, %s, %s, %s) ON CONFLICT (jti) DO NOTHING",
+                        fila,
+                    )
+                    cursor.execute(
+                        f"INSERT INTO {blacklisted} (token_id, blacklisted_at) SELECT id, %s FROM {outstanding} "
+                        f"WHERE jti = %s ON CONFLICT (token_id) DO NOTHING RETURNING id",
+                        [ahora, jti],
+                    )
+                    return cursor.fetchone() is not None
+        except IntegrityError:  # usuario borrado: el refresh ya no sirve
+            return False
+
+    @staticmethod
+    def _guardar(outstanding: list, blacklist: set) -> None:
+        with transaction.atomic():
+            OutstandingToken.objects.bulk_create(outstanding, ignore_conflicts=True)
+            if blacklist:
+                ids = OutstandingToken.objects.filter(jti__in=blacklist).values_list("id", flat=True)
+                BlacklistedToken.objects.bulk_create([BlacklistedToken(token_id=i) for i in ids], ignore_conflicts=True)
+
+    def _marcar(self, jti: str, exp: int) -> None:
+        dia = exp // _DIA
+        filtro = self._filtros.get(dia)
+        if filtro is None:
+            filtro = self._filtros[dia] = Bloom(settings.BLACKLIST_BLOOM_CAPACIDAD, settings.BLACKLIST_BLOOM_ERROR)
+        filtro.añadir(jti)
+
+    def _sincronizar(self) -> None:
+        """Añade al filtro las filas de BlacklistedToken posteriores a la última vista."""
+        ahora = timezone.now()
+        while True:
+            filas = list(
+                BlacklistedToken.objects.filter(id__gt=self._ultimo_id, token__expires_at__gt=ahora)
+                .order_by("id")
+                .values_list("id", "token__jti", "token__expires_at")[:5000]
+            )
+            with self._lock:
+                for id_, jti, expira in filas:
+                    self._marcar(jti, int(expira.timestamp()))
+                if filas:
+                    self._ultimo_id = filas[-1][0]
+                hoy = int(time.time()) // _DIA
+                for dia in [d for d in self._filtros if d < hoy]:
+                    del self._filtros[dia]
+            if len(filas) < 5000:
+                self._listo = True
+                return
+
+    def _encolado(self) -> None:
+        pendientes = self.pendientes()
+        BLACKLIST_PENDIENTES.set(pendientes)
+        if pendientes >= settings.BLACKLIST_FLUSH_BATCH:
+            self._despertar.set()
+
+    def _arrancar(self) -> None:
+        if self._hilo is None or not self._hilo.is_alive():
+            with self._lock:
+                if self._hilo is None or not self._hilo.is_alive():
+                    self._hilo = threading.Thread(target=self._bucle, name="blacklist-sync", daemon=True)
+                    self._hilo.start()
+
+    def _bucle(self) -> None:
+        flush = settings.BLACKLIST_FLUSH_INTERVAL_MS / 1000
+        sync = settings.BLACKLIST_SYNC_INTERVAL_MS / 1000
+        proxima_sync = 0.0
+        while True:
+            try:
+                if time.monotonic() >= proxima_sync:
+                    close_old_connections()
+                    self._sincronizar()
+                    proxima_sync = time.monotonic() + sync
+                self.flush()
+            except Exception:
+                logger.exception("blacklist: error sincronizando")
+            self._despertar.wait(min(flush, sync))
+            self._despertar.clear()
+
+
+filtro_blacklist = FiltroBlacklist()
+atexit.register(filtro_blacklist.flush)
+
+
+class RefreshTokenRotativo(RefreshToken):
+    """
+    RefreshToken de SimpleJWT con la blacklist en memoria y escrituras en lote (BLACKLIST_FILTRO);
+    además rechaza los de una generación o sesión revocada (core/revocacion.py).
+    """
+
+    def verify(self) -> None:
+        super().verify()
+        revocacion.comprobar(self.payload, sid_en_bd=True)
+
+    def check_blacklist(self) -> None:
+        if not settings.BLACKLIST_FILTRO:
+            return super().check_blacklist()
+        if filtro_blacklist.contiene(self.payload[api_settings.JTI_CLAIM], self.payload["exp"]):
+            raise TokenError("Token is blacklisted")
+
+    def blacklist(self):
+        if not settings.BLACKLIST_FILTRO:
+            return super().blacklist()
+        p = self.payload
+        if not filtro_blacklist.revocar(p[api_settings.JTI_CLAIM], p["exp"], p.get(api_settings.USER_ID_CLAIM), str(self)):
+            raise TokenError("Token is blacklisted")
+        return None
+
+    def outstand(self):
+        if not settings.BLACKLIST_FILTRO:
+            return super().outstand()
+        p = self.payload
+        filtro_blacklist.emitir(p[api_settings.JTI_CLAIM], p["exp"], p.get(api_settings.USER_ID_CLAIM), str(self))
+        return None
+
+    @classmethod
+    def for_user(cls, user):
+        if not settings.BLACKLIST_FILTRO:
+            return super().for_user(user)
+        token = super(BlacklistMixin, cls).for_user(user)  # sin el INSERT inmediato de BlacklistMixin
+        token.outstand()
+        return token
@@ -0,0 +1,18 @@
+"""
+Hashers de contraseña con parámetros ajustables por settings (PASSWORD_PBKDF2_*, PASSWORD_ARGON2_*).
+Al cambiar un parámetro, `must_update` marca los hashes antiguos y se re-hashean en el siguiente login.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class PBKDF2ConfigurablePasswordHasher(PBKDF2PasswordHasher):
+    iterations = getattr(settings, "PASSWORD_PBKDF2_ITERATIONS", PBKDF2PasswordHasher.iterations)
+
+
+class Argon2idConfigurablePasswordHasher(Argon2PasswordHasher):
+    """Argon2id (requiere argon2-cffi)."""
+
+    time_cost = getattr(settings, "PASSWORD_ARGON2_TIME_COST", Argon2PasswordHasher.time_cost)
+    memory_cost = getattr(settings, "PASSWORD_ARGON2_MEMORY_COST", Argon2PasswordHasher.memory_cost)
+    parallelism = getattr(settings, "PASSWORD_ARGON2_PARALLELISM", Argon2PasswordHasher.parallelism)
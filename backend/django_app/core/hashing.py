@@ -0,0 +1,110 @@
+"""
+Hash y verificación de contraseñas en un pool de procesos acotado.
+
+PBKDF2/Argon2 son CPU puro: en el hilo de la petición bloquean el GIL y un worker solo atiende
+unos pocos logins por segundo. Aquí se envían a PASSWORD_HASH_WORKERS procesos; como mucho
+esa cantidad de hashes en curso por proceso Django, y si no hay hueco en
+PASSWORD_HASH_QUEUE_TIMEOUT s se responde 503 (HashingSaturado) en vez de encolar sin límite.
+Con PASSWORD_HASH_WORKERS=0 se hashea en el propio hilo (tests, scripts).
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, is_password_usable, make_password
+from rest_framework.exceptions import APIException
+
+from django_app.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_REJECTED
+
+_lock = threading.Lock()
+_executor = None
+_semaforo = None
+
+
+class HashingSaturado(APIException):
+    status_code = 503
+    default_detail = "Servicio saturado; reintenta en unos segundos."
+    default_code = "hashing_saturado"
+    wait = 1  # DRF lo envía como Retry-After
+
+
+def _iniciar_worker() -> None:
+    import django
+    django.setup()
+
+
+def _pool():
+    global _executor, _semaforo
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                workers = settings.PASSWORD_HASH_WORKERS
+                _semaforo = threading.BoundedSemaphore(workers)
+                # spawn: hacer fork de un proceso con hilos (runserver, ASGI) puede dejar locks tomados
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_iniciar_worker,
+                )
+    return _executor, _semaforo
+
+
+def cerrar_pool() -> None:
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _necesita_rehash(encoded: str) -> bool:
+    """Mismo criterio que django.contrib.auth.hashers.check_password."""
+    preferido = get_hasher("default")
+    hasher = identify_hasher(encoded)
+    return hasher.algorithm != preferido.algorithm or preferido.must_update(encoded)
+
+
+def _verificar(raw_password: str, encoded: str):
+    if not check_password(raw_password, encoded):
+        return False, None
+    return True, make_password(raw_password) if _necesita_rehash(encoded) else None
+
+
+def _ejecutar(operacion: str, fn, *args):
+    inicio = time.perf_counter()
+    try:
+        if not settings.PASSWORD_HASH_WORKERS:
+            return fn(*args)
+        executor, semaforo = _pool()
+        if not semaforo.acquire(timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT):
+            PASSWORD_HASH_REJECTED.labels(operacion).inc()
+            raise HashingSaturado()
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            cerrar_pool()  # un worker murió (OOM...): el siguiente intento crea un pool nuevo
+            raise
+        finally:
+            semaforo.release()
+    finally:
+        PASSWORD_HASH_DURATION.labels(operacion).observe(time.perf_counter() - inicio)
+
+
+def hacer_password(raw_password: str) -> str:
+    """make_password en el pool."""
+    if raw_password is None:
+        return make_password(None)  # contraseña inutilizable: no hay hash que calcular
+    return _ejecutar("hash", make_password, raw_password)
+
+
+def verificar_password(raw_password: str, encoded: str):
+    """
+    (ok, nuevo_hash): nuevo_hash no es None si la contraseña es correcta pero el hash usa otro
+    algoritmo o parámetros distintos de los actuales y hay que guardarlo re-hasheado.
+    """
+    if raw_password is None or not is_password_usable(encoded):
+        return False, None
+    return _ejecutar("verificar", _verificar, raw_password, encoded)
@@ -1,6 +1,8 @@
 """
 Jobs de autenticación: envío de emails (verificación, OTP, restablecer password).
-En desarrollo se usa backend consola; luego se puede conectar Celery/SendGrid.
+Los emails pasan por el outbox transaccional (outbox.py) y se envían tras el commit.
+Tareas asíncronas y periódicas: cola en BD (cola.py, registro en tareas.py) con
+`python manage.py procesar_tareas`, sin broker.
 """
 from .email import enviar_email_verificacion, enviar_otp_por_email, enviar_email_restablecer_password
 
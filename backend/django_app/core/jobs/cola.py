@@ -0,0 +1,273 @@
+"""
+Cola de tareas sobre la BD (core_tarea), sin broker.
+
+- Registro: `@tarea("nombre", prioridad=0, max_intentos=5, cron=None)` sobre una función que
+  recibe kwargs serializables en JSON; `encolar_tarea("nombre", {...})` la inserta en la
+  transacción del llamante (si hay rollback, no se ejecuta).
+- Reclamo: SELECT ... FOR UPDATE SKIP LOCKED en una transacción corta, por prioridad y luego
+  antigüedad, con lease de TAREAS_LEASE s; la función corre fuera de la transacción. Si el
+  worker muere, la tarea se reintenta al vencer el lease.
+- Fallos: backoff exponencial con jitter (TAREAS_BACKOFF_BASE · 2ⁿ⁻¹, tope 1 h); tras
+  max_intentos queda `muerta` con el último error.
+- Deduplicación: `clave_unica` con índice único parcial sobre las activas; encolar una clave
+  que ya está pendiente o en curso no hace nada.
+- Periódicas: `cron="*/5 * * * *"` (minuto hora día mes día-semana). Todos los workers evalúan
+  la franja del minuto y solo el que gana el UPDATE de core_tarea_periodica la encola.
+- Workers: `python manage.py procesar_tareas --hilos N [--procesos M]`.
+"""
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from django_app.metrics import TAREAS_COLA, TAREAS_DURACION, TAREAS_ESPERA
+
+logger = logging.getLogger(__name__)
+
+_TICK_PROGRAMADOR = 15  # s; varias pasadas por minuto, la franja se reclama una sola vez
+
+
+class Cron:
+    """
+    Expresión cron de 5 campos: `*`, `*/n`, `a`, `a/n` (de a al máximo), `a-b`, `a-b/n` y listas con
+    comas. Día de la semana 0-7, con domingo = 0 o 7.
+    """
+
+    _RANGOS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expresion: str):
+        campos = expresion.split()
+        if len(campos) != 5:
+            raise ValueError(f"Cron inválido (5 campos): {expresion!r}")
+        self.expresion = expresion
+        self.minutos, self.horas, self.dias, self.meses, self.dias_semana = (
+            self._parsear(campo, *rango) for campo, rango in zip(campos, self._RANGOS)
+        )
+        if 7 in self.dias_semana:
+            self.dias_semana = (self.dias_semana - {7}) | {0}
+        # Como cron: si se restringen día del mes y día de la semana, basta con uno de los dos; un
+        # campo que empieza por `*` (también `*/n`) no cuenta como restringido
+        self._dia_o_semana = not campos[2].startswith("*") and not campos[4].startswith("*")
+
+    @staticmethod
+    def _parsear(campo: str, minimo: int, maximo: int) -> frozenset:
+        valores = set()
+        for parte in campo.split(","):
+            rango, _, paso = parte.partition("/")
+            if rango == "*":
+                inicio, fin = minimo, maximo
+            elif "-" in rango:
+                inicio, fin = (int(x) for x in rango.split("-"))
+            else:
+                inicio = int(rango)
+                fin = maximo if paso else inicio  # como en cron: 5/10 = 5, 15, 25...
+            if not minimo <= inicio <= fin <= maximo:
+                raise ValueError(f"Cron: {parte!r} fuera de {minimo}-{maximo}")
+            if int(paso or 1) < 1:
+                raise ValueError(f"Cron: paso inválido en {parte!r}")
+            valores.update(range(inicio, fin + 1, int(paso or 1)))
+        return frozenset(valores)
+
+    def coincide(self, momento: datetime) -> bool:
+        if momento.minute not in self.minutos or momento.hour not in self.horas or momento.month not in self.meses:
+            return False
+        dia = momento.day in self.dias
+        semana = (momento.weekday() + 1) % 7 in self.dias_semana  # cron: 0 = domingo
+        return (dia or semana) if self._dia_o_semana else (dia and semana)
+
+
+@dataclass
+class Definicion:
+    nombre: str
+    funcion: Callable
+    prioridad: int = 0
+    max_intentos: int = 5
+    cron: Optional[Cron] = None
+
+
+REGISTRO: dict = {}
+
+
+def tarea(nombre: str, *, prioridad: int = 0, max_intentos: int = 5, cron: Optional[str] = None):
+    """Registra la función como tarea `nombre` (y periódica si se pasa `cron`)."""
+
+    def registrar(funcion):
+        REGISTRO[nombre] = Definicion(nombre, funcion, prioridad, max_intentos, Cron(cron) if cron else None)
+        return funcion
+
+    return registrar
+
+
+def encolar_tarea(
+    nombre: str,
+    kwargs: Optional[dict] = None,
+    *,
+    prioridad: Optional[int] = None,
+    retraso: float = 0,
+    clave_unica: Optional[str] = None,
+):
+    """Inserta la tarea; con `clave_unica` ya activa devuelve None sin encolar."""
+    from core.models import Tarea
+
+    definicion = REGISTRO[nombre]
+    tarea_ = Tarea(
+        nombre=nombre,
+        kwargs=kwargs or {},
+        prioridad=definicion.prioridad if prioridad is None else prioridad,
+        max_intentos=definicion.max_intentos,
+        ejecutar_en=timezone.now() + timedelta(seconds=retraso),
+        clave_unica=clave_unica,
+    )
+    if clave_unica is None:
+        tarea_.save()
+        return tarea_
+    try:
+        with transaction.atomic():  # savepoint: el conflicto no aborta la transacción del llamante
+            tarea_.save()
+    except IntegrityError:
+        return None
+    return tarea_
+
+
+def backoff(intentos: int) -> float:
+    espera = min(settings.TAREAS_BACKOFF_BASE * 2 ** max(intentos - 1, 0), 3600)
+    return espera * random.uniform(0.8, 1.2)
+
+
+def reclamar(limite: int) -> list:
+    """Toma hasta `limite` tareas vencidas (pendientes o con lease vencido) y les pone lease."""
+    from core.models import Tarea
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        filas = list(
+            Tarea.objects.select_for_update(skip_locked=True)
+            .filter(estado__in=Tarea.ACTIVAS, ejecutar_en__lte=ahora, nombre__in=list(REGISTRO))
+            .order_by("-prioridad", "ejecutar_en")
+            .values_list("id", "ejecutar_en")[:limite]
+        )
+        if not filas:
+            return []
+        ids = [id_ for id_, _ in filas]
+        Tarea.objects.filter(id__in=ids).update(
+            estado=Tarea.EN_CURSO,
+            intentos=F("intentos") + 1,
+            ejecutar_en=ahora + timedelta(seconds=settings.TAREAS_LEASE),
+            iniciada_en=ahora,
+        )
+    vencimientos = dict(filas)  # en orden de prioridad
+    por_id = Tarea.objects.in_bulk(ids)
+    tareas = [por_id[id_] for id_ in ids]
+    for t in tareas:
+        TAREAS_ESPERA.labels(t.nombre).observe(max((ahora - vencimientos[t.id]).total_seconds(), 0))
+    return tareas
+
+
+def ejecutar(tarea_) -> bool:
+    """Corre la tarea reclamada y registra el resultado; True si terminó bien."""
+    from core.models import Tarea
+
+    inicio = time.perf_counter()
+    try:
+        if tarea_.intentos > tarea_.max_intentos:
+            raise RuntimeError("lease vencido sin terminar en todos los intentos")
+        REGISTRO[tarea_.nombre].funcion(**tarea_.kwargs)
+    except Exception as e:
+        TAREAS_DURACION.labels(tarea_.nombre, "error").observe(time.perf_counter() - inicio)
+        detalle = f"{type(e).__name__}: {e}"[:2000]
+        if tarea_.intentos >= tarea_.max_intentos:
+            logger.error("tareas: %s #%s muerta tras %d intentos: %s", tarea_.nombre, tarea_.pk, tarea_.intentos, detalle)
+            cambios = {"estado": Tarea.MUERTA, "terminada_en": timezone.now()}
+        else:
+            logger.warning("tareas: fallo en %s #%s (intento %d): %s", tarea_.nombre, tarea_.pk, tarea_.intentos, detalle)
+            cambios = {"estado": Tarea.PENDIENTE, "ejecutar_en": timezone.now() + timedelta(seconds=backoff(tarea_.intentos))}
+        Tarea.objects.filter(pk=tarea_.pk).update(ultimo_error=detalle, **cambios)
+        return False
+    TAREAS_DURACION.labels(tarea_.nombre, "ok").observe(time.perf_counter() - inicio)
+    Tarea.objects.filter(pk=tarea_.pk).update(estado=Tarea.HECHA, terminada_en=timezone.now(), ultimo_error="")
+    return True
+
+
+def programar(ahora: Optional[datetime] = None) -> int:
+    """Encola las periódicas cuyo cron coincide con el minuto actual; devuelve cuántas encoló."""
+    from core.models import TareaPeriodica
+
+    franja = (ahora or timezone.now()).replace(second=0, microsecond=0)
+    local = timezone.localtime(franja)
+    encoladas = 0
+    for definicion in REGISTRO.values():
+        if definicion.cron is None or not definicion.cron.coincide(local):
+            continue
+        TareaPeriodica.objects.get_or_create(nombre=definicion.nombre)
+        ganada = TareaPeriodica.objects.filter(
+            Q(ultima_franja__lt=franja) | Q(ultima_franja__isnull=True), nombre=definicion.nombre
+        ).update(ultima_franja=franja)
+        # La clave evita apilar ejecuciones si la anterior sigue pendiente o en curso
+        if ganada and encolar_tarea(definicion.nombre, clave_unica=f"cron:{definicion.nombre}"):
+            encoladas += 1
+    return encoladas
+
+
+def medir_cola() -> None:
+    from core.models import Tarea
+
+    por_estado = {
+        fila["estado"]: fila["n"]
+        for fila in Tarea.objects.filter(estado__in=Tarea.ACTIVAS).values("estado").annotate(n=Count("id"))
+    }
+    for estado in Tarea.ACTIVAS:
+        TAREAS_COLA.labels(estado).set(por_estado.get(estado, 0))
+
+
+class Worker:
+    """`hilos` hilos que reclaman y ejecutan tareas, más un hilo que encola las periódicas y mide la cola."""
+
+    def __init__(self, hilos: int, parar=None):
+        self.hilos = hilos
+        self.parar = parar or threading.Event()
+
+    def ejecutar(self) -> None:
+        hilos = [threading.Thread(target=self._bucle, name=f"tareas-{i}", daemon=True) for i in range(self.hilos)]
+        hilos.append(threading.Thread(target=self._programador, name="tareas-cron", daemon=True))
+        for hilo in hilos:
+            hilo.start()
+        try:
+            while any(h.is_alive() for h in hilos):
+                for hilo in hilos:
+                    hilo.join(timeout=1)
+        except KeyboardInterrupt:
+            self.parar.set()  # cada hilo termina la tarea en curso y sale
+            for hilo in hilos:
+                hilo.join()
+
+    def _bucle(self) -> None:
+        while not self.parar.is_set():
+            try:
+                close_old_connections()
+                tareas = reclamar(1)
+                for t in tareas:
+                    ejecutar(t)
+            except Exception:
+                logger.exception("tareas: error en el worker")
+                tareas = []
+            if not tareas:
+                self.parar.wait(settings.TAREAS_POLL_INTERVAL)
+
+    def _programador(self) -> None:
+        while not self.parar.is_set():
+            try:
+                close_old_connections()
+                programar()
+                medir_cola()
+            except Exception:
+                logger.exception("tareas: error en el programador")
+            self.parar.wait(_TICK_PROGRAMADOR)
+
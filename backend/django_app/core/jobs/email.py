@@ -1,11 +1,13 @@
 """
-Envío de emails: verificación de cuenta, OTP, restablecer contraseña.
-Automáticamente usa EMAIL_BACKEND de Django (consola en dev, SMTP en prod).
+Emails de autenticación: verificación de cuenta, OTP, restablecer contraseña.
+Se encolan en el outbox (core/jobs/outbox.py) dentro de la transacción del llamante y se
+envían tras el commit con EMAIL_BACKEND de Django (consola en dev, SMTP en prod).
 """
-from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib.auth import get_user_model
 
+from .outbox import encolar
+
 User = get_user_model()
 
 
@@ -17,8 +19,8 @@ def _nombre_usuario(usuario: User) -> str:
     return usuario.email
 
 
-def enviar_email_verificacion(usuario: User, token: str) -> int:
-    """Envía email con link de verificación (link incluye token)."""
+def enviar_email_verificacion(usuario: User, token: str):
+    """Encola email con link de verificación (link incluye token)."""
     url = f"{getattr(settings, 'FRONTEND_VERIFY_EMAIL_URL', 'http://localhost:5173/verificar-email')}?cr={token}"
     asunto = "Verifica tu correo — SafeLease"
     mensaje = f"""
@@ -33,17 +35,11 @@ Si no has solicitado este correo, puedes ignorarlo.
 Saludos,
 SafeLease
 """
-    return send_mail(
-        asunto,
-        mensaje.strip(),
-        getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@safelease.local"),
-        [usuario.email],
-        fail_silently=False,
-    )
+    return encolar("verificacion", usuario.email, asunto, mensaje.strip())
 
 
-def enviar_otp_por_email(usuario: User, codigo: str) -> int:
-    """Envía código OTP de 6 dígitos por email."""
+def enviar_otp_por_email(usuario: User, codigo: str):
+    """Encola código OTP de 6 dígitos por email."""
     asunto = "Código de verificación (6 dígitos) — SafeLease"
     mensaje = f"""
 Hola {_nombre_usuario(usuario)}:
@@ -51,22 +47,16 @@ Hola {_nombre_usuario(usuario)}:
 Tu código de verificación es: {codigo}
 
 Ingresa estos 6 dígitos en la plataforma para completar la validación.
-El código expira en 10 minutos.
+El código expira en {settings.OTP_TTL_MINUTOS} minutos.
 
 Saludos,
 SafeLease
 """
-    return send_mail(
-        asunto,
-        mensaje.strip(),
-        getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@safelease.local"),
-        [usuario.email],
-        fail_silently=False,
-    )
+    return encolar("otp", usuario.email, asunto, mensaje.strip())
 
 
-def enviar_email_restablecer_password(usuario: User, token: str) -> int:
-    """Envía email con link para restablecer contraseña."""
+def enviar_email_restablecer_password(usuario: User, token: str):
+    """Encola email con link para restablecer contraseña."""
     url = f"{getattr(settings, 'FRONTEND_RESET_PASSWORD_URL', 'http://localhost:5173/restablecer-password')}?token={token}"
     asunto = "Restablecer contraseña — SafeLease"
     mensaje = f"""
@@ -81,10 +71,4 @@ Si no has solicitado este correo, ignóralo.
 Saludos,
 SafeLease
 """
-    return send_mail(
-        asunto,
-        mensaje.strip(),
-        getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@safelease.local"),
-        [usuario.email],
-        fail_silently=False,
-    )
+    return encolar("restablecer", usuario.email, asunto, mensaje.strip())
@@ -0,0 +1,155 @@
+"""
+Outbox transaccional de emails (core_email_saliente).
+
+- `encolar` inserta el email en la transacción en curso: si el caso de uso hace rollback, el
+  email no existe; si confirma, se despacha después del commit. El SMTP nunca corre dentro
+  de la transacción de la petición.
+- Despacho: `reclamar` toma un lote de pendientes vencidos con SELECT ... FOR UPDATE SKIP LOCKED
+  en una transacción corta y les pone un lease (EMAIL_OUTBOX_LEASE s); el envío va fuera de la
+  transacción. Si el proceso muere a mitad, al vencer el lease otro worker lo reintenta.
+- Fallos: reintento con backoff exponencial con jitter; tras EMAIL_OUTBOX_MAX_INTENTOS pasa a
+  `muerto` (dead-letter) con el último error, para revisarlo en el admin.
+- Envío: pool de conexiones SMTP persistentes, en lote y con ritmo por dominio (smtp.py).
+- Workers: hilos en el propio proceso Django (EMAIL_OUTBOX_WORKERS) que se despiertan al hacer
+  commit y, además, `python manage.py procesar_outbox` como proceso aparte.
+"""
+import logging
+import random
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .smtp import get_motor
+
+logger = logging.getLogger(__name__)
+
+
+def encolar(tipo: str, destinatario: str, asunto: str, cuerpo: str):
+    """Inserta el email en el outbox (transacción del llamante) y avisa al despachador tras el commit."""
+    from core.models import EmailSaliente
+
+    email = EmailSaliente.objects.create(
+        tipo=tipo,
+        destinatario=destinatario,
+        remitente=getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@safelease.local"),
+        asunto=asunto,
+        cuerpo=cuerpo,
+    )
+    transaction.on_commit(despachador.avisar)
+    return email
+
+
+def backoff(intentos: int) -> float:
+    """Segundos hasta el siguiente intento: base·2^(n-1), tope 1 h, jitter ±20 %."""
+    espera = min(settings.EMAIL_OUTBOX_BACKOFF_BASE * 2 ** max(intentos - 1, 0), 3600)
+    return espera * random.uniform(0.8, 1.2)
+
+
+def reclamar(limite: int) -> list:
+    """Toma hasta `limite` emails vencidos y les pone lease; devuelve las instancias."""
+    from core.models import EmailSaliente
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EmailSaliente.objects.select_for_update(skip_locked=True)
+            .filter(estado=EmailSaliente.PENDIENTE, proximo_intento__lte=ahora)
+            .order_by("proximo_intento")
+            .values_list("id", flat=True)[:limite]
+        )
+        if not ids:
+            return []
+        EmailSaliente.objects.filter(id__in=ids).update(
+            intentos=F("intentos") + 1,
+            proximo_intento=ahora + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE),
+        )
+    return list(EmailSaliente.objects.filter(id__in=ids))
+
+
+def entregar(emails: list) -> None:
+    """Envía el lote con el motor SMTP (core/jobs/smtp.py) y registra cada resultado."""
+    for resultado in get_motor().enviar(emails):
+        if resultado.aplazar:
+            aplazar(resultado.email, resultado.aplazar)
+        elif resultado.error is not None:
+            registrar_fallo(resultado.email, resultado.error)
+        else:
+            registrar_envio(resultado.email)
+
+
+def aplazar(email, segundos: float) -> None:
+    """Límite de ritmo del dominio: vuelve a la cola sin gastar intento."""
+    type(email).objects.filter(pk=email.pk).update(
+        intentos=F("intentos") - 1, proximo_intento=timezone.now() + timedelta(seconds=segundos)
+    )
+
+
+def registrar_envio(email) -> None:
+    type(email).objects.filter(pk=email.pk).update(
+        estado=email.ENVIADO, enviado_en=timezone.now(), cuerpo="", ultimo_error=""
+    )
+
+
+def registrar_fallo(email, error: Exception) -> None:
+    detalle = f"{type(error).__name__}: {error}"[:2000]
+    if email.intentos >= settings.EMAIL_OUTBOX_MAX_INTENTOS:
+        logger.error("outbox: email %s a dead-letter tras %d intentos: %s", email.pk, email.intentos, detalle)
+        type(email).objects.filter(pk=email.pk).update(estado=email.MUERTO, ultimo_error=detalle)
+        return
+    logger.warning("outbox: fallo enviando email %s (intento %d): %s", email.pk, email.intentos, detalle)
+    type(email).objects.filter(pk=email.pk).update(
+        proximo_intento=timezone.now() + timedelta(seconds=backoff(email.intentos)), ultimo_error=detalle
+    )
+
+
+def procesar_lote(limite: int = None) -> int:
+    """Reclama y entrega un lote; devuelve cuántos se procesaron."""
+    emails = reclamar(limite or settings.EMAIL_OUTBOX_BATCH)
+    if emails:
+        entregar(emails)
+    return len(emails)
+
+
+class Despachador:
+    """Hilos que vacían el outbox: al recibir `avisar()` (commit) y cada EMAIL_OUTBOX_POLL_INTERVAL s."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilos: list = []
+
+    def avisar(self) -> None:
+        if settings.EMAIL_OUTBOX_WORKERS <= 0:
+            return  # solo `manage.py procesar_outbox`
+        self._arrancar()
+        self.despertar()
+
+    def despertar(self) -> None:
+        self._despertar.set()
+
+    def _arrancar(self) -> None:
+        with self._lock:
+            self._hilos = [h for h in self._hilos if h.is_alive()]
+            for i in range(len(self._hilos), settings.EMAIL_OUTBOX_WORKERS):
+                hilo = threading.Thread(target=self.bucle, name=f"outbox-{i}", daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+
+    def bucle(self, parar: threading.Event = None) -> None:
+        while parar is None or not parar.is_set():
+            self._despertar.clear()
+            try:
+                close_old_connections()
+                # Vaciar mientras haya trabajo; con lotes llenos seguir sin esperar
+                while procesar_lote() >= settings.EMAIL_OUTBOX_BATCH:
+                    pass
+            except Exception:
+                logger.exception("outbox: error en el despachador")
+            self._despertar.wait(settings.EMAIL_OUTBOX_POLL_INTERVAL)
+
+
+despachador = Despachador()
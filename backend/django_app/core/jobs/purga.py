@@ -0,0 +1,117 @@
+"""
+Purga por lotes de filas caducadas: tokens de verificación y OTP, sesiones inactivas y revocadas, refresh
+de SimpleJWT (outstanding + blacklisted) e histórico del outbox y de la cola de tareas.
+
+Cada lote es una transacción corta: se eligen hasta PURGA_LOTE ids por el índice de la columna
+de caducidad en orden (columna, id), con FOR UPDATE SKIP LOCKED en PostgreSQL para no esperar
+filas que otra petición tenga bloqueadas, y se borran por id. Entre lotes, PURGA_PAUSA_MS para
+no acaparar E/S ni replicación. El cursor (último valor, último id) avanza aunque se salten
+filas bloqueadas. Las filas dependientes (BlacklistedToken) se borran en el mismo lote.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from django_app.metrics import PURGA_DURACION, PURGA_FILAS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Purga:
+    nombre: str                     # tabla, para el informe y las métricas
+    modelo: str                     # "app.Modelo"
+    campo: str                      # columna de caducidad (indexada)
+    filtro: Callable[[], Q]         # filas a borrar, evaluado al empezar la pasada
+
+
+def _horas(n: float):
+    return timezone.now() - timedelta(hours=n)
+
+
+PURGAS = [
+    Purga(
+        "core_verificacion_email", "core.VerificacionEmail", "expira_en",
+        lambda: Q(expira_en__lt=_horas(settings.PURGA_RETENCION_HORAS)),
+    ),
+    Purga(
+        "core_verificacion_otp", "core.VerificacionOTP", "expira_en",
+        lambda: Q(expira_en__lt=_horas(settings.PURGA_RETENCION_HORAS)),
+    ),
+    # Sin actividad durante la vida de un refresh: ya no puede renovarse
+    Purga(
+        "core_sesion", "core.Sesion", "ultima_actividad",
+        lambda: Q(ultima_actividad__lt=timezone.now() - settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"]),
+    ),
+    Purga(
+        "core_sesion_revocada", "core.SesionRevocada", "expira_en",
+        lambda: Q(expira_en__lt=timezone.now()),
+    ),
+    Purga(
+        "token_blacklist_outstandingtoken", "token_blacklist.OutstandingToken", "expires_at",
+        lambda: Q(expires_at__lt=timezone.now()),
+    ),
+    Purga(
+        "core_email_saliente", "core.EmailSaliente", "creado_en",
+        lambda: Q(estado__in=["enviado", "muerto"], creado_en__lt=_horas(24 * settings.PURGA_RETENCION_HISTORICO_DIAS)),
+    ),
+    Purga(
+        "core_tarea", "core.Tarea", "terminada_en",
+        lambda: Q(estado__in=["hecha", "muerta"], terminada_en__lt=_horas(24 * settings.PURGA_RETENCION_HISTORICO_DIAS)),
+    ),
+]
+
+
+def purgar_tabla(purga: Purga, lote: int, pausa: float) -> dict:
+    """Borra en lotes las filas de `purga`; devuelve filas borradas por tabla (incluye cascadas)."""
+    Modelo = apps.get_model(purga.modelo)
+    filtro = purga.filtro()
+    cursor: Optional[tuple] = None
+    borradas: dict = {}
+    while True:
+        with transaction.atomic():
+            qs = Modelo.objects.filter(filtro)
+            if cursor is not None:
+                valor, pk = cursor
+                qs = qs.filter(Q(**{f"{purga.campo}__gt": valor}) | Q(**{purga.campo: valor, "pk__gt": pk}))
+            if connection.vendor == "postgresql":
+                qs = qs.select_for_update(skip_locked=True, of=("self",))
+            filas = list(qs.order_by(purga.campo, "pk").values_list(purga.campo, "pk")[:lote])
+            if not filas:
+                return borradas
+            _, por_modelo = Modelo.objects.filter(pk__in=[pk for _, pk in filas]).delete()
+        for etiqueta, n in por_modelo.items():
+            tabla = apps.get_model(etiqueta)._meta.db_table
+            borradas[tabla] = borradas.get(tabla, 0) + n
+            PURGA_FILAS.labels(tabla).inc(n)
+        cursor = filas[-1]
+        if len(filas) < lote:
+            return borradas
+        time.sleep(pausa)
+
+
+def purgar(tablas: Optional[list] = None, lote: Optional[int] = None, pausa_ms: Optional[int] = None) -> dict:
+    """Pasa todas las purgas (o las de `tablas`); devuelve {tabla: filas borradas}."""
+    lote = lote or settings.PURGA_LOTE
+    pausa = (settings.PURGA_PAUSA_MS if pausa_ms is None else pausa_ms) / 1000
+    informe: dict = {}
+    for purga in PURGAS:
+        if tablas and purga.nombre not in tablas:
+            continue
+        inicio = time.perf_counter()
+        try:
+            for tabla, n in purgar_tabla(purga, lote, pausa).items():
+                informe[tabla] = informe.get(tabla, 0) + n
+        finally:
+            PURGA_DURACION.labels(purga.nombre).observe(time.perf_counter() - inicio)
+        informe.setdefault(purga.nombre, 0)
+    logger.info("purga: %s", ", ".join(f"{tabla}={n}" for tabla, n in informe.items()))
+    return informe
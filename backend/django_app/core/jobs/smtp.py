@@ -0,0 +1,195 @@
+"""
+Motor de envío de emails del outbox: conexiones SMTP persistentes en pool, envío en lote por
+conexión y límite de ritmo por dominio del destinatario.
+
+- Pool: hasta EMAIL_SMTP_POOL_SIZE conexiones (backends de EMAIL_BACKEND abiertos) reutilizadas
+  entre lotes; una conexión ociosa más de EMAIL_SMTP_IDLE_TIMEOUT s se reabre (los servidores
+  cortan las inactivas) y si el servidor la cierra a mitad se reabre una vez y se reintenta.
+- Lote: cada conexión envía hasta EMAIL_SMTP_BATCH mensajes seguidos, sin reconectar;
+  el resultado se registra por mensaje.
+- Ritmo por dominio: token bucket de EMAIL_THROTTLE_POR_DOMINIO mensajes/s (con overrides en
+  EMAIL_THROTTLE_DOMINIOS="gmail.com=20,outlook.com=5"); lo que no entra se aplaza sin
+  contar como intento.
+"""
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from django_app.metrics import EMAIL_FAILURES, EMAIL_SEND_DURATION, EMAIL_SMTP_CONNECTIONS, EMAIL_THROTTLED
+
+# Errores tras los que la conexión no sirve: se reabre y se reintenta el mensaje una vez
+_ERRORES_CONEXION = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+def parsear_ritmos(texto: str) -> dict:
+    """`"gmail.com=20,outlook.com=5"` -> {"gmail.com": 20.0, "outlook.com": 5.0}."""
+    ritmos = {}
+    for parte in (texto or "").split(","):
+        dominio, _, ritmo = parte.strip().partition("=")
+        if dominio and ritmo:
+            ritmos[dominio.lower()] = float(ritmo)
+    return ritmos
+
+
+class LimitadorDominios:
+    """Token bucket por dominio (ráfaga = 1 s de ritmo)."""
+
+    def __init__(self, por_defecto: float, por_dominio: Optional[dict] = None):
+        self.por_defecto = por_defecto
+        self.por_dominio = por_dominio or {}
+        self._lock = threading.Lock()
+        self._cubos: dict = {}  # dominio -> [tokens, último relleno]
+
+    def reservar(self, dominio: str) -> float:
+        """0 si el mensaje puede salir ya; si no, segundos hasta que haya token (no lo consume)."""
+        ritmo = self.por_dominio.get(dominio, self.por_defecto)
+        if ritmo <= 0:
+            return 0.0
+        ahora = time.monotonic()
+        with self._lock:
+            tokens, ultimo = self._cubos.get(dominio, (ritmo, ahora))
+            tokens = min(ritmo, tokens + (ahora - ultimo) * ritmo)
+            if tokens >= 1:
+                self._cubos[dominio] = (tokens - 1, ahora)
+                return 0.0
+            self._cubos[dominio] = (tokens, ahora)
+            return (1 - tokens) / ritmo
+
+
+class _Conexion:
+    def __init__(self):
+        self.backend = get_connection(fail_silently=False)
+        self.abierta = False
+        self.ultimo_uso = 0.0
+
+    def abrir(self) -> None:
+        if self.abierta and time.monotonic() - self.ultimo_uso > settings.EMAIL_SMTP_IDLE_TIMEOUT:
+            self.cerrar()
+        if not self.abierta:
+            self.backend.open()
+            self.abierta = True
+            EMAIL_SMTP_CONNECTIONS.inc()
+
+    def cerrar(self) -> None:
+        if self.abierta:
+            try:
+                self.backend.close()
+            except Exception:
+                pass
+            self.abierta = False
+            EMAIL_SMTP_CONNECTIONS.dec()
+
+    def enviar(self, mensaje: EmailMessage) -> None:
+        self.abrir()
+        try:
+            self.backend.send_messages([mensaje])
+        except _ERRORES_CONEXION:
+            self.cerrar()
+            self.abrir()
+            self.backend.send_messages([mensaje])
+        finally:
+            self.ultimo_uso = time.monotonic()
+
+
+class PoolSMTP:
+    def __init__(self, tamaño: int):
+        self._libres: queue.LifoQueue = queue.LifoQueue()  # LIFO: la más reciente sigue viva
+        self._semaforo = threading.BoundedSemaphore(tamaño)
+
+    @contextmanager
+    def conexion(self):
+        self._semaforo.acquire()
+        try:
+            try:
+                con = self._libres.get_nowait()
+            except queue.Empty:
+                con = _Conexion()
+            try:
+                yield con
+            except Exception:
+                con.cerrar()
+                raise
+            self._libres.put(con)
+        finally:
+            self._semaforo.release()
+
+    def cerrar(self) -> None:
+        while True:
+            try:
+                self._libres.get_nowait().cerrar()
+            except queue.Empty:
+                return
+
+
+@dataclass
+class Resultado:
+    email: object                 # EmailSaliente
+    error: Optional[Exception] = None
+    aplazar: float = 0.0          # > 0: no se intentó por el límite del dominio
+
+
+class MotorEmail:
+    def __init__(self):
+        self.pool = PoolSMTP(settings.EMAIL_SMTP_POOL_SIZE)
+        self.limitador = LimitadorDominios(
+            settings.EMAIL_THROTTLE_POR_DOMINIO, parsear_ritmos(settings.EMAIL_THROTTLE_DOMINIOS)
+        )
+
+    def enviar(self, emails: list) -> list:
+        """Envía los EmailSaliente admitidos por el limitador en lotes por conexión; un Resultado por email."""
+        resultados, admitidos = [], []
+        for email in emails:
+            espera = self.limitador.reservar(email.destinatario.rpartition("@")[2].lower())
+            if espera:
+                EMAIL_THROTTLED.inc()
+                resultados.append(Resultado(email, aplazar=espera))
+            else:
+                admitidos.append(email)
+        for i in range(0, len(admitidos), settings.EMAIL_SMTP_BATCH):
+            resultados += self._enviar_lote(admitidos[i:i + settings.EMAIL_SMTP_BATCH])
+        return resultados
+
+    def _enviar_lote(self, lote: list) -> list:
+        resultados = []
+        try:
+            with self.pool.conexion() as con:
+                for email in lote:
+                    mensaje = EmailMessage(email.asunto, email.cuerpo, email.remitente, [email.destinatario])
+                    inicio = time.perf_counter()
+                    try:
+                        con.enviar(mensaje)
+                    except _ERRORES_CONEXION:
+                        raise  # la conexión no se recupera: el resto del lote falla igual
+                    except Exception as e:  # rechazo del mensaje (destinatario inválido...)
+                        EMAIL_SEND_DURATION.labels("error").observe(time.perf_counter() - inicio)
+                        EMAIL_FAILURES.labels("mensaje").inc()
+                        resultados.append(Resultado(email, error=e))
+                    else:
+                        EMAIL_SEND_DURATION.labels("ok").observe(time.perf_counter() - inicio)
+                        resultados.append(Resultado(email))
+        except Exception as e:  # conexión imposible: todo lo no intentado del lote, como fallo
+            hechos = {id(r.email) for r in resultados}
+            pendientes = [email for email in lote if id(email) not in hechos]
+            EMAIL_FAILURES.labels("conexion").inc(len(pendientes))
+            resultados += [Resultado(email, error=e) for email in pendientes]
+        return resultados
+
+
+_motor = None
+_motor_lock = threading.Lock()
+
+
+def get_motor() -> MotorEmail:
+    global _motor
+    if _motor is None:
+        with _motor_lock:
+            if _motor is None:
+                _motor = MotorEmail()
+    return _motor
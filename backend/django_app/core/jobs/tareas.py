@@ -0,0 +1,19 @@
+"""
+Tareas registradas en la cola (core/jobs/cola.py). Se importan en CoreConfig.ready.
+"""
+from .cola import tarea
+from .outbox import procesar_lote
+from .purga import purgar
+
+
+@tarea("emails.outbox", prioridad=10, max_intentos=3, cron="* * * * *")
+def vaciar_outbox():
+    """Red de seguridad del outbox: envía lo pendiente aunque no haya hilos de envío en los web."""
+    while procesar_lote():
+        pass
+
+
+@tarea("mantenimiento.purga", prioridad=-10, max_intentos=3, cron="15 * * * *")
+def purga_periodica(tablas: list = None):
+    """Tokens, OTP, sesiones y refresh caducados, e histórico del outbox y de la cola (purga.py)."""
+    purgar(tablas)
@@ -0,0 +1,41 @@
+"""
+Despachador del outbox de emails como proceso aparte (core/jobs/outbox.py).
+Uso: python manage.py procesar_outbox [--workers 4] [--una-vez]
+Con EMAIL_OUTBOX_WORKERS=0 en los procesos web, este comando es el único que envía.
+"""
+import threading
+
+from django.core.management.base import BaseCommand
+
+from core.jobs.outbox import despachador, procesar_lote
+
+
+class Command(BaseCommand):
+    help = "Envía los emails pendientes del outbox (reintentos con backoff, dead-letter)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="Hilos de envío")
+        parser.add_argument("--una-vez", action="store_true", help="Vaciar lo pendiente y salir")
+
+    def handle(self, *args, **options):
+        if options["una_vez"]:
+            total = 0
+            while n := procesar_lote():
+                total += n
+            self.stdout.write(self.style.SUCCESS(f"Procesados: {total}"))
+            return
+        parar = threading.Event()
+        hilos = [
+            threading.Thread(target=despachador.bucle, args=(parar,), name=f"outbox-{i}", daemon=True)
+            for i in range(options["workers"])
+        ]
+        for hilo in hilos:
+            hilo.start()
+        self.stdout.write(f"Outbox: {len(hilos)} workers (Ctrl+C para salir)")
+        try:
+            while any(h.is_alive() for h in hilos):
+                for hilo in hilos:
+                    hilo.join(timeout=1)
+        except KeyboardInterrupt:
+            parar.set()
+            despachador.despertar()
@@ -0,0 +1,73 @@
+"""
+Worker de la cola de tareas en BD (core/jobs/cola.py).
+Uso: python manage.py procesar_tareas [--hilos 4] [--procesos 2] [--metrics-port 9101] [--una-vez]
+--procesos N arranca N procesos (spawn) con --hilos hilos cada uno: para tareas de CPU.
+"""
+import multiprocessing
+import os
+
+from django.core.management.base import BaseCommand
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess, start_http_server
+
+
+def proceso_worker(hilos: int, parar) -> None:
+    """Destino de cada proceso con --procesos N (spawn: configura Django antes de importar core.jobs)."""
+    import django
+
+    django.setup()
+    from core.jobs.cola import Worker
+
+    Worker(hilos, parar).ejecutar()
+
+
+class Command(BaseCommand):
+    help = "Ejecuta las tareas de core_tarea (prioridades, reintentos con backoff, periódicas)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=4, help="Hilos por proceso")
+        parser.add_argument("--procesos", type=int, default=1, help="Procesos worker")
+        parser.add_argument("--metrics-port", type=int, default=0, help="Servir /metrics de Prometheus en este puerto")
+        parser.add_argument("--una-vez", action="store_true", help="Encolar periódicas, vaciar lo vencido y salir")
+
+    def handle(self, *args, **options):
+        from core.jobs.cola import REGISTRO, Worker, ejecutar, medir_cola, programar, reclamar
+
+        if options["una_vez"]:
+            programar()
+            total = 0
+            while tareas := reclamar(options["hilos"]):
+                for t in tareas:
+                    ejecutar(t)
+                total += len(tareas)
+            medir_cola()
+            self.stdout.write(self.style.SUCCESS(f"Ejecutadas: {total}"))
+            return
+        if options["metrics_port"]:
+            # Con --procesos > 1 hace falta PROMETHEUS_MULTIPROC_DIR para agregar los procesos
+            registry = REGISTRY
+            if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+                registry = CollectorRegistry()
+                multiprocess.MultiProcessCollector(registry)
+            start_http_server(options["metrics_port"], registry=registry)
+        self.stdout.write(
+            f"Tareas: {options['procesos']}×{options['hilos']} workers, "
+            f"{len(REGISTRO)} registradas (Ctrl+C para salir)"
+        )
+        if options["procesos"] <= 1:
+            Worker(options["hilos"]).ejecutar()
+            return
+        contexto = multiprocessing.get_context("spawn")
+        parar = contexto.Event()
+        procesos = [
+            contexto.Process(target=proceso_worker, args=(options["hilos"], parar), name=f"tareas-p{i}")
+            for i in range(options["procesos"])
+        ]
+        for proceso in procesos:
+            proceso.start()
+        try:
+            for proceso in procesos:
+                proceso.join()
+        except KeyboardInterrupt:
+            parar.set()
+            for proceso in procesos:
+                proceso.join()
@@ -0,0 +1,25 @@
+"""
+Purga por lotes de filas caducadas (core/jobs/purga.py).
+Uso: python manage.py purgar [--tabla core_sesion ...] [--lote 500] [--pausa-ms 100]
+Sustituye a `flushexpiredtokens` de SimpleJWT (un único DELETE sobre toda la tabla).
+"""
+from django.core.management.base import BaseCommand
+
+from core.jobs.purga import PURGAS, purgar
+
+
+class Command(BaseCommand):
+    help = "Borra tokens, OTP, sesiones y refresh caducados, e histórico del outbox y de la cola, en lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tabla", action="append", choices=[p.nombre for p in PURGAS], help="Solo estas tablas (repetible)"
+        )
+        parser.add_argument("--lote", type=int, default=None, help="Filas por lote (PURGA_LOTE)")
+        parser.add_argument("--pausa-ms", type=int, default=None, help="Pausa entre lotes (PURGA_PAUSA_MS)")
+
+    def handle(self, *args, **options):
+        informe = purgar(options["tabla"], options["lote"], options["pausa_ms"])
+        for tabla, n in informe.items():
+            self.stdout.write(f"{tabla}: {n}")
+        self.stdout.write(self.style.SUCCESS(f"Total: {sum(informe.values())}"))
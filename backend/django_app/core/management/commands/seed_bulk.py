@@ -0,0 +1,285 @@
+"""
+Datos sintéticos en volumen para pruebas de carga: Usuario, Perfil, VerificacionEmail, Sesion,
+TOTP2FA y sus códigos de respaldo, con distribuciones realistas.
+Uso: python manage.py seed_bulk --usuarios 1000000 [--chunk 5000] [--workers 8] [--seed 1] [--borrar]
+Ejecutar después de: python manage.py migrate && python manage.py seed_auth (roles)
+
+- Determinista: con los mismos --seed, --usuarios, --chunk y --hasta se generan las mismas filas
+  (un random.Random por chunk; las sales de los hashes también salen de la semilla).
+- Contraseñas: --passwords distintas, `Bulk-<seed>-<i>`; el usuario k usa la k % passwords. Cada
+  una se hashea una sola vez (en paralelo) y todas las filas reutilizan su hash.
+- Carga: chunks de --chunk usuarios repartidos en --workers procesos (spawn, como core/hashing.py),
+  cada chunk en su transacción: COPY en PostgreSQL, INSERT multi-fila en el resto (bulk_create
+  pisaría date_joined / creado_en con auto_now_add). En SQLite los workers solo generan y escribe
+  el proceso principal (un solo escritor). --workers 0: todo en este proceso.
+- Los ids de Usuario y TOTP2FA se asignan aquí, a partir del máximo actual, para que las filas
+  hijas no tengan que consultarlos: ejecutar con la BD sin tráfico. Al terminar se reajustan las
+  secuencias (PostgreSQL).
+
+Emails `u<seed>-<k>@bulk.invalid`; --borrar elimina antes los de ejecuciones anteriores.
+"""
+import base64
+import math
+import multiprocessing
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, ProgrammingError, connection, transaction
+from django.db.models import Max
+
+from core.models import CodigoRespaldo2FA, Perfil, Rol, Sesion, TOTP2FA, Usuario, VerificacionEmail, email_duplicado
+from core.services.tokens import hash_codigo
+
+DOMINIO = "bulk.invalid"
+DIAS_HISTORIA = 730
+
+# Distribuciones: (valor, peso)
+ROLES = (("viewer", 80), ("owner", 18), ("admin", 2))
+SESIONES = ((0, 35), (1, 35), (2, 15), (3, 8), (4, 5), (5, 2))
+P_ACTIVO = 0.97
+P_EMAIL_VERIFICADO = 0.90
+P_TELEFONO_VERIFICADO = 0.40
+P_SIN_LOGIN = 0.15
+P_TELEFONO = 0.60
+P_TELEFONO_ALTERNATIVO = 0.10
+P_2FA = 0.08
+P_DEVICE_ID = 0.70
+
+NOMBRES = (
+    "Sofía", "Martina", "Isidora", "Florencia", "Catalina", "Valentina", "Josefa", "Antonia", "Agustina",
+    "Mateo", "Agustín", "Benjamín", "Vicente", "Tomás", "Joaquín", "Maximiliano", "Cristóbal", "Matías",
+)
+APELLIDOS = (
+    "González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva", "Martínez", "Sepúlveda",
+    "Morales", "Rodríguez", "López", "Fuentes", "Hernández", "Torres", "Araya", "Flores", "Espinoza", "Valenzuela",
+)
+USER_AGENTS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.6 Safari/605.1.15",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
+    "Mozilla/5.0 (Linux; Android 14; SM-A546E) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:131.0) Gecko/20100101 Firefox/131.0",
+)
+
+# Columnas por tabla, en orden de carga (las FK apuntan a tablas anteriores)
+COLUMNAS = {
+    Usuario: (
+        "id", "password", "last_login", "is_superuser", "email", "is_staff", "is_active", "date_joined",
+        "rol_id", "verified_email", "verified_phone", "email_hash", "phone_hash", "version_tokens",
+    ),
+    Perfil: ("usuario_id", "nombre", "apellido", "telefono", "telefono_alternativo", "avatar", "creado_en", "actualizado_en"),
+    VerificacionEmail: ("usuario_id", "token", "expira_en", "usado_en"),
+    Sesion: ("usuario_id", "device_id", "ip", "user_agent", "refresh_token_jti", "ultima_actividad", "creado_en"),
+    TOTP2FA: ("id", "usuario_id", "secret_cifrado", "backup_codes_cifrado", "activo", "creado_en"),
+    CodigoRespaldo2FA: ("totp_id", "codigo_hash"),
+}
+
+
+def password_bulk(seed: int, i: int) -> str:
+    return f"Bulk-{seed}-{i}"
+
+
+def _hashear(args: tuple) -> str:
+    seed, i = args
+    # Sal derivada de la semilla: mismos hashes en cada ejecución. 24 caracteres (>= 128 bits, lo que
+    # exige must_update): más corta, el primer login de cada usuario re-hashearía y falsearía la medición
+    return make_password(password_bulk(seed, i), salt=f"bulk{seed:010d}{i:010d}")
+
+
+def _entre(rng: random.Random, desde: datetime, hasta: datetime) -> datetime:
+    return desde + timedelta(seconds=rng.random() * max((hasta - desde).total_seconds(), 0))
+
+
+def _generar(tarea: dict) -> dict:
+    """Filas del chunk [inicio, fin) por modelo, como tuplas en el orden de COLUMNAS."""
+    rng = random.Random(f"{tarea['seed']}-{tarea['inicio']}")
+    hasta = tarea["hasta"]
+    origen = hasta - timedelta(days=DIAS_HISTORIA)
+    hashes = tarea["hashes"]
+    rol_ids, rol_pesos = zip(*tarea["roles"])
+    n_sesiones, pesos_sesiones = zip(*SESIONES)
+    filas = {modelo: [] for modelo in COLUMNAS}
+
+    for k in range(tarea["inicio"], tarea["fin"]):
+        uid = tarea["base_usuario"] + k
+        # Altas crecientes en el tiempo: densidad lineal hacia `hasta`
+        alta = origen + timedelta(days=math.sqrt(rng.random()) * DIAS_HISTORIA)
+        activo = rng.random() < P_ACTIVO
+        verificado = rng.random() < P_EMAIL_VERIFICADO
+        ultimo_login = None if not verificado or rng.random() < P_SIN_LOGIN else _entre(rng, alta, hasta)
+        filas[Usuario].append((
+            uid, hashes[k % len(hashes)], ultimo_login, False, f"u{tarea['seed']}-{k:08d}@{DOMINIO}", False,
+            activo, alta, rng.choices(rol_ids, rol_pesos)[0], verificado,
+            verificado and rng.random() < P_TELEFONO_VERIFICADO, "", "", 0 if rng.random() < 0.9 else rng.randint(1, 5),
+        ))
+        telefono = f"+569{rng.randint(10_000_000, 99_999_999)}" if rng.random() < P_TELEFONO else ""
+        alternativo = f"+569{rng.randint(10_000_000, 99_999_999)}" if rng.random() < P_TELEFONO_ALTERNATIVO else ""
+        filas[Perfil].append((
+            uid, rng.choice(NOMBRES), rng.choice(APELLIDOS), telefono, alternativo, None, alta, _entre(rng, alta, hasta),
+        ))
+        filas[VerificacionEmail].append((
+            uid, str(uuid.UUID(int=rng.getrandbits(128), version=4)), alta + timedelta(hours=24),
+            alta + timedelta(seconds=rng.randint(30, 3600)) if verificado else None,
+        ))
+        if not (activo and verificado):
+            continue
+
+        for _ in range(rng.choices(n_sesiones, pesos_sesiones)[0]):
+            creada = _entre(rng, alta, hasta)
+            filas[Sesion].append((
+                uid, uuid.UUID(int=rng.getrandbits(128)).hex if rng.random() < P_DEVICE_ID else "",
+                f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                rng.choice(USER_AGENTS), uuid.UUID(int=rng.getrandbits(128)).hex, _entre(rng, creada, hasta), creada,
+            ))
+        if rng.random() < P_2FA:
+            totp_id = tarea["base_totp"] + k
+            # backup_codes_cifrado: columna obsoleta (NOT NULL) hasta que se elimine; los códigos van en su tabla
+            filas[TOTP2FA].append((totp_id, uid, base64.b32encode(rng.randbytes(20)).decode(), "", True, _entre(rng, alta, hasta)))
+            codigos = {f"{rng.getrandbits(32):08x}" for _ in range(rng.randint(3, 8))}
+            filas[CodigoRespaldo2FA] += [(totp_id, hash_codigo(c)) for c in sorted(codigos)]
+    return filas
+
+
+def _copy(cursor, tabla: str, columnas: str, modelo, filas: list) -> None:
+    with cursor.cursor.copy(f"COPY {tabla} ({columnas}) FROM STDIN") as copy:  # psycopg 3
+        for fila in filas:
+            copy.write_row(fila)
+
+
+def _insert(cursor, tabla: str, columnas: str, modelo, filas: list) -> None:
+    campos = [modelo._meta.get_field(c) for c in COLUMNAS[modelo]]
+    valores = [[f.get_db_prep_save(v, connection) for f, v in zip(campos, fila)] for fila in filas]
+    marcas = ", ".join(["%s"] * len(campos))
+    cursor.executemany(f"INSERT INTO {tabla} ({columnas}) VALUES ({marcas})", valores)
+
+
+def _cargar(filas: dict, metodo: str) -> dict:
+    escribir = _copy if metodo == "copy" else _insert
+    quote = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        for modelo, columnas in COLUMNAS.items():
+            if filas[modelo]:
+                escribir(cursor, quote(modelo._meta.db_table), ", ".join(map(quote, columnas)), modelo, filas[modelo])
+    return {modelo._meta.db_table: len(f) for modelo, f in filas.items()}
+
+
+def _procesar(tarea: dict) -> tuple:
+    """(filas por tabla, None) si carga aquí; (None, filas) si carga el proceso principal."""
+    filas = _generar(tarea)
+    if tarea["cargar"]:
+        return _cargar(filas, tarea["metodo"]), None
+    return None, filas
+
+
+class Command(BaseCommand):
+    help = "Genera usuarios sintéticos en volumen (perfil, verificación, sesiones, 2FA) para pruebas de carga."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuarios", type=int, default=10_000)
+        parser.add_argument("--chunk", type=int, default=5_000, help="Usuarios por chunk (una transacción cada uno)")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos; 0 = en este proceso")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--passwords", type=int, default=16, help="Contraseñas distintas (un hash por cada una)")
+        parser.add_argument("--hasta", help="Fecha final de la historia generada, AAAA-MM-DD (por defecto hoy)")
+        parser.add_argument("--metodo", choices=("copy", "insert"), help="Por defecto copy en PostgreSQL, insert en el resto")
+        parser.add_argument("--borrar", action="store_true", help=f"Borra antes los usuarios @{DOMINIO}")
+
+    def handle(self, *args, **options):
+        try:
+            roles = dict(Rol.objects.values_list("codigo", "id"))
+        except ProgrammingError:
+            raise CommandError("Las tablas de core no existen. Ejecuta primero: python manage.py migrate")
+        faltan = [codigo for codigo, _ in ROLES if codigo not in roles]
+        if faltan:
+            raise CommandError(f"Faltan roles ({', '.join(faltan)}). Ejecuta primero: python manage.py seed_auth")
+        postgres = connection.vendor == "postgresql"
+        metodo = options["metodo"] or ("copy" if postgres else "insert")
+        if metodo == "copy" and not postgres:
+            raise CommandError("COPY solo está disponible con PostgreSQL: usar --metodo insert.")
+        usuarios, chunk, workers, seed = options["usuarios"], max(options["chunk"], 1), options["workers"], options["seed"]
+        dia = datetime.strptime(options["hasta"], "%Y-%m-%d").date() if options["hasta"] else datetime.now(dt_timezone.utc).date()
+        hasta = datetime(dia.year, dia.month, dia.day, tzinfo=dt_timezone.utc)
+
+        if options["borrar"]:
+            self._borrar(chunk)
+
+        inicio = time.perf_counter()
+        ejecutor = None
+        if workers > 0:
+            # initializer=django.setup: el worker importa este módulo (y los modelos) después de configurar Django
+            ejecutor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=django.setup
+            )
+        mapear = ejecutor.map if ejecutor else map
+        try:
+            hashes = list(mapear(_hashear, [(seed, i) for i in range(max(options["passwords"], 1))]))
+            self.stdout.write(f"{len(hashes)} hashes de contraseña en {time.perf_counter() - inicio:.1f} s")
+
+            base = {
+                "base_usuario": (Usuario.objects.aggregate(m=Max("id"))["m"] or 0) + 1,
+                "base_totp": (TOTP2FA.objects.aggregate(m=Max("id"))["m"] or 0) + 1,
+            }
+            comunes = {
+                **base, "seed": seed, "hasta": hasta, "hashes": hashes, "metodo": metodo,
+                "roles": [(roles[codigo], peso) for codigo, peso in ROLES],
+                # SQLite admite un solo escritor: los workers solo generan
+                "cargar": ejecutor is None or postgres,
+            }
+            tareas = [{**comunes, "inicio": i, "fin": min(i + chunk, usuarios)} for i in range(0, usuarios, chunk)]
+            totales = {modelo._meta.db_table: 0 for modelo in COLUMNAS}
+            carga = time.perf_counter()
+            for n, (conteo, filas) in enumerate(mapear(_procesar, tareas), 1):
+                if filas is not None:
+                    conteo = _cargar(filas, metodo)
+                for tabla, c in conteo.items():
+                    totales[tabla] += c
+                total = sum(totales.values())
+                self.stdout.write(
+                    f"chunk {n}/{len(tareas)}: {total} filas ({total / (time.perf_counter() - carga):,.0f} filas/s)"
+                )
+        except IntegrityError as e:
+            if not email_duplicado(e):
+                raise
+            raise CommandError(f"{e}\nYa hay usuarios de esta semilla: repetir con --borrar o con otra --seed.")
+        finally:
+            if ejecutor:
+                ejecutor.shutdown(cancel_futures=True)
+
+        if postgres:
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Usuario, TOTP2FA]):
+                    cursor.execute(sql)
+
+        duracion = time.perf_counter() - inicio
+        total = sum(totales.values())
+        for tabla, c in totales.items():
+            self.stdout.write(f"  {tabla:28} {c:>12,}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{total:,} filas en {duracion:.1f} s ({total / duracion:,.0f} filas/s, {metodo}, {workers} workers)."
+        ))
+        if usuarios:
+            self.stdout.write(f"Login de ejemplo: u{seed}-{0:08d}@{DOMINIO} / {password_bulk(seed, 0)}")
+
+    def _borrar(self, chunk: int) -> None:
+        """Borra por lotes de ids los usuarios de ejecuciones anteriores (con sus filas relacionadas)."""
+        ultimo, borrados = 0, 0
+        while True:
+            ids = list(
+                Usuario.objects.filter(pk__gt=ultimo, email__endswith=f"@{DOMINIO}")
+                .order_by("pk")
+                .values_list("pk", flat=True)[:chunk]
+            )
+            if not ids:
+                break
+            Usuario.objects.filter(pk__in=ids).delete()
+            borrados += len(ids)
+            ultimo = ids[-1]
+        self.stdout.write(f"{borrados} usuarios @{DOMINIO} borrados.")
@@ -0,0 +1,73 @@
+"""
+Servidor SMTP local que acepta y descarta (para probar el motor de envío sin proveedor real).
+Uso: python manage.py smtp_sink [--port 1025] [--latencia 0.05] [--fallar-cada 10]
+Con EMAIL_BACKEND=django.core.mail.backends.smtp.EmailBackend EMAIL_HOST=127.0.0.1 EMAIL_PORT=1025.
+Equivalente con aiosmtpd instalado: python -m aiosmtpd -n -l 127.0.0.1:1025
+"""
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "SMTP de pruebas: acepta mensajes, simula latencia y rechazos, y cuenta conexiones y mensajes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=1025)
+        parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de espera por mensaje (DATA)")
+        parser.add_argument("--fallar-cada", type=int, default=0, help="Rechazar (554) uno de cada N mensajes")
+
+    def handle(self, *args, **options):
+        self.latencia = options["latencia"]
+        self.fallar_cada = options["fallar_cada"]
+        self.conexiones = 0
+        self.mensajes = 0
+        try:
+            asyncio.run(self._servir(options["host"], options["port"]))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Conexiones: {self.conexiones}  mensajes: {self.mensajes}")
+
+    async def _servir(self, host: str, port: int):
+        servidor = await asyncio.start_server(self._sesion, host, port)
+        self.stdout.write(f"SMTP sink en {host}:{port} (Ctrl+C para salir)")
+        async with servidor:
+            await servidor.serve_forever()
+
+    async def _sesion(self, reader, writer):
+        self.conexiones += 1
+
+        async def responder(linea: str):
+            writer.write(linea.encode() + b"\r\n")
+            await writer.drain()
+
+        await responder("220 smtp-sink")
+        try:
+            while linea := await reader.readline():
+                comando = linea.decode(errors="replace").strip().upper()
+                if comando.startswith("EHLO"):
+                    await responder("250-smtp-sink\r\n250-8BITMIME\r\n250 SMTPUTF8")
+                elif comando.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                    await responder("250 OK")
+                elif comando == "DATA":
+                    await responder("354 Fin con <CRLF>.<CRLF>")
+                    while (await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        pass
+                    if self.latencia:
+                        await asyncio.sleep(self.latencia)
+                    self.mensajes += 1
+                    if self.fallar_cada and self.mensajes % self.fallar_cada == 0:
+                        await responder("554 Rechazado por smtp_sink")
+                    else:
+                        await responder(f"250 OK {time.time():.0f}")
+                elif comando == "QUIT":
+                    await responder("221 Adiós")
+                    break
+                else:
+                    await responder("502 No implementado")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
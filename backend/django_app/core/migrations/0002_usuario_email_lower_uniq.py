@@ -0,0 +1,72 @@
+"""
+Índice único funcional sobre lower(email) en core_usuario.
+
+En PostgreSQL se crea con CREATE UNIQUE INDEX CONCURRENTLY (sin bloquear escrituras en la
+tabla de usuarios), así que la migración no es atómica. Antes se comprueba que no haya emails
+que solo difieran en mayúsculas: si los hay, se listan y hay que resolverlos a mano.
+"""
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+INDICE = "core_usuario_email_lower_uniq"
+
+CONSTRAINT = models.UniqueConstraint(
+    Lower("email"),
+    name=INDICE,
+    violation_error_message="Ya existe un usuario con ese email.",
+)
+
+
+def comprobar_duplicados(apps, schema_editor):
+    Usuario = apps.get_model("core", "Usuario")
+    duplicados = list(
+        Usuario.objects.annotate(email_lower=Lower("email"))
+        .values("email_lower")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .values_list("email_lower", flat=True)[:20]
+    )
+    if duplicados:
+        raise RuntimeError(
+            "Emails duplicados sin distinguir mayúsculas (unificar antes de migrar): " + ", ".join(duplicados)
+        )
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.add_constraint(apps.get_model("core", "Usuario"), CONSTRAINT)
+        return
+    with schema_editor.connection.cursor() as cursor:
+        # Un CONCURRENTLY interrumpido deja el índice INVALID: se borra y se vuelve a crear
+        cursor.execute(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = %s AND NOT i.indisvalid",
+            [INDICE],
+        )
+        if cursor.fetchone():
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{INDICE}"')
+    schema_editor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "{INDICE}" ON "core_usuario" (LOWER("email"))')
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.remove_constraint(apps.get_model("core", "Usuario"), CONSTRAINT)
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{INDICE}"')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(comprobar_duplicados, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddConstraint(model_name="usuario", constraint=CONSTRAINT)],
+            database_operations=[migrations.RunPython(crear_indice, borrar_indice)],
+        ),
+    ]
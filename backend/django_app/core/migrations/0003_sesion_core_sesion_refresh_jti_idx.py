@@ -0,0 +1,39 @@
+"""
+Índice sobre core_sesion.refresh_token_jti para el UPDATE en lote de última actividad.
+En PostgreSQL se crea CONCURRENTLY (migración no atómica), como 0002.
+"""
+from django.db import migrations, models
+
+INDICE = models.Index(fields=["refresh_token_jti"], name="core_sesion_refresh_jti_idx")
+
+
+def crear_indice(apps, schema_editor):
+    Sesion = apps.get_model("core", "Sesion")
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{INDICE.name}"')  # INVALID de un intento previo
+        schema_editor.add_index(Sesion, INDICE, concurrently=True)
+    else:
+        schema_editor.add_index(Sesion, INDICE)
+
+
+def borrar_indice(apps, schema_editor):
+    Sesion = apps.get_model("core", "Sesion")
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.remove_index(Sesion, INDICE, concurrently=True)
+    else:
+        schema_editor.remove_index(Sesion, INDICE)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("core", "0002_usuario_email_lower_uniq"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name="sesion", index=INDICE)],
+            database_operations=[migrations.RunPython(crear_indice, borrar_indice)],
+        ),
+    ]
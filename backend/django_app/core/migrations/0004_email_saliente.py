@@ -0,0 +1,51 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_sesion_core_sesion_refresh_jti_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmailSaliente",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID"),
+                ),
+                ("tipo", models.CharField(max_length=32)),
+                ("destinatario", models.EmailField(max_length=254)),
+                ("remitente", models.CharField(max_length=255)),
+                ("asunto", models.CharField(max_length=255)),
+                ("cuerpo", models.TextField()),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[("pendiente", "Pendiente"), ("enviado", "Enviado"), ("muerto", "Muerto")],
+                        default="pendiente",
+                        max_length=16,
+                    ),
+                ),
+                ("intentos", models.PositiveSmallIntegerField(default=0)),
+                ("proximo_intento", models.DateTimeField(default=django.utils.timezone.now)),
+                ("ultimo_error", models.TextField(blank=True)),
+                ("creado_en", models.DateTimeField(auto_now_add=True)),
+                ("enviado_en", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "core_email_saliente",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("estado", "pendiente")),
+                        fields=["proximo_intento"],
+                        name="core_email_sal_pendiente_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_email_saliente"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TareaPeriodica",
+            fields=[
+                ("nombre", models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ("ultima_franja", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "core_tarea_periodica",
+            },
+        ),
+        migrations.CreateModel(
+            name="Tarea",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID"),
+                ),
+                ("nombre", models.CharField(max_length=100)),
+                ("kwargs", models.JSONField(blank=True, default=dict)),
+                ("prioridad", models.SmallIntegerField(default=0)),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("pendiente", "Pendiente"),
+                            ("en_curso", "En curso"),
+                            ("hecha", "Hecha"),
+                            ("muerta", "Muerta"),
+                        ],
+                        default="pendiente",
+                        max_length=16,
+                    ),
+                ),
+                ("intentos", models.PositiveSmallIntegerField(default=0)),
+                ("max_intentos", models.PositiveSmallIntegerField(default=5)),
+                ("ejecutar_en", models.DateTimeField(default=django.utils.timezone.now)),
+                ("clave_unica", models.CharField(blank=True, max_length=255, null=True)),
+                ("ultimo_error", models.TextField(blank=True)),
+                ("creado_en", models.DateTimeField(auto_now_add=True)),
+                ("iniciada_en", models.DateTimeField(blank=True, null=True)),
+                ("terminada_en", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "core_tarea",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("estado__in", ["pendiente", "en_curso"])),
+                        fields=["ejecutar_en", "prioridad"],
+                        name="core_tarea_cola_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("estado__in", ["pendiente", "en_curso"])),
+                        fields=("clave_unica",),
+                        name="core_tarea_clave_unica_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+"""
+Índices para la purga por lotes (core/jobs/purga.py) y el parcial de OTP no usados.
+En PostgreSQL se crean CONCURRENTLY (migración no atómica), como 0002 y 0003.
+token_blacklist_outstandingtoken es de SimpleJWT: su índice sobre expires_at va por SQL.
+"""
+from django.db import migrations, models
+
+INDICES = [
+    ("verificacionemail", models.Index(fields=["expira_en"], name="core_verif_email_expira_idx")),
+    (
+        "verificacionotp",
+        models.Index(
+            fields=["usuario", "codigo_hash"],
+            name="core_verif_otp_activo_idx",
+            condition=models.Q(usado_en__isnull=True),
+        ),
+    ),
+    ("verificacionotp", models.Index(fields=["expira_en"], name="core_verif_otp_expira_idx")),
+    ("sesion", models.Index(fields=["ultima_actividad"], name="core_sesion_actividad_idx")),
+    (
+        "emailsaliente",
+        models.Index(
+            fields=["creado_en"],
+            name="core_email_sal_historico_idx",
+            condition=models.Q(estado__in=["enviado", "muerto"]),
+        ),
+    ),
+    (
+        "tarea",
+        models.Index(
+            fields=["terminada_en"],
+            name="core_tarea_terminada_idx",
+            condition=models.Q(estado__in=["hecha", "muerta"]),
+        ),
+    ),
+]
+
+INDICE_OUTSTANDING = "core_outstanding_expira_idx"
+
+
+def crear_indices(apps, schema_editor):
+    postgres = schema_editor.connection.vendor == "postgresql"
+    for modelo, indice in INDICES:
+        Modelo = apps.get_model("core", modelo)
+        if postgres:
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{indice.name}"')  # INVALID de un intento previo
+            schema_editor.add_index(Modelo, indice, concurrently=True)
+        else:
+            schema_editor.add_index(Modelo, indice)
+    concurrente = "CONCURRENTLY " if postgres else ""
+    schema_editor.execute(
+        f'CREATE INDEX {concurrente}IF NOT EXISTS "{INDICE_OUTSTANDING}" '
+        f'ON "token_blacklist_outstandingtoken" ("expires_at")'
+    )
+
+
+def borrar_indices(apps, schema_editor):
+    postgres = schema_editor.connection.vendor == "postgresql"
+    for modelo, indice in INDICES:
+        schema_editor.remove_index(apps.get_model("core", modelo), indice, **({"concurrently": True} if postgres else {}))
+    concurrente = "CONCURRENTLY " if postgres else ""
+    schema_editor.execute(f'DROP INDEX {concurrente}IF EXISTS "{INDICE_OUTSTANDING}"')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("core", "0005_tarea"),
+        ("token_blacklist", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name=modelo, index=indice) for modelo, indice in INDICES],
+            database_operations=[migrations.RunPython(crear_indices, borrar_indices)],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_indices_purga"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="usuario",
+            name="version_tokens",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
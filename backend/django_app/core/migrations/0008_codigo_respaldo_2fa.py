@@ -0,0 +1,34 @@
+"""
+Tabla de códigos de respaldo de 2FA (CodigoRespaldo2FA): una fila por código con índice único
+(totp, codigo_hash). Solo esquema (atómica); la copia de los JSON existentes va en 0009.
+"""
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_usuario_version_tokens"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CodigoRespaldo2FA",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("codigo_hash", models.CharField(max_length=64)),
+                (
+                    "totp",
+                    models.ForeignKey(
+                        on_delete=models.deletion.CASCADE, related_name="codigos_respaldo", to="core.totp2fa"
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "core_totp_codigo_respaldo",
+                "constraints": [
+                    models.UniqueConstraint(fields=("totp", "codigo_hash"), name="core_totp_codigo_uniq"),
+                ],
+            },
+        ),
+    ]
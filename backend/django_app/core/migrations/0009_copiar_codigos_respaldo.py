@@ -0,0 +1,76 @@
+"""
+Copia los JSON de TOTP2FA.backup_codes_cifrado a CodigoRespaldo2FA por lotes de LOTE registros,
+cada uno en su propia transacción (migración no atómica: no retiene una transacción larga sobre
+core_totp_2fa). Idempotente (ignore_conflicts): si falla a mitad, se vuelve a ejecutar.
+
+La columna backup_codes_cifrado se conserva hasta la versión siguiente, para no romper a los
+procesos con el código anterior durante un despliegue escalonado.
+"""
+import json
+
+from django.db import migrations, transaction
+
+LOTE = 1000
+
+
+def copiar_codigos(apps, schema_editor):
+    TOTP2FA = apps.get_model("core", "TOTP2FA")
+    CodigoRespaldo2FA = apps.get_model("core", "CodigoRespaldo2FA")
+    alias = schema_editor.connection.alias
+    ultimo = 0
+    while True:
+        filas = list(
+            TOTP2FA.objects.using(alias)
+            .filter(pk__gt=ultimo)
+            .exclude(backup_codes_cifrado="")
+            .order_by("pk")
+            .values_list("pk", "backup_codes_cifrado")[:LOTE]
+        )
+        if not filas:
+            return
+        codigos = []
+        for totp_id, blob in filas:
+            try:
+                hashes = json.loads(blob)
+            except ValueError:
+                continue  # JSON ilegible: tampoco validaba con el código anterior
+            codigos += [
+                CodigoRespaldo2FA(totp_id=totp_id, codigo_hash=h) for h in set(hashes) if isinstance(h, str)
+            ]
+        with transaction.atomic(using=alias):
+            CodigoRespaldo2FA.objects.using(alias).bulk_create(codigos, ignore_conflicts=True)
+        ultimo = filas[-1][0]
+
+
+def restaurar_json(apps, schema_editor):
+    TOTP2FA = apps.get_model("core", "TOTP2FA")
+    CodigoRespaldo2FA = apps.get_model("core", "CodigoRespaldo2FA")
+    alias = schema_editor.connection.alias
+    ultimo = 0
+    while True:
+        ids = list(
+            TOTP2FA.objects.using(alias).filter(pk__gt=ultimo).order_by("pk").values_list("pk", flat=True)[:LOTE]
+        )
+        if not ids:
+            return
+        hashes = {}
+        for totp_id, codigo_hash in CodigoRespaldo2FA.objects.using(alias).filter(totp_id__in=ids).values_list(
+            "totp_id", "codigo_hash"
+        ):
+            hashes.setdefault(totp_id, []).append(codigo_hash)
+        with transaction.atomic(using=alias):
+            for totp_id, lista in hashes.items():
+                TOTP2FA.objects.using(alias).filter(pk=totp_id).update(backup_codes_cifrado=json.dumps(lista))
+        ultimo = ids[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("core", "0008_codigo_respaldo_2fa"),
+    ]
+
+    operations = [
+        migrations.RunPython(copiar_codigos, restaurar_json),
+    ]
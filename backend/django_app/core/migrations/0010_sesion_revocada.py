@@ -0,0 +1,25 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_copiar_codigos_respaldo"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SesionRevocada",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("sid", models.CharField(max_length=255, unique=True)),
+                ("expira_en", models.DateTimeField()),
+            ],
+            options={
+                "db_table": "core_sesion_revocada",
+                "indexes": [models.Index(fields=["expira_en"], name="core_sesion_rev_expira_idx")],
+            },
+        ),
+    ]
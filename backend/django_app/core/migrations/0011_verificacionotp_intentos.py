@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_sesion_revocada"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="verificacionotp",
+            name="intentos",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
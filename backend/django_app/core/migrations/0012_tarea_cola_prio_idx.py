@@ -0,0 +1,46 @@
+"""
+Índice de la cola de tareas en el orden en que se reclaman (prioridad desc, ejecutar_en), en
+lugar de (ejecutar_en, prioridad). En PostgreSQL se crea el nuevo CONCURRENTLY antes de borrar el
+anterior (migración no atómica), como 0003 y 0006.
+"""
+from django.db import migrations, models
+
+ACTIVAS = models.Q(estado__in=["pendiente", "en_curso"])
+ANTERIOR = models.Index(fields=["ejecutar_en", "prioridad"], name="core_tarea_cola_idx", condition=ACTIVAS)
+NUEVO = models.Index(fields=["-prioridad", "ejecutar_en"], name="core_tarea_cola_prio_idx", condition=ACTIVAS)
+
+
+def _cambiar(schema_editor, Tarea, crear, borrar):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{crear.name}"')  # INVALID de un intento previo
+        schema_editor.add_index(Tarea, crear, concurrently=True)
+        schema_editor.remove_index(Tarea, borrar, concurrently=True)
+    else:
+        schema_editor.add_index(Tarea, crear)
+        schema_editor.remove_index(Tarea, borrar)
+
+
+def usar_nuevo(apps, schema_editor):
+    _cambiar(schema_editor, apps.get_model("core", "Tarea"), NUEVO, ANTERIOR)
+
+
+def usar_anterior(apps, schema_editor):
+    _cambiar(schema_editor, apps.get_model("core", "Tarea"), ANTERIOR, NUEVO)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("core", "0011_verificacionotp_intentos"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(model_name="tarea", name=ANTERIOR.name),
+                migrations.AddIndex(model_name="tarea", index=NUEVO),
+            ],
+            database_operations=[migrations.RunPython(usar_nuevo, usar_anterior)],
+        ),
+    ]
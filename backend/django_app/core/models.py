@@ -4,6 +4,9 @@ Ref: docs/MODULOS-TECNICOS.md — core_rol, core_usuario, core_perfil, etc.
 """
 import uuid
 from django.db import models
+from django.utils import timezone
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 
@@ -25,6 +28,13 @@ class Rol(models.Model):
 
 
 class UsuarioManager(BaseUserManager):
+    def por_email(self, email: str):
+        """Búsqueda sin distinguir mayúsculas por el índice sobre lower(email) (no email__iexact)."""
+        return self.filter(Exact(Lower("email"), email.strip().lower()))
+
+    def get_by_natural_key(self, username):
+        return self.por_email(username).get()
+
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError("El email es obligatorio.")
@@ -43,6 +53,18 @@ class UsuarioManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
 
+# Restricciones únicas del email: el índice sobre lower(email) y el UNIQUE de la columna
+# (PostgreSQL lo llama core_usuario_email_key; SQLite informa "core_usuario.email")
+RESTRICCIONES_EMAIL = ("core_usuario_email_lower_uniq", "core_usuario_email_key", "core_usuario.email")
+
+
+def email_duplicado(error) -> bool:
+    """True si el IntegrityError viene de una restricción única del email y no de otra."""
+    diag = getattr(error.__cause__, "diag", None)  # psycopg: nombre exacto de la restricción
+    nombre = getattr(diag, "constraint_name", None) or str(error)
+    return any(r in nombre for r in RESTRICCIONES_EMAIL)
+
+
 class Usuario(AbstractBaseUser, PermissionsMixin):
     """Usuario: email como identificador; roles; verificación email/teléfono."""
     email = models.EmailField(unique=True)
@@ -57,6 +79,8 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     # Hashes para privacidad/auditoría (opcional: email_hash, phone_hash)
     email_hash = models.CharField(max_length=64, blank=True)
     phone_hash = models.CharField(max_length=64, blank=True)
+    # Generación de tokens (claim `ver`): subirla invalida todos los emitidos (core/revocacion.py)
+    version_tokens = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -66,10 +90,35 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     class Meta:
         db_table = "core_usuario"
         ordering = ["-date_joined"]
+        constraints = [
+            # Índice único funcional: búsquedas por lower(email) y sin duplicados por mayúsculas
+            models.UniqueConstraint(
+                Lower("email"),
+                name="core_usuario_email_lower_uniq",
+                violation_error_message="Ya existe un usuario con ese email.",
+            ),
+        ]
 
     def __str__(self):
         return self.email
 
+    # Hash/verificación en el pool de procesos (core/hashing.py), fuera del hilo de la petición
+    def set_password(self, raw_password):
+        from core.hashing import hacer_password
+        self.password = hacer_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """Como AbstractBaseUser.check_password: si cambió el hasher o sus parámetros, re-hashea y guarda."""
+        from core.hashing import verificar_password
+        ok, nuevo_hash = verificar_password(raw_password, self.password)
+        if ok and nuevo_hash:
+            self.password = nuevo_hash
+            self._password = None
+            if self.pk:
+                self.save(update_fields=["password"])
+        return ok
+
 
 class Perfil(models.Model):
     """Datos del publicador: nombre, apellido, teléfono, avatar (KYC lite opcional)."""
@@ -99,6 +148,10 @@ class VerificacionEmail(models.Model):
     class Meta:
         db_table = "core_verificacion_email"
         ordering = ["-expira_en"]
+        indexes = [
+            # Purga por expiración (core/jobs/purga.py)
+            models.Index(fields=["expira_en"], name="core_verif_email_expira_idx"),
+        ]
 
 
 class VerificacionOTP(models.Model):
@@ -107,10 +160,20 @@ class VerificacionOTP(models.Model):
     codigo_hash = models.CharField(max_length=128)  # hash del código de 6 dígitos
     expira_en = models.DateTimeField()
     usado_en = models.DateTimeField(null=True, blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)  # códigos erróneos mientras está pendiente
 
     class Meta:
         db_table = "core_verificacion_otp"
         ordering = ["-expira_en"]
+        indexes = [
+            # verificar_otp: solo los no usados; los consumidos no engordan el índice
+            models.Index(
+                fields=["usuario", "codigo_hash"],
+                name="core_verif_otp_activo_idx",
+                condition=models.Q(usado_en__isnull=True),
+            ),
+            models.Index(fields=["expira_en"], name="core_verif_otp_expira_idx"),
+        ]
 
 
 class Sesion(models.Model):
@@ -126,15 +189,151 @@ class Sesion(models.Model):
     class Meta:
         db_table = "core_sesion"
         ordering = ["-ultima_actividad"]
+        indexes = [
+            # UPDATE de actividad por sid (core/sesiones.py)
+            models.Index(fields=["refresh_token_jti"], name="core_sesion_refresh_jti_idx"),
+            # Purga de sesiones inactivas
+            models.Index(fields=["ultima_actividad"], name="core_sesion_actividad_idx"),
+        ]
+
+
+class SesionRevocada(models.Model):
+    """Sesión revocada (claim `sid`) hasta que caduca su refresh; la cache la copia (core/revocacion.py)."""
+    sid = models.CharField(max_length=255, unique=True)
+    expira_en = models.DateTimeField()
+
+    class Meta:
+        db_table = "core_sesion_revocada"
+        indexes = [
+            # Purga por expiración (core/jobs/purga.py)
+            models.Index(fields=["expira_en"], name="core_sesion_rev_expira_idx"),
+        ]
 
 
 class TOTP2FA(models.Model):
-    """2FA TOTP: secret cifrado y códigos de respaldo."""
+    """2FA TOTP: secret cifrado; los códigos de respaldo en CodigoRespaldo2FA."""
     usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, related_name="totp_2fa")
     secret_cifrado = models.CharField(max_length=255)
-    backup_codes_cifrado = models.TextField(blank=True)  # JSON de códigos hasheados
+    # Obsoleto (JSON de hashes): solo para procesos con el código anterior; se borra en la versión siguiente
+    backup_codes_cifrado = models.TextField(blank=True)
     activo = models.BooleanField(default=True)
     creado_en = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = "core_totp_2fa"
+
+
+class CodigoRespaldo2FA(models.Model):
+    """Código de respaldo de 2FA (sha256); se consume borrando la fila."""
+    totp = models.ForeignKey(TOTP2FA, on_delete=models.CASCADE, related_name="codigos_respaldo")
+    codigo_hash = models.CharField(max_length=64)
+
+    class Meta:
+        db_table = "core_totp_codigo_respaldo"
+        constraints = [
+            # Consumo con un DELETE por (totp, hash): el índice único lo resuelve sin recorrer la tabla
+            models.UniqueConstraint(fields=["totp", "codigo_hash"], name="core_totp_codigo_uniq"),
+        ]
+
+
+class EmailSaliente(models.Model):
+    """Outbox de emails: se inserta en la transacción del caso de uso y se envía tras el commit."""
+    PENDIENTE = "pendiente"
+    ENVIADO = "enviado"
+    MUERTO = "muerto"  # agotó los reintentos (dead-letter)
+    ESTADOS = [(PENDIENTE, "Pendiente"), (ENVIADO, "Enviado"), (MUERTO, "Muerto")]
+
+    tipo = models.CharField(max_length=32)  # verificacion | otp | restablecer
+    destinatario = models.EmailField()
+    remitente = models.CharField(max_length=255)
+    asunto = models.CharField(max_length=255)
+    cuerpo = models.TextField()  # se vacía al enviar (lleva OTP / enlaces con token)
+    estado = models.CharField(max_length=16, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    enviado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "core_email_saliente"
+        indexes = [
+            # Cola de pendientes: índice parcial, los enviados no lo engordan
+            models.Index(
+                fields=["proximo_intento"],
+                name="core_email_sal_pendiente_idx",
+                condition=models.Q(estado="pendiente"),
+            ),
+            # Purga del histórico (enviados y muertos)
+            models.Index(
+                fields=["creado_en"],
+                name="core_email_sal_historico_idx",
+                condition=models.Q(estado__in=["enviado", "muerto"]),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} → {self.destinatario} ({self.estado})"
+
+
+class Tarea(models.Model):
+    """Cola de tareas en BD (core/jobs/cola.py): los workers reclaman con SKIP LOCKED."""
+    PENDIENTE = "pendiente"
+    EN_CURSO = "en_curso"
+    HECHA = "hecha"
+    MUERTA = "muerta"  # agotó los reintentos (dead-letter)
+    ESTADOS = [(PENDIENTE, "Pendiente"), (EN_CURSO, "En curso"), (HECHA, "Hecha"), (MUERTA, "Muerta")]
+    ACTIVAS = [PENDIENTE, EN_CURSO]
+
+    nombre = models.CharField(max_length=100)  # nombre registrado con @tarea
+    kwargs = models.JSONField(default=dict, blank=True)
+    prioridad = models.SmallIntegerField(default=0)  # mayor sale antes
+    estado = models.CharField(max_length=16, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=5)
+    ejecutar_en = models.DateTimeField(default=timezone.now)  # en curso: vencimiento del lease
+    clave_unica = models.CharField(max_length=255, null=True, blank=True)
+    ultimo_error = models.TextField(blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    iniciada_en = models.DateTimeField(null=True, blank=True)
+    terminada_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "core_tarea"
+        indexes = [
+            # Cola: solo las activas, en el orden en que se reclaman
+            models.Index(
+                fields=["-prioridad", "ejecutar_en"],
+                name="core_tarea_cola_prio_idx",
+                condition=models.Q(estado__in=["pendiente", "en_curso"]),
+            ),
+            # Purga del histórico (hechas y muertas)
+            models.Index(
+                fields=["terminada_en"],
+                name="core_tarea_terminada_idx",
+                condition=models.Q(estado__in=["hecha", "muerta"]),
+            ),
+        ]
+        constraints = [
+            # Deduplicación: una sola tarea activa por clave
+            models.UniqueConstraint(
+                fields=["clave_unica"],
+                name="core_tarea_clave_unica_uniq",
+                condition=models.Q(estado__in=["pendiente", "en_curso"]),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.estado})"
+
+
+class TareaPeriodica(models.Model):
+    """Última franja encolada de cada tarea periódica: un único worker la reclama con un UPDATE."""
+    nombre = models.CharField(max_length=100, primary_key=True)
+    ultima_franja = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "core_tarea_periodica"
+
+    def __str__(self):
+        return self.nombre
@@ -0,0 +1,111 @@
+"""
+Revocación de tokens sin tocar la blacklist: generación por usuario (claim `ver`) y sesiones revocadas.
+
+- `Usuario.version_tokens` se incrementa con un único UPDATE al cerrar las otras sesiones,
+  cambiar o restablecer la contraseña y activar o desactivar 2FA. Los access y refresh con
+  una generación anterior dejan de valer: los access en cada petición
+  (JWTSesionAuthentication) y los refresh al rotar (RefreshTokenRotativo). Los tokens sin
+  claim cuentan como generación 0.
+- Revocar una sola sesión guarda su `sid` en SesionRevocada hasta que caduca su refresh (la
+  purga la borra después) y lo marca en la cache.
+
+La generación vigente y el estado del `sid` se leen de la cache de Django AUTH_TOKENS_CACHE
+(copia de TOKENS_VERSION_CACHE_TTL s; en un fallo de cache, de la BD). La cache es compartida
+(DJANGO_CACHE_URL) o hay un único proceso (DEBUG, DJANGO_CACHE_LOCAL; settings lo exige), así que
+el corte es inmediato en todos los procesos. Al rotar un refresh el `sid` se comprueba siempre en la BD:
+una sesión revocada no obtiene tokens nuevos en ningún proceso, ni tras reiniciar.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from core.models import SesionRevocada
+from core.signals import notificar_cambio_usuario
+
+CLAIM = "ver"
+REVOCADO = "Token revocado."
+
+
+def _cache():
+    return caches[settings.AUTH_TOKENS_CACHE]
+
+
+def _clave_version(usuario_id) -> str:
+    return f"tokver:{usuario_id}"
+
+
+def _clave_sid(sid) -> str:
+    return f"sid-revocada:{sid}"
+
+
+def version_actual(usuario_id) -> int:
+    clave = _clave_version(usuario_id)
+    version = _cache().get(clave)
+    if version is None:
+        version = (
+            get_user_model().objects.filter(pk=usuario_id).values_list("version_tokens", flat=True).first() or 0
+        )
+        _cache().set(clave, version, timeout=settings.TOKENS_VERSION_CACHE_TTL)
+    return version
+
+
+def nueva_version(usuario) -> int:
+    """Invalida todos los tokens emitidos para el usuario; devuelve la generación nueva."""
+    tabla = connection.ops.quote_name(get_user_model()._meta.db_table)
+    with connection.cursor() as cursor:
+        # Un solo viaje: UPDATE ... RETURNING (PostgreSQL, SQLite >= 3.35)
+        cursor.execute(
+            f"UPDATE {tabla} SET version_tokens = version_tokens + 1 WHERE id = %s RETURNING version_tokens",
+            [usuario.pk],
+        )
+        version = cursor.fetchone()[0]
+    usuario.version_tokens = version
+    transaction.on_commit(
+        lambda: _cache().set(_clave_version(usuario.pk), version, timeout=settings.TOKENS_VERSION_CACHE_TTL)
+    )
+    notificar_cambio_usuario(usuario.pk)  # el UPDATE no dispara post_save: cache de /me/ en FastAPI
+    return version
+
+
+def revocar_sid(sid: str, usuario_id) -> None:
+    """Invalida los tokens de una sesión (claim `sid`) durante lo que le queda al refresh."""
+    vida = settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"]
+    SesionRevocada.objects.bulk_create([SesionRevocada(sid=sid, expira_en=timezone.now() + vida)], ignore_conflicts=True)
+    transaction.on_commit(lambda: _cache().set(_clave_sid(sid), 1, timeout=vida.total_seconds()))
+    notificar_cambio_usuario(usuario_id)  # cache de /me/ en FastAPI
+
+
+def sid_revocada(sid: str) -> bool:
+    """Consulta la BD y deja el resultado en la cache (revocada: hasta que caduca el refresh)."""
+    revocada = SesionRevocada.objects.filter(sid=sid).exists()
+    vida = settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"].total_seconds()
+    _cache().set(_clave_sid(sid), int(revocada), timeout=vida if revocada else settings.TOKENS_VERSION_CACHE_TTL)
+    return revocada
+
+
+def comprobar(payload, sid_en_bd: bool = False) -> None:
+    """
+    TokenError si el token es de una generación anterior o de una sesión revocada.
+    `sid_en_bd`: el `sid` se comprueba en la BD aunque la cache diga que no está revocado (refresh).
+    """
+    usuario_id = payload.get(api_settings.USER_ID_CLAIM)
+    if usuario_id is None:
+        return
+    sid = payload.get("sid")
+    claves = [_clave_version(usuario_id)] + ([_clave_sid(sid)] if sid else [])
+    valores = _cache().get_many(claves)
+    if sid:
+        revocada = valores.get(_clave_sid(sid))
+        if revocada is None or (sid_en_bd and not revocada):
+            revocada = sid_revocada(sid)
+        if revocada:
+            raise TokenError(REVOCADO)
+    version = valores.get(_clave_version(usuario_id))
+    if version is None:
+        version = version_actual(usuario_id)
+    if payload.get(CLAIM, 0) != version:
+        raise TokenError(REVOCADO)
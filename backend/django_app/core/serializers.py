@@ -3,6 +3,8 @@ Serializers para API de autenticación y perfil (módulo 1).
 """
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from .blacklist import RefreshTokenRotativo
 from .models import Rol, Perfil, Sesion, TOTP2FA
 
 User = get_user_model()
@@ -44,11 +46,6 @@ class RegistroSerializer(serializers.Serializer):
     telefono = serializers.CharField(required=False, allow_blank=True)
     aceptar_terminos = serializers.BooleanField()
 
-    def validate_email(self, value):
-        if User.objects.filter(email__iexact=value).exists():
-            raise serializers.ValidationError("Ya existe un usuario con ese email.")
-        return value
-
     def validate(self, data):
         if data["password"] != data["password_confirm"]:
             raise serializers.ValidationError({"password_confirm": "Las contraseñas no coinciden."})
@@ -124,3 +121,9 @@ class Verificar2FASerializer(serializers.Serializer):
 
 class Desactivar2FASerializer(serializers.Serializer):
     codigo = serializers.CharField(max_length=10)
+
+
+class TokenRefreshRotativoSerializer(TokenRefreshSerializer):
+    """Refresh con rotación sobre la blacklist en memoria (core/blacklist.py)."""
+
+    token_class = RefreshTokenRotativo
@@ -1,114 +1,115 @@
 """
 Lógica de negocio de autenticación: registro, verificación email/OTP, login, recuperación contraseña, 2FA.
 """
-import hashlib
+import json
+import secrets
 from datetime import timedelta
 from django.conf import settings
-from django.utils import timezone
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db import IntegrityError, connection, transaction
 
 import pyotp
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from core.models import Rol, Perfil, VerificacionEmail, VerificacionOTP, Sesion, TOTP2FA
+from core import revocacion
+from core.blacklist import RefreshTokenRotativo
+from core.models import CodigoRespaldo2FA, Rol, Perfil, Sesion, TOTP2FA, email_duplicado
 from core.jobs import enviar_email_verificacion, enviar_otp_por_email
+from core.sesiones import registro_sesiones
+from core.services.tokens import get_tokens, hash_codigo
 
 User = get_user_model()
 
+BACKUP_BYTES = 4  # backup codes de 8 caracteres hex
+
 
 class AuthService:
     """Servicio de autenticación (buenas prácticas: capa de aplicación)."""
 
-    @staticmethod
-    def _hash_codigo(codigo: str) -> str:
-        return hashlib.sha256(codigo.encode()).hexdigest()
-
     @staticmethod
     def registrar(email: str, password: str, nombre: str = "", apellido: str = "", telefono: str = ""):
-        """Crea usuario, perfil y envía email de verificación."""
-        if User.objects.filter(email__iexact=email).exists():
+        """
+        Crea usuario, perfil y envía email de verificación. Sin consulta previa de existencia:
+        el índice único sobre lower(email) rechaza el duplicado (IntegrityError).
+        """
+        roles = {r.codigo: r for r in Rol.objects.filter(codigo__in=("viewer", "owner"))}
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    email=email,
+                    password=password,
+                    rol=roles.get("viewer") or roles.get("owner"),
+                    verified_email=False,
+                    verified_phone=False,
+                )
+                Perfil.objects.create(
+                    usuario=user,
+                    nombre=nombre or "",
+                    apellido=apellido or "",
+                    telefono=telefono or "",
+                )
+                # Token verificación email (24 h)
+                token = get_tokens().crear_token("verificacion", user.pk, timedelta(hours=24))
+                enviar_email_verificacion(usuario=user, token=token)
+        except IntegrityError as e:
+            if not email_duplicado(e):
+                raise
             raise ValueError("Ya existe un usuario con ese email.")
-        rol_viewer = Rol.objects.filter(codigo="viewer").first() or Rol.objects.filter(codigo="owner").first()
-        with transaction.atomic():
-            user = User.objects.create_user(
-                email=email,
-                password=password,
-                rol=rol_viewer,
-                verified_email=False,
-                verified_phone=False,
-            )
-            Perfil.objects.create(
-                usuario=user,
-                nombre=nombre or "",
-                apellido=apellido or "",
-                telefono=telefono or "",
-            )
-            # Token verificación email (24 h)
-            expira = timezone.now() + timedelta(hours=24)
-            verif = VerificacionEmail.objects.create(usuario=user, expira_en=expira)
-            enviar_email_verificacion(usuario=user, token=verif.token)
         return user
 
     @staticmethod
     def verificar_email(token: str) -> User:
         """Consume token y marca verified_email=True; opcionalmente dispara envío OTP."""
-        verif = VerificacionEmail.objects.filter(token=token, usado_en__isnull=True).first()
-        if not verif:
-            raise ValueError("Token inválido o ya usado.")
-        if timezone.now() > verif.expira_en:
-            raise ValueError("Token expirado.")
+        tokens = get_tokens()
         with transaction.atomic():
-            verif.usado_en = timezone.now()
-            verif.save(update_fields=["usado_en"])
-            user = verif.usuario
+            # perfil: lo usa el email del OTP
+            user = User.objects.select_related("perfil").get(pk=tokens.consumir_token("verificacion", token))
             user.verified_email = True
             user.save(update_fields=["verified_email"])
-            # Enviar OTP 6 dígitos (TTL 10 min)
+            # Enviar OTP 6 dígitos (TTL OTP_TTL_MINUTOS)
             import random
             codigo = "".join(str(random.randint(0, 9)) for _ in range(6))
-            expira_otp = timezone.now() + timedelta(minutes=10)
-            VerificacionOTP.objects.create(
-                usuario=user,
-                codigo_hash=AuthService._hash_codigo(codigo),
-                expira_en=expira_otp,
-            )
+            tokens.crear_otp(user.pk, codigo, timedelta(minutes=settings.OTP_TTL_MINUTOS))
             enviar_otp_por_email(usuario=user, codigo=codigo)
         return user
 
     @staticmethod
     def verificar_otp(usuario_id: int, codigo: str) -> User:
-        """Valida código OTP 6 dígitos y marca usado."""
-        user = User.objects.get(pk=usuario_id)
-        codigo_hash = AuthService._hash_codigo(codigo.strip())
-        verif = VerificacionOTP.objects.filter(
-            usuario=user, codigo_hash=codigo_hash, usado_en__isnull=True
-        ).first()
-        if not verif:
-            raise ValueError("Código inválido o ya usado.")
-        if timezone.now() > verif.expira_en:
-            raise ValueError("Código expirado.")
-        verif.usado_en = timezone.now()
-        verif.save(update_fields=["usado_en"])
+        """Valida código OTP 6 dígitos y marca usado (tras OTP_MAX_INTENTOS fallos deja de valer)."""
+        user = User.objects.select_related("rol").get(pk=usuario_id)
+        get_tokens().consumir_otp(user.pk, codigo)
         return user
 
     @staticmethod
     def tokens_para_usuario(user: User, device_id: str = "", ip: str = "", user_agent: str = ""):
         """Genera access + refresh JWT y registra sesión."""
-        refresh = RefreshToken.for_user(user)
-        refresh["email"] = user.email
-        if user.rol:
-            refresh["rol"] = user.rol.codigo
-        access = refresh.access_token
-        # Registrar sesión (opcional: guardar jti del refresh para revocar)
-        Sesion.objects.create(
+        sid, tokens = AuthService._emitir_tokens(user)
+        # Registrar sesión (write-behind: se inserta en el próximo flush de core/sesiones.py)
+        registro_sesiones.crear(Sesion(
             usuario=user,
             device_id=device_id or "",
             ip=ip or None,
             user_agent=(user_agent or "")[:512],
-            refresh_token_jti=str(refresh.get("jti", "")),
-        )
-        return {
+            refresh_token_jti=sid,
+        ))
+        return tokens
+
+    @staticmethod
+    def renovar_tokens(user: User, sid: str) -> dict:
+        """Tokens de la generación actual para una sesión existente (tras revocar las demás)."""
+        return AuthService._emitir_tokens(user, sid)[1]
+
+    @staticmethod
+    def _emitir_tokens(user: User, sid: str = "") -> tuple:
+        """(sid, respuesta con access + refresh); sin `sid` abre una sesión nueva con el jti del refresh."""
+        refresh = RefreshTokenRotativo.for_user(user)
+        refresh["email"] = user.email
+        if user.rol:
+            refresh["rol"] = user.rol.codigo
+        # sid: identifica la sesión en access y refresh rotados (se copia a los tokens derivados)
+        refresh["sid"] = sid or str(refresh["jti"])
+        refresh[revocacion.CLAIM] = user.version_tokens
+        access = refresh.access_token
+        return refresh["sid"], {
             "access": str(access),
             "refresh": str(refresh),
             "access_expires": access.get("exp"),
@@ -120,56 +121,64 @@ class AuthService:
     @staticmethod
     def solicitar_restablecer_password(email: str) -> None:
         """Crea token y envía email con link (job)."""
-        from core.models import VerificacionEmail
-        user = User.objects.filter(email__iexact=email).first()
+        user = User.objects.por_email(email).first()
         if not user:
             return  # No revelar si existe
-        expira = timezone.now() + timedelta(hours=1)
-        verif = VerificacionEmail.objects.create(usuario=user, expira_en=expira)
+        token = get_tokens().crear_token("restablecer", user.pk, timedelta(hours=1))
         from core.jobs import enviar_email_restablecer_password
-        enviar_email_restablecer_password(usuario=user, token=verif.token)
+        enviar_email_restablecer_password(usuario=user, token=token)
 
     @staticmethod
     def restablecer_password(token: str, nueva_password: str) -> User:
-        """Consume token de restablecimiento y actualiza contraseña."""
-        verif = VerificacionEmail.objects.filter(token=token, usado_en__isnull=True).first()
-        if not verif:
-            raise ValueError("Token inválido o ya usado.")
-        if timezone.now() > verif.expira_en:
-            raise ValueError("Token expirado.")
-        verif.usado_en = timezone.now()
-        verif.save(update_fields=["usado_en"])
-        user = verif.usuario
+        """Consume token de restablecimiento, actualiza contraseña e invalida los tokens emitidos."""
+        user = User.objects.get(pk=get_tokens().consumir_token("restablecer", token))
         user.set_password(nueva_password)
-        user.save(update_fields=["password"])
+        with transaction.atomic():
+            user.save(update_fields=["password"])
+            revocacion.nueva_version(user)
         return user
 
     @staticmethod
     def cambiar_password(user: User, password_actual: str, nueva_password: str) -> None:
-        """Verifica contraseña actual y la cambia."""
+        """Verifica contraseña actual, la cambia e invalida los tokens emitidos (ver renovar_tokens)."""
         if not user.check_password(password_actual):
             raise ValueError("Contraseña actual incorrecta.")
         user.set_password(nueva_password)
-        user.save(update_fields=["password"])
+        with transaction.atomic():
+            user.save(update_fields=["password"])
+            revocacion.nueva_version(user)
 
     @staticmethod
     def listar_sesiones(usuario: User):
-        """Sesiones activas del usuario."""
+        """Sesiones activas del usuario (incluidas las altas aún en el buffer de este proceso)."""
+        registro_sesiones.flush(usuario.pk)
         return Sesion.objects.filter(usuario=usuario).order_by("-ultima_actividad")
 
     @staticmethod
     def revocar_sesion(usuario: User, sesion_id: int) -> None:
-        """Revoca una sesión (borrar de BD; el refresh dejará de ser válido si usamos blacklist)."""
-        Sesion.objects.filter(usuario=usuario, pk=sesion_id).delete()
+        """Revoca una sesión: la borra y sus access/refresh (claim `sid`) dejan de valer."""
+        registro_sesiones.flush(usuario.pk)
+        sesion = Sesion.objects.get(usuario=usuario, pk=sesion_id)
+        with transaction.atomic():
+            sesion.delete()
+            revocacion.revocar_sid(sesion.refresh_token_jti, usuario.pk)
 
     @staticmethod
-    def revocar_otras_sesiones(usuario: User, excluir_sesion_id: int = None) -> int:
-        """Revoca todas las sesiones excepto la indicada; devuelve cantidad revocadas."""
+    def revocar_otras_sesiones(usuario: User, excluir_sesion_id: int = None, excluir_sid: str = "") -> int:
+        """
+        Revoca todas las sesiones excepto la indicada (por id o por `sid`); devuelve cantidad revocadas.
+        Sube la generación de tokens: la sesión conservada necesita renovar_tokens. Las altas
+        pendientes en otros procesos se descartan al escribirlas (core/sesiones.py).
+        """
+        registro_sesiones.flush(usuario.pk)
         qs = Sesion.objects.filter(usuario=usuario)
         if excluir_sesion_id:
             qs = qs.exclude(pk=excluir_sesion_id)
-        n = qs.count()
-        qs.delete()
+        if excluir_sid:
+            qs = qs.exclude(refresh_token_jti=excluir_sid)
+        with transaction.atomic():
+            n, _ = qs.delete()
+            revocacion.nueva_version(usuario)
         return n
 
     # --- 2FA TOTP ---
@@ -183,49 +192,58 @@ class AuthService:
 
     @staticmethod
     def activar_2fa(usuario: User, secret: str, codigo: str) -> list:
-        """Verifica código con secret y guarda 2FA; devuelve backup codes."""
+        """Verifica código con secret y guarda 2FA; devuelve backup codes (sustituyen a los anteriores)."""
         totp = pyotp.TOTP(secret)
         if not totp.verify(codigo, valid_window=1):
             raise ValueError("Código inválido.")
-        import json
-        import secrets
-        backup_codes = [secrets.token_hex(4) for _ in range(8)]
-        backup_hashes = [hashlib.sha256(c.encode()).hexdigest() for c in backup_codes]
-        TOTP2FA.objects.update_or_create(
-            usuario=usuario,
-            defaults={
-                "secret_cifrado": secret,  # En producción cifrar con clave de app
-                "backup_codes_cifrado": json.dumps(backup_hashes),
-                "activo": True,
-            },
-        )
+        backup_codes = [secrets.token_hex(BACKUP_BYTES) for _ in range(8)]
+        hashes = [hash_codigo(c) for c in backup_codes]
+        with transaction.atomic():
+            totp_record, creado = TOTP2FA.objects.update_or_create(
+                usuario=usuario,
+                defaults={
+                    "secret_cifrado": secret,  # En producción cifrar con clave de app
+                    # Copia JSON para los procesos con el código anterior (despliegue escalonado)
+                    "backup_codes_cifrado": json.dumps(hashes),
+                    "activo": True,
+                },
+            )
+            if not creado:
+                totp_record.codigos_respaldo.all().delete()
+            CodigoRespaldo2FA.objects.bulk_create([CodigoRespaldo2FA(totp=totp_record, codigo_hash=h) for h in hashes])
+            revocacion.nueva_version(usuario)
         return backup_codes
 
     @staticmethod
     def verificar_2fa(usuario: User, codigo: str) -> bool:
         """Verifica código TOTP o backup code."""
         totp_record = TOTP2FA.objects.filter(usuario=usuario, activo=True).first()
-        if not totp_record:
-            return False
+        return bool(totp_record) and AuthService._verificar_totp(totp_record, codigo)
+
+    @staticmethod
+    def _verificar_totp(totp_record: TOTP2FA, codigo: str) -> bool:
         totp = pyotp.TOTP(totp_record.secret_cifrado)
         if totp.verify(codigo, valid_window=1):
             return True
-        import json
-        try:
-            hashes = json.loads(totp_record.backup_codes_cifrado or "[]")
-            codigo_hash = hashlib.sha256(codigo.strip().encode()).hexdigest()
-            if codigo_hash in hashes:
-                hashes.remove(codigo_hash)
-                totp_record.backup_codes_cifrado = json.dumps(hashes)
-                totp_record.save(update_fields=["backup_codes_cifrado"])
-                return True
-        except Exception:
-            pass
-        return False
+        codigo = codigo.strip()
+        if len(codigo) != BACKUP_BYTES * 2:
+            return False  # no puede ser un backup code: sin consulta
+        # Consumo atómico en un viaje: DELETE ... RETURNING por el índice único (totp, hash); de dos
+        # peticiones simultáneas con el mismo código solo una borra la fila (QuerySet.delete añadiría BEGIN/COMMIT)
+        tabla = connection.ops.quote_name(CodigoRespaldo2FA._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {tabla} WHERE totp_id = %s AND codigo_hash = %s RETURNING id",
+                [totp_record.pk, hash_codigo(codigo)],
+            )
+            return cursor.fetchone() is not None
 
     @staticmethod
     def desactivar_2fa(usuario: User, codigo: str) -> None:
         """Desactiva 2FA tras verificar código."""
-        if not AuthService.verificar_2fa(usuario, codigo):
+        totp_record = TOTP2FA.objects.filter(usuario=usuario, activo=True).first()
+        if not totp_record or not AuthService._verificar_totp(totp_record, codigo):
             raise ValueError("Código inválido.")
-        TOTP2FA.objects.filter(usuario=usuario).delete()
+        with transaction.atomic():
+            totp_record.delete()
+            revocacion.nueva_version(usuario)
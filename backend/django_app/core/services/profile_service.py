@@ -7,27 +7,32 @@ from core.models import Perfil
 User = get_user_model()
 
 
+def _perfil(usuario: User) -> Perfil:
+    """Perfil del usuario: el ya cargado (snapshot de autenticación) o get_or_create."""
+    perfil = getattr(usuario, "perfil", None)
+    if perfil is None:
+        perfil, _ = Perfil.objects.get_or_create(usuario=usuario)
+    return perfil
+
+
 class ProfileService:
     @staticmethod
     def actualizar_perfil(usuario: User, nombre: str = None, apellido: str = None,
                           telefono: str = None, telefono_alternativo: str = None) -> Perfil:
-        """Actualiza datos del perfil (nombre, apellido, teléfonos)."""
-        perfil, _ = Perfil.objects.get_or_create(usuario=usuario)
-        if nombre is not None:
-            perfil.nombre = nombre
-        if apellido is not None:
-            perfil.apellido = apellido
-        if telefono is not None:
-            perfil.telefono = telefono
-        if telefono_alternativo is not None:
-            perfil.telefono_alternativo = telefono_alternativo
-        perfil.save()
+        """Actualiza datos del perfil (nombre, apellido, teléfonos); un solo UPDATE de lo que cambia."""
+        perfil = _perfil(usuario)
+        campos = {"nombre": nombre, "apellido": apellido, "telefono": telefono,
+                  "telefono_alternativo": telefono_alternativo}
+        cambios = [c for c, v in campos.items() if v is not None]
+        for campo in cambios:
+            setattr(perfil, campo, campos[campo])
+        perfil.save(update_fields=cambios + ["actualizado_en"])
         return perfil
 
     @staticmethod
     def actualizar_avatar(usuario: User, archivo) -> Perfil:
         """Guarda avatar (ImageField)."""
-        perfil, _ = Perfil.objects.get_or_create(usuario=usuario)
+        perfil = _perfil(usuario)
         if archivo:
             perfil.avatar = archivo
             perfil.save(update_fields=["avatar"])
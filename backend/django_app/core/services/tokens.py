@@ -0,0 +1,170 @@
+"""
+Tokens efímeros de AuthService: enlaces de verificación de email / restablecimiento y OTP de 6 dígitos.
+
+Backend según AUTH_TOKENS_BACKEND, con el mismo contrato (mensajes de error incluidos):
+- "bd": modelos VerificacionEmail / VerificacionOTP (como siempre; la purga los borra al caducar).
+- "cache": cache de Django AUTH_TOKENS_CACHE con TTL nativo; no toca PostgreSQL. Con varios
+  procesos la cache tiene que ser compartida (DJANGO_CACHE_URL=redis://...).
+
+En ambos el consumo es atómico y de un solo uso (UPDATE condicional / DELETE que informa si
+la clave existía: de dos peticiones simultáneas solo una gana) y tras OTP_MAX_INTENTOS fallos
+el código pendiente deja de valer. Los intentos se cuentan sin comprobar-y-sumar: en "bd" en la
+propia fila (el UPDATE que consume exige intentos < máximo), en "cache" con un incr por intento.
+"""
+import abc
+import hashlib
+import secrets
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+
+INVALIDO = "Token inválido o ya usado."
+EXPIRADO = "Token expirado."
+OTP_INVALIDO = "Código inválido o ya usado."
+OTP_EXPIRADO = "Código expirado."
+OTP_BLOQUEADO = "Demasiados intentos. Solicita un código nuevo."
+
+# Tras expirar, la clave se conserva este margen para responder "expirado" y no "inválido"
+_GRACIA = 3600
+
+
+def hash_codigo(codigo: str) -> str:
+    return hashlib.sha256(codigo.encode()).hexdigest()
+
+
+class TokensBackend(abc.ABC):
+    """Contrato común. `proposito`: "verificacion" | "restablecer"."""
+
+    @abc.abstractmethod
+    def crear_token(self, proposito: str, usuario_id: int, ttl: timedelta) -> str:
+        ...
+
+    @abc.abstractmethod
+    def consumir_token(self, proposito: str, token: str) -> int:
+        """Marca el token como usado y devuelve el usuario_id; ValueError si no vale."""
+
+    @abc.abstractmethod
+    def crear_otp(self, usuario_id: int, codigo: str, ttl: timedelta) -> None:
+        """Emite un OTP con los intentos a cero."""
+
+    @abc.abstractmethod
+    def consumir_otp(self, usuario_id: int, codigo: str) -> None:
+        """Valida y consume el OTP; ValueError si no vale o tras OTP_MAX_INTENTOS fallos."""
+
+
+class TokensBD(TokensBackend):
+    def crear_token(self, proposito, usuario_id, ttl):
+        from core.models import VerificacionEmail
+
+        return VerificacionEmail.objects.create(usuario_id=usuario_id, expira_en=timezone.now() + ttl).token
+
+    def consumir_token(self, proposito, token):
+        from core.models import VerificacionEmail
+
+        fila = VerificacionEmail.objects.filter(token=token).values_list("usuario_id", "expira_en", "usado_en").first()
+        if not fila or fila[2] is not None:
+            raise ValueError(INVALIDO)
+        usuario_id, expira_en, _ = fila
+        ahora = timezone.now()
+        if ahora > expira_en:
+            raise ValueError(EXPIRADO)
+        if not VerificacionEmail.objects.filter(token=token, usado_en__isnull=True).update(usado_en=ahora):
+            raise ValueError(INVALIDO)  # otra petición lo consumió entre medias
+        return usuario_id
+
+    def crear_otp(self, usuario_id, codigo, ttl):
+        from core.models import VerificacionOTP
+
+        VerificacionOTP.objects.create(usuario_id=usuario_id, codigo_hash=hash_codigo(codigo), expira_en=timezone.now() + ttl)
+
+    def consumir_otp(self, usuario_id, codigo):
+        from core.models import VerificacionOTP
+
+        codigo_hash = hash_codigo(codigo.strip())
+        ahora = timezone.now()
+        maximo = settings.OTP_MAX_INTENTOS
+        pendientes = VerificacionOTP.objects.filter(usuario_id=usuario_id, usado_en__isnull=True)
+        if pendientes.filter(codigo_hash=codigo_hash, expira_en__gte=ahora, intentos__lt=maximo).update(usado_en=ahora):
+            return
+        # No se consumió: solo aquí se averigua por qué
+        fila = pendientes.filter(codigo_hash=codigo_hash).values_list("expira_en", "intentos").first()
+        if fila is not None:
+            if fila[1] >= maximo:
+                raise ValueError(OTP_BLOQUEADO)
+            if ahora > fila[0]:
+                raise ValueError(OTP_EXPIRADO)
+            raise ValueError(OTP_INVALIDO)  # otra petición lo consumió entre medias
+        vigentes = pendientes.filter(expira_en__gte=ahora)
+        if not vigentes.filter(intentos__lt=maximo).update(intentos=F("intentos") + 1) and vigentes.exists():
+            raise ValueError(OTP_BLOQUEADO)
+        raise ValueError(OTP_INVALIDO)
+
+
+class TokensCache(TokensBackend):
+    """Un OTP pendiente por usuario (el nuevo sustituye al anterior); tokens por propósito."""
+
+    def __init__(self):
+        self.cache = caches[settings.AUTH_TOKENS_CACHE]
+
+    def crear_token(self, proposito, usuario_id, ttl):
+        token = secrets.token_urlsafe(32)
+        self._guardar(f"tok:{proposito}:{token}", usuario_id, ttl)
+        return token
+
+    def consumir_token(self, proposito, token):
+        return self._consumir(f"tok:{proposito}:{token}", INVALIDO, EXPIRADO)["usuario_id"]
+
+    def crear_otp(self, usuario_id, codigo, ttl):
+        self._guardar(f"otp:{usuario_id}", usuario_id, ttl, codigo_hash=hash_codigo(codigo))
+        self.cache.delete(f"otp-intentos:{usuario_id}")
+
+    def consumir_otp(self, usuario_id, codigo):
+        # Cada intento suma antes de comprobar: de N simultáneos solo OTP_MAX_INTENTOS llegan a validar
+        intentos = f"otp-intentos:{usuario_id}"
+        if self._sumar(intentos) > settings.OTP_MAX_INTENTOS:
+            raise ValueError(OTP_BLOQUEADO)
+        clave = f"otp:{usuario_id}"
+        valor = self.cache.get(clave)
+        if not valor or not secrets.compare_digest(valor["codigo_hash"], hash_codigo(codigo.strip())):
+            raise ValueError(OTP_INVALIDO)
+        self._consumir(clave, OTP_INVALIDO, OTP_EXPIRADO)
+        self.cache.delete(intentos)
+
+    def _sumar(self, clave: str) -> int:
+        # add + incr: atómico en Redis y LocMem; el contador vive lo que un OTP
+        self.cache.add(clave, 0, timeout=settings.OTP_TTL_MINUTOS * 60)
+        try:
+            return self.cache.incr(clave)
+        except ValueError:  # expiró entre add e incr
+            self.cache.set(clave, 1, timeout=settings.OTP_TTL_MINUTOS * 60)
+            return 1
+
+    def _guardar(self, clave: str, usuario_id: int, ttl: timedelta, **extra) -> None:
+        segundos = ttl.total_seconds()
+        valor = {"usuario_id": usuario_id, "expira": time.time() + segundos, **extra}
+        self.cache.set(clave, valor, timeout=segundos + _GRACIA)
+
+    def _consumir(self, clave: str, invalido: str, expirado: str) -> dict:
+        valor = self.cache.get(clave)
+        if not valor:
+            raise ValueError(invalido)
+        if time.time() > valor["expira"]:
+            raise ValueError(expirado)
+        if not self.cache.delete(clave):  # solo una petición borra la clave: esa lo consume
+            raise ValueError(invalido)
+        return valor
+
+
+_BACKENDS = {"bd": TokensBD, "cache": TokensCache}
+_backend = None
+
+
+def get_tokens() -> TokensBackend:
+    global _backend
+    if _backend is None:
+        _backend = _BACKENDS[settings.AUTH_TOKENS_BACKEND]()
+    return _backend
@@ -0,0 +1,199 @@
+"""
+Registro write-behind de sesiones: altas de Sesion (login / OTP) y última actividad.
+
+En vez de un INSERT por login y un UPDATE por petición autenticada, se acumulan en memoria y
+un hilo los escribe en lote cada SESIONES_FLUSH_INTERVAL_MS o al llegar a SESIONES_FLUSH_BATCH
+registros: bulk_create para las altas y un único UPDATE ... FROM (VALUES ...) para la actividad.
+
+- La sesión se identifica por el claim `sid` (jti del primer refresh, guardado en
+  refresh_token_jti), que se copia al access y sobrevive a la rotación de refresh.
+- Cota de durabilidad: como mucho un intervalo de flush sin escribir; en un cierre ordenado
+  se vacía el buffer (atexit). Con más de SESIONES_BUFFER_MAX pendientes (BD caída) se descartan
+  primero las actividades más antiguas y nunca más de esa cantidad en memoria.
+- Si el lote falla se reintenta fila a fila: las que violan una restricción (p. ej. el usuario
+  se borró antes del flush) se descartan; el resto, si la BD sigue fallando, vuelve al buffer.
+- Listar o revocar sesiones vacía antes las altas pendientes del usuario en este proceso
+  (flush(usuario_id)). Las que siguen en el buffer de otro proceso se descartan al escribirlas si
+  el usuario cambió de generación de tokens (revocar-otras, cambio de contraseña): sus tokens ya
+  no valen y no deben aparecer como sesiones activas.
+- SESIONES_WRITE_BEHIND=0: se escribe en el acto, como antes.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from django_app.metrics import SESIONES_DESCARTADAS, SESIONES_FLUSH_DURATION, SESIONES_PENDIENTES
+
+logger = logging.getLogger(__name__)
+
+
+class RegistroSesiones:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._altas: list = []        # (Sesion sin guardar, version_tokens del usuario al emitirla)
+        self._actividad: dict = {}    # sid -> datetime de la última actividad
+        self._ultimo_toque: dict = {}  # sid -> monotonic del último toque aceptado (por proceso)
+        self._despertar = threading.Event()
+        self._hilo = None
+
+    # --- API ---
+
+    def crear(self, sesion) -> None:
+        """Encola el alta de una Sesion (instancia sin guardar)."""
+        if not settings.SESIONES_WRITE_BEHIND:
+            sesion.save()
+            return
+        with self._lock:
+            self._altas.append((sesion, sesion.usuario.version_tokens))
+        self._encolado()
+
+    def tocar(self, sid: str) -> None:
+        """Marca actividad de la sesión `sid`; como mucho una vez cada SESIONES_TOUCH_INTERVAL s."""
+        ahora = time.monotonic()
+        ultimo = self._ultimo_toque.get(sid)
+        if ultimo is not None and ahora - ultimo < settings.SESIONES_TOUCH_INTERVAL:
+            return
+        if len(self._ultimo_toque) > settings.SESIONES_BUFFER_MAX:
+            self._ultimo_toque.clear()
+        self._ultimo_toque[sid] = ahora
+        with self._lock:
+            self._actividad[sid] = timezone.now()
+        if not settings.SESIONES_WRITE_BEHIND:
+            self.flush()
+            return
+        self._encolado()
+
+    def flush(self, usuario_id=None) -> None:
+        """
+        Escribe todo lo pendiente, o solo las altas de `usuario_id` (antes de listar o revocar sus
+        sesiones); si la BD falla lo devuelve al buffer (acotado).
+        """
+        with self._lock:
+            if usuario_id is None:
+                altas, self._altas = self._altas, []
+                actividad, self._actividad = self._actividad, {}
+            else:
+                altas = [a for a in self._altas if a[0].usuario_id == usuario_id]
+                self._altas = [a for a in self._altas if a[0].usuario_id != usuario_id]
+                actividad = {}
+        if not altas and not actividad:
+            return
+        from core.models import Sesion
+
+        inicio = time.perf_counter()
+        try:
+            if usuario_id is None:
+                close_old_connections()  # hilo de flush; con usuario_id es la conexión de la petición
+            with transaction.atomic():
+                if altas:
+                    altas = self._vigentes(altas)
+                    Sesion.objects.bulk_create([s for s, _ in altas], batch_size=settings.SESIONES_FLUSH_BATCH)
+                if actividad:
+                    self._actualizar_actividad(actividad)
+        except Exception:
+            logger.exception("sesiones: flush fallido (%d altas, %d actividades)", len(altas), len(actividad))
+            self._devolver(*self._fila_a_fila(altas, actividad))
+        finally:
+            SESIONES_FLUSH_DURATION.observe(time.perf_counter() - inicio)
+            SESIONES_PENDIENTES.set(self.pendientes())
+
+    def pendientes(self) -> int:
+        return len(self._altas) + len(self._actividad)
+
+    # --- Interno ---
+
+    def _encolado(self) -> None:
+        pendientes = self.pendientes()
+        SESIONES_PENDIENTES.set(pendientes)
+        if pendientes >= settings.SESIONES_FLUSH_BATCH:
+            self._despertar.set()
+        if self._hilo is None or not self._hilo.is_alive():
+            with self._lock:
+                if self._hilo is None or not self._hilo.is_alive():
+                    self._hilo = threading.Thread(target=self._bucle, name="sesiones-flush", daemon=True)
+                    self._hilo.start()
+
+    def _bucle(self) -> None:
+        intervalo = settings.SESIONES_FLUSH_INTERVAL_MS / 1000
+        while True:
+            self._despertar.wait(intervalo)
+            self._despertar.clear()
+            self.flush()
+
+    def _fila_a_fila(self, altas: list, actividad: dict) -> tuple:
+        """Reintento tras un lote fallido. Devuelve (altas, actividad) que quedan pendientes."""
+        for i, (sesion, _) in enumerate(altas):
+            try:
+                with transaction.atomic():
+                    type(sesion).objects.bulk_create([sesion])
+            except IntegrityError:
+                logger.warning("sesiones: alta descartada (usuario %s): viola una restricción", sesion.usuario_id)
+                SESIONES_DESCARTADAS.labels(motivo="integridad").inc()
+            except Exception:
+                return altas[i:], actividad  # la BD sigue fallando: lo que queda vuelve al buffer
+        if actividad:
+            try:
+                with transaction.atomic():
+                    self._actualizar_actividad(actividad)
+            except IntegrityError:
+                logger.warning("sesiones: %d actividades descartadas: violan una restricción", len(actividad))
+                SESIONES_DESCARTADAS.labels(motivo="integridad").inc(len(actividad))
+            except Exception:
+                return [], actividad
+        return [], {}
+
+    def _devolver(self, altas: list, actividad: dict) -> None:
+        with self._lock:
+            self._altas = altas + self._altas
+            for sid, cuando in actividad.items():
+                self._actividad.setdefault(sid, cuando)
+            # Cota de memoria: primero se pierden actividades (las más antiguas), luego altas
+            sobran = self.pendientes() - settings.SESIONES_BUFFER_MAX
+            if sobran > 0:
+                SESIONES_DESCARTADAS.labels(motivo="buffer").inc(sobran)
+                for sid, _ in sorted(self._actividad.items(), key=lambda kv: kv[1])[:sobran]:
+                    del self._actividad[sid]
+                sobran = self.pendientes() - settings.SESIONES_BUFFER_MAX
+                if sobran > 0:
+                    del self._altas[:sobran]
+                logger.warning("sesiones: buffer lleno, descartados registros pendientes")
+
+    @staticmethod
+    def _vigentes(altas: list) -> list:
+        """Descarta las altas de usuarios que cambiaron de generación de tokens (o ya no existen)."""
+        from core.models import Usuario
+
+        ids = {sesion.usuario_id for sesion, _ in altas}
+        # FOR UPDATE: serializa con revocacion.nueva_version hasta el commit del alta
+        versiones = dict(Usuario.objects.select_for_update().filter(pk__in=ids).values_list("pk", "version_tokens"))
+        vigentes = [(sesion, v) for sesion, v in altas if versiones.get(sesion.usuario_id) == v]
+        if len(vigentes) < len(altas):
+            SESIONES_DESCARTADAS.labels(motivo="revocada").inc(len(altas) - len(vigentes))
+        return vigentes
+
+    @staticmethod
+    def _actualizar_actividad(actividad: dict) -> None:
+        from core.models import Sesion
+
+        if connection.vendor != "postgresql":
+            for sid, cuando in actividad.items():
+                Sesion.objects.filter(refresh_token_jti=sid, ultima_actividad__lt=cuando).update(ultima_actividad=cuando)
+            return
+        filas = list(actividad.items())
+        valores = ", ".join(["(%s, %s::timestamptz)"] * len(filas))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE core_sesion AS s SET ultima_actividad = v.cuando "
+                f"FROM (VALUES {valores}) AS v(sid, cuando) "
+                f"WHERE s.refresh_token_jti = v.sid AND s.ultima_actividad < v.cuando",
+                [p for fila in filas for p in fila],
+            )
+
+
+registro_sesiones = RegistroSesiones()
+atexit.register(registro_sesiones.flush)
@@ -0,0 +1,47 @@
+"""
+Señales del módulo 1: aviso de cambios de usuario/perfil/2FA para invalidar caches: el
+snapshot de autenticación (core/snapshot.py) y, en PostgreSQL, la cache de FastAPI, que
+escucha el canal con LISTEN (ver fastapi_app/auth_cache.py). Ambos se invalidan solo tras el
+commit, para que nadie relea datos anteriores al cambio.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import snapshot
+from .models import Perfil, TOTP2FA, Usuario
+
+
+def notificar_cambio_usuario(usuario_id: int) -> None:
+    """Invalida el snapshot y hace pg_notify(canal, usuario_id) al confirmar (esto último solo en PostgreSQL)."""
+    snapshot.invalidar(usuario_id)
+    if connection.vendor != "postgresql":
+        return
+
+    def _notify():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [settings.AUTH_CACHE_NOTIFY_CHANNEL, str(usuario_id)])
+
+    transaction.on_commit(_notify)
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def _usuario_cambiado(sender, instance, **kwargs):
+    # Cubre cambios de rol (admin), contraseña, verificación de email, etc.
+    notificar_cambio_usuario(instance.pk)
+
+
+@receiver(post_save, sender=Perfil)
+@receiver(post_delete, sender=Perfil)
+def _perfil_cambiado(sender, instance, **kwargs):
+    # ProfileService.actualizar_perfil / actualizar_avatar
+    notificar_cambio_usuario(instance.usuario_id)
+
+
+@receiver(post_save, sender=TOTP2FA)
+@receiver(post_delete, sender=TOTP2FA)
+def _2fa_cambiado(sender, instance, **kwargs):
+    # tiene_2fa del snapshot
+    notificar_cambio_usuario(instance.usuario_id)
@@ -0,0 +1,86 @@
+"""
+Snapshot por usuario para autenticar sin leer core_usuario en cada petición (JWTSesionAuthentication).
+
+En la cache de Django (AUTH_TOKENS_CACHE, AUTH_SNAPSHOT_TTL s) se guardan los campos de
+Usuario salvo password y hashes, el rol, el perfil y si tiene 2FA activo. Con él se construye
+un Usuario sin consultas: password, email_hash y phone_hash quedan diferidos, así que
+check_password / set_password los cargan de la BD al usarlos y save() solo escribe lo cargado.
+
+Se invalida al guardar o borrar Usuario, Perfil o TOTP2FA (core/signals.py) y cuando cambia la
+generación de tokens (el snapshot lleva la suya y se compara con el claim `ver`). La cache es
+compartida entre procesos o hay uno solo (settings lo exige fuera de DEBUG), así que la
+invalidación llega a todos en el acto.
+"""
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core.models import Perfil, Rol, TOTP2FA, Usuario
+from django_app.metrics import AUTH_SNAPSHOT
+
+CAMPOS = (
+    "id", "email", "is_active", "is_staff", "is_superuser", "rol_id",
+    "verified_email", "verified_phone", "date_joined", "last_login", "version_tokens",
+)
+CAMPOS_ROL = ("id", "codigo", "nombre")
+CAMPOS_PERFIL = tuple(f.attname for f in Perfil._meta.concrete_fields)
+
+
+def _cache():
+    return caches[settings.AUTH_TOKENS_CACHE]
+
+
+def _clave(usuario_id) -> str:
+    return f"usrsnap:{usuario_id}"
+
+
+def _leer(usuario_id) -> Optional[dict]:
+    usuario = Usuario.objects.filter(pk=usuario_id).values(*CAMPOS).first()
+    if usuario is None:
+        return None
+    return {
+        "usuario": usuario,
+        "rol": Rol.objects.filter(pk=usuario["rol_id"]).values(*CAMPOS_ROL).first() if usuario["rol_id"] else None,
+        "perfil": Perfil.objects.filter(usuario_id=usuario_id).values(*CAMPOS_PERFIL).first(),
+        "tiene_2fa": TOTP2FA.objects.filter(usuario_id=usuario_id, activo=True).exists(),
+    }
+
+
+def _instancia(modelo, datos: dict):
+    # from_db espera los valores en el orden de los campos del modelo; los que faltan quedan diferidos
+    campos = [f.attname for f in modelo._meta.concrete_fields if f.attname in datos]
+    return modelo.from_db(DEFAULT_DB_ALIAS, campos, [datos[c] for c in campos])
+
+
+def _construir(snap: dict) -> Usuario:
+    usuario = _instancia(Usuario, snap["usuario"])
+    if snap["rol"]:
+        usuario.rol = _instancia(Rol, snap["rol"])
+    perfil = None
+    if snap["perfil"]:
+        perfil = _instancia(Perfil, snap["perfil"])
+        Perfil.usuario.field.set_cached_value(perfil, usuario)
+    Usuario.perfil.related.set_cached_value(usuario, perfil)
+    usuario.tiene_2fa = snap["tiene_2fa"]
+    return usuario
+
+
+def obtener(usuario_id, version: int) -> Optional[Usuario]:
+    """Usuario del snapshot (sin consultas si está en cache y es de la generación `version`)."""
+    snap = _cache().get(_clave(usuario_id))
+    if snap is not None and snap["usuario"]["version_tokens"] == version:
+        AUTH_SNAPSHOT.labels("hit").inc()
+    else:
+        AUTH_SNAPSHOT.labels("miss").inc()
+        snap = _leer(usuario_id)
+        if snap is None:
+            return None
+        _cache().set(_clave(usuario_id), snap, timeout=settings.AUTH_SNAPSHOT_TTL)
+    return _construir(snap)
+
+
+def invalidar(usuario_id) -> None:
+    """Descarta el snapshot al confirmar la transacción actual."""
+    transaction.on_commit(lambda: _cache().delete(_clave(usuario_id)))
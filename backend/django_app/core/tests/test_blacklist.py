@@ -0,0 +1,85 @@
+"""
+Blacklist de refresh tokens con filtro de Bloom (core/blacklist.py).
+Uso: python manage.py test core.tests.test_blacklist
+
+Un FiltroBlacklist propio por caso y sin hilo de sincronización: se sincroniza a mano con la
+conexión del test.
+"""
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from core.blacklist import Bloom, FiltroBlacklist
+
+User = get_user_model()
+
+
+class BloomTests(TestCase):
+    def test_sin_falsos_negativos_y_falsos_positivos_acotados(self):
+        bloom = Bloom(capacidad=1000, error=0.01)
+        dentro = [uuid.uuid4().hex for _ in range(1000)]
+        for jti in dentro:
+            bloom.añadir(jti)
+        self.assertTrue(all(jti in bloom for jti in dentro))
+        falsos = sum(uuid.uuid4().hex in bloom for _ in range(5000))
+        self.assertLess(falsos, 5000 * 0.03)
+
+
+@override_settings(BLACKLIST_ROTACION_BD=False, BLACKLIST_FLUSH_BATCH=10_000)
+class FiltroBlacklistTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="blacklist@test.invalid")
+        self.exp = int(time.time()) + 3600
+        self.filtro = FiltroBlacklist()
+        self.filtro._arrancar = lambda: None
+        caches[settings.AUTH_TOKENS_CACHE].clear()
+
+    def _en_bd(self, jti: str) -> None:
+        token = OutstandingToken.objects.create(
+            jti=jti, user=self.user, token="t", created_at=timezone.now(),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        BlacklistedToken.objects.create(token=token)
+
+    def test_sin_cargar_consulta_la_bd(self):
+        self._en_bd("revocado")
+        with self.assertNumQueries(1):
+            self.assertTrue(self.filtro.contiene("revocado", self.exp))
+
+    def test_no_esta_no_toca_la_bd(self):
+        self.filtro._sincronizar()
+        with self.assertNumQueries(0):
+            self.assertFalse(self.filtro.contiene("nuevo", self.exp))
+
+    def test_revocado_en_la_bd_se_confirma_en_la_bd(self):
+        self._en_bd("revocado")
+        self.filtro._sincronizar()
+        with self.assertNumQueries(1):
+            self.assertTrue(self.filtro.contiene("revocado", self.exp))
+
+    def test_revocado_pendiente_sin_bd(self):
+        self.filtro._sincronizar()
+        self.assertTrue(self.filtro.revocar("rotado", self.exp, self.user.pk, "t"))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.filtro.contiene("rotado", self.exp))
+        self.filtro.flush()
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti="rotado").exists())
+
+    def test_falso_positivo_vuelve_a_la_bd(self):
+        self.filtro._sincronizar()
+        self.filtro.revocar("rotado", self.exp, self.user.pk, "t")
+        for filtro in self.filtro._filtros.values():
+            filtro.bits[:] = b"\xff" * len(filtro.bits)  # todo "puede estar"
+        with self.assertNumQueries(1):
+            self.assertFalse(self.filtro.contiene("otro", self.exp))
+
+    def test_segunda_rotacion_del_mismo_refresh_pierde(self):
+        self.assertTrue(self.filtro.revocar("rotado", self.exp, self.user.pk, "t"))
+        self.assertFalse(FiltroBlacklist().revocar("rotado", self.exp, self.user.pk, "t"))  # otro proceso
@@ -0,0 +1,61 @@
+"""
+Expresiones cron de las tareas periódicas (core/jobs/cola.py: Cron).
+Uso: python manage.py test core.tests.test_cron
+"""
+from datetime import datetime
+
+from django.test import SimpleTestCase
+
+from core.jobs.cola import Cron
+
+# (campo, valor, rango, valores esperados) — se prueba cada campo con el resto a `*`
+CAMPOS = [
+    ("minutos", "*/15", "{} * * * *", {0, 15, 30, 45}),
+    ("minutos", "5/20", "{} * * * *", {5, 25, 45}),
+    ("minutos", "10-20/5", "{} * * * *", {10, 15, 20}),
+    ("minutos", "1,2,40-42", "{} * * * *", {1, 2, 40, 41, 42}),
+    ("horas", "22/1", "* {} * * *", {22, 23}),
+    ("dias", "*/10", "* * {} * *", {1, 11, 21, 31}),
+    ("meses", "3-12/3", "* * * {} *", {3, 6, 9, 12}),
+    ("dias_semana", "0", "* * * * {}", {0}),
+    ("dias_semana", "7", "* * * * {}", {0}),
+    ("dias_semana", "5-7", "* * * * {}", {5, 6, 0}),
+    ("dias_semana", "*", "* * * * {}", {0, 1, 2, 3, 4, 5, 6}),
+]
+
+# (expresión, momento, coincide)
+MOMENTOS = [
+    ("0 0 * * 0", "2026-10-18 00:00", True),   # domingo
+    ("0 0 * * 7", "2026-10-18 00:00", True),
+    ("0 0 * * 7", "2026-10-19 00:00", False),
+    # día del mes y día de la semana restringidos: basta con uno (13 o viernes)
+    ("0 0 13 * 5", "2026-11-13 00:00", True),   # viernes 13
+    ("0 0 13 * 5", "2026-11-20 00:00", True),   # viernes
+    ("0 0 13 * 5", "2026-10-13 00:00", True),   # martes 13
+    ("0 0 13 * 5", "2026-11-16 00:00", False),
+    # `*/n` empieza por `*`: no cuenta como restringido, así que hacen falta los dos
+    ("0 0 */2 * 1", "2026-11-09 00:00", True),  # lunes impar
+    ("0 0 */2 * 1", "2026-11-02 00:00", False),  # lunes par
+    ("0 0 */2 * 1", "2026-11-03 00:00", False),  # impar, martes
+    ("30 8 * * 1-5", "2026-11-16 08:30", True),
+    ("30 8 * * 1-5", "2026-11-16 08:31", False),
+]
+
+INVALIDAS = ["* * * *", "*/0 * * * *", "60 * * * *", "* 24 * * *", "* * 0 * *", "* * * 13 *", "* * * * 8", "5-1 * * * *"]
+
+
+class CronTests(SimpleTestCase):
+    def test_campos(self):
+        for atributo, valor, plantilla, esperados in CAMPOS:
+            with self.subTest(valor=valor, campo=atributo):
+                self.assertEqual(getattr(Cron(plantilla.format(valor)), atributo), esperados)
+
+    def test_coincide(self):
+        for expresion, momento, esperado in MOMENTOS:
+            with self.subTest(expresion=expresion, momento=momento):
+                self.assertIs(Cron(expresion).coincide(datetime.fromisoformat(momento)), esperado)
+
+    def test_invalidas(self):
+        for expresion in INVALIDAS:
+            with self.subTest(expresion=expresion), self.assertRaises(ValueError):
+                Cron(expresion)
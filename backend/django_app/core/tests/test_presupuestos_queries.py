@@ -0,0 +1,217 @@
+"""
+Presupuesto de queries de todas las rutas de core (PRESUPUESTOS_QUERIES en core/urls.py).
+Uso: python manage.py test core.tests.test_presupuestos_queries
+
+Cada caso crea su propio usuario de prueba y prepara fuera de la medición lo que necesita
+(tokens, OTP, 2FA, snapshot del usuario en cache); solo se cuentan las queries de la petición.
+Falla si alguna ruta supera su presupuesto o si en core/urls.py hay rutas sin presupuesto o sin
+caso. Se cuenta con el mismo contador que MetricsMiddleware (request.contador_queries) y no con
+assertNumQueries, que también cuenta los COMMIT; y como máximo, porque en PostgreSQL el BEGIN no
+cuenta. TransactionTestCase para que atomic() abra una transacción real y no un savepoint, que
+contaría de más.
+"""
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+
+import pyotp
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from core import urls as core_urls
+from core.blacklist import filtro_blacklist
+from core.models import Perfil, Rol, Sesion
+from core.services import AuthService
+from core.services.tokens import get_tokens
+
+User = get_user_model()
+
+PASSWORD = "Presupuesto-2024"
+BASE = "/api/auth/"
+# PNG 1x1 para la subida de avatar
+PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+
+
+class _Entorno:
+    """Usuarios de prueba y cliente; nada de lo que hace cuenta para el presupuesto."""
+
+    def __init__(self):
+        self.client = APIClient()
+        self.hash = make_password(PASSWORD)
+        self.rol = Rol.objects.filter(codigo="viewer").first()
+
+    def email(self) -> str:
+        return f"{uuid.uuid4().hex[:12]}@presupuestos.invalid"
+
+    def usuario(self) -> User:
+        user = User.objects.create(email=self.email(), password=self.hash, rol=self.rol, verified_email=True)
+        Perfil.objects.create(usuario=user, nombre="Presupuesto")
+        return user
+
+    def sesion(self, user=None) -> tuple:
+        """(usuario, tokens, cabecera Authorization) con el snapshot ya en cache."""
+        user = user or self.usuario()
+        tokens = AuthService.tokens_para_usuario(user)
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {tokens['access']}"}
+        self.client.get(f"{BASE}me/", **auth)
+        return user, tokens, auth
+
+
+# Casos: preparación (sin contar) que devuelve (método, ruta, datos, extra) de la petición medida
+
+def _registro(e):
+    datos = {"email": e.email(), "password": PASSWORD, "password_confirm": PASSWORD, "aceptar_terminos": True}
+    return "post", "registro/", datos, {}
+
+
+def _login(e):
+    return "post", "login/", {"email": e.usuario().email, "password": PASSWORD}, {}
+
+
+def _verificar_email(e):
+    token = get_tokens().crear_token("verificacion", e.usuario().pk, timedelta(hours=1))
+    return "post", "verificar-email/", {"token": token}, {}
+
+
+def _verificar_otp(e):
+    user = e.usuario()
+    get_tokens().crear_otp(user.pk, "123456", timedelta(minutes=10))
+    return "post", "verificar-otp/", {"usuario_id": user.pk, "codigo": "123456"}, {}
+
+
+def _restablecer_solicitar(e):
+    return "post", "restablecer-password/solicitar/", {"email": e.usuario().email}, {}
+
+
+def _restablecer(e):
+    token = get_tokens().crear_token("restablecer", e.usuario().pk, timedelta(hours=1))
+    return "post", "restablecer-password/", {
+        "token": token, "nueva_password": PASSWORD, "nueva_password_confirm": PASSWORD,
+    }, {}
+
+
+def _refresh(e):
+    return "post", "token/refresh/", {"refresh": e.sesion()[1]["refresh"]}, {}
+
+
+def _get(ruta):
+    return lambda e: ("get", ruta, None, e.sesion()[2])
+
+
+def _cambiar_password(e):
+    datos = {"password_actual": PASSWORD, "nueva_password": PASSWORD, "nueva_password_confirm": PASSWORD}
+    return "post", "cambiar-password/", datos, e.sesion()[2]
+
+
+def _perfil_actualizar(e):
+    return "patch", "perfil/actualizar/", {"nombre": "Otro"}, e.sesion()[2]
+
+
+def _perfil_avatar(e):
+    archivo = SimpleUploadedFile("a.png", PNG, content_type="image/png")
+    return "post", "perfil/avatar/", {"avatar": archivo}, {**e.sesion()[2], "format": "multipart"}
+
+
+def _sesiones_revocar(e):
+    user, _, auth = e.sesion()
+    e.sesion(user)  # la que se revoca
+    sesion_id = Sesion.objects.filter(usuario=user).order_by("-id").values_list("pk", flat=True)[0]
+    return "post", f"sesiones/{sesion_id}/revocar/", None, auth
+
+
+def _sesiones_revocar_otras(e):
+    user, _, auth = e.sesion()
+    e.sesion(user)
+    return "post", "sesiones/revocar-otras/", None, auth
+
+
+def _2fa_activar(e):
+    secret = pyotp.random_base32()
+    return "post", "2fa/activar/", {"secret": secret, "codigo": pyotp.TOTP(secret).now()}, e.sesion()[2]
+
+
+def _2fa_desactivar(e):
+    user = e.usuario()
+    secret = pyotp.random_base32()
+    AuthService.activar_2fa(user, secret, pyotp.TOTP(secret).now())
+    return "post", "2fa/desactivar/", {"codigo": pyotp.TOTP(secret).now()}, e.sesion(user)[2]
+
+
+CASOS = {
+    "auth-registro": _registro,
+    "auth-login": _login,
+    "auth-verificar-email": _verificar_email,
+    "auth-verificar-otp": _verificar_otp,
+    "auth-restablecer-solicitar": _restablecer_solicitar,
+    "auth-restablecer": _restablecer,
+    "token_refresh": _refresh,
+    "auth-me": _get("me/"),
+    "auth-cambiar-password": _cambiar_password,
+    "perfil-list": _get("perfil/"),
+    "perfil-actualizar": _perfil_actualizar,
+    "perfil-avatar": _perfil_avatar,
+    "sesiones-list": _get("sesiones/"),
+    "sesiones-revocar": _sesiones_revocar,
+    "sesiones-revocar-otras": _sesiones_revocar_otras,
+    "2fa-setup": _get("2fa/setup/"),
+    "2fa-activar": _2fa_activar,
+    "2fa-estado": _get("2fa/estado/"),
+    "2fa-desactivar": _2fa_desactivar,
+    "api-root": _get(""),
+}
+
+
+def _rutas(patrones) -> set:
+    nombres = set()
+    for p in patrones:
+        if hasattr(p, "url_patterns"):
+            nombres |= _rutas(p.url_patterns)
+        elif p.name:
+            nombres.add(p.name)
+    return nombres
+
+
+# Sesiones síncronas: las altas del buffer write-behind se escribirían fuera de la medición
+@override_settings(SESIONES_WRITE_BEHIND=False, QUERY_BUDGET_ESTRICTO=False, EMAIL_OUTBOX_WORKERS=0)
+class PresupuestosQueriesTests(TransactionTestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        if settings.BLACKLIST_FILTRO:
+            filtro_blacklist.esperar_carga()  # hasta entonces el refresh consulta la BD
+            self.addCleanup(filtro_blacklist.flush)
+        self.entorno = _Entorno()
+
+    def test_todas_las_rutas_tienen_presupuesto_y_caso(self):
+        rutas = _rutas(core_urls.urlpatterns)
+        self.assertEqual(rutas - set(core_urls.PRESUPUESTOS_QUERIES), set(), "rutas sin presupuesto")
+        self.assertEqual(rutas - set(CASOS), set(), "rutas sin caso")
+
+    def test_rutas_dentro_de_presupuesto(self):
+        for nombre in sorted(_rutas(core_urls.urlpatterns) & set(CASOS)):
+            with self.subTest(ruta=nombre):
+                self._medir(nombre, core_urls.PRESUPUESTOS_QUERIES[nombre])
+
+    def _medir(self, nombre: str, presupuesto: int) -> None:
+        metodo, ruta, datos, extra = CASOS[nombre](self.entorno)
+        extra = dict(extra)
+        formato = extra.pop("format", "json")
+        response = getattr(self.entorno.client, metodo)(BASE + ruta, datos, format=formato, **extra)
+        self.assertLess(response.status_code, 400, response.content[:200])
+        contador = response.wsgi_request.contador_queries
+        sql = "\n".join(f"{n}x {sql[:160]}" for sql, n in contador.sql.items())
+        self.assertLessEqual(
+            contador.n, presupuesto,
+            f"{nombre}: {contador.n} queries (presupuesto {presupuesto}); repetidas: {contador.repetidas()}\n{sql}",
+        )
@@ -0,0 +1,44 @@
+"""
+Smoke test de seed_bulk: carga en este proceso (--workers 0) sobre la BD de test.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.models import CodigoRespaldo2FA, Perfil, TOTP2FA, Usuario
+
+USUARIOS = 200  # con la semilla 3, suficientes para que algunos tengan 2FA (P_2FA = 8 %)
+
+
+def _seed(**opciones) -> str:
+    salida = StringIO()
+    call_command(
+        "seed_bulk", usuarios=USUARIOS, chunk=50, workers=0, seed=3, passwords=1, hasta="2026-10-01",
+        stdout=salida, **opciones,
+    )
+    return salida.getvalue()
+
+
+class SeedBulkTests(TestCase):
+    def setUp(self):
+        call_command("seed_auth", stdout=StringIO())
+
+    def test_carga_usuarios_con_perfil_y_2fa(self):
+        _seed()
+        usuarios = Usuario.objects.filter(email__endswith="@bulk.invalid")
+        self.assertEqual(usuarios.count(), USUARIOS)
+        self.assertEqual(Perfil.objects.filter(usuario__in=usuarios).count(), USUARIOS)
+        self.assertTrue(TOTP2FA.objects.filter(usuario__in=usuarios).exists())
+        self.assertTrue(CodigoRespaldo2FA.objects.filter(totp__usuario__in=usuarios).exists())
+
+    def test_misma_semilla_sin_borrar_falla_y_con_borrar_repite(self):
+        _seed()
+        emails = set(Usuario.objects.filter(email__endswith="@bulk.invalid").values_list("email", flat=True))
+        with self.assertRaisesMessage(CommandError, "--borrar"):
+            _seed()
+        _seed(borrar=True)
+        self.assertEqual(
+            set(Usuario.objects.filter(email__endswith="@bulk.invalid").values_list("email", flat=True)), emails
+        )
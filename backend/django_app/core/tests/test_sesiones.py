@@ -0,0 +1,74 @@
+"""
+Registro write-behind de sesiones (core/sesiones.py) frente a listar y revocar.
+Uso: python manage.py test core.tests.test_sesiones
+
+Cada registro hace de un proceso: las altas quedan en su buffer (el intervalo de flush es largo
+para que el hilo no escriba durante la prueba) hasta que algo las vacía.
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import UntypedToken
+
+from core.models import Sesion
+from core.services import AuthService
+from core.sesiones import RegistroSesiones
+
+User = get_user_model()
+
+
+@override_settings(
+    SESIONES_WRITE_BEHIND=True, SESIONES_FLUSH_INTERVAL_MS=600_000, BLACKLIST_FILTRO=False, EMAIL_OUTBOX_WORKERS=0
+)
+class SesionesWriteBehindTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="sesiones@test.invalid", verified_email=True)
+        self.registro = RegistroSesiones()
+        parche = mock.patch("core.services.auth_service.registro_sesiones", self.registro)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _login(self, registro=None) -> str:
+        """Abre una sesión en `registro` (por defecto el de este "proceso"); devuelve su sid."""
+        with mock.patch("core.services.auth_service.registro_sesiones", registro or self.registro):
+            tokens = AuthService.tokens_para_usuario(self.user)
+        return UntypedToken(tokens["access"])["sid"]
+
+    def test_listar_incluye_altas_pendientes(self):
+        sid = self._login()
+        self.assertFalse(Sesion.objects.exists())
+        self.assertEqual([s.refresh_token_jti for s in AuthService.listar_sesiones(self.user)], [sid])
+        self.assertEqual(self.registro.pendientes(), 0)
+
+    def test_revocar_sesion_recien_creada(self):
+        sid = self._login()
+        (sesion,) = AuthService.listar_sesiones(self.user)  # el id llega al cliente al listar
+        AuthService.revocar_sesion(self.user, sesion.pk)
+        self.assertEqual(sesion.refresh_token_jti, sid)
+        self.assertFalse(Sesion.objects.exists())
+
+    def test_revocar_otras_incluye_altas_pendientes(self):
+        actual = self._login()
+        self._login()
+        self._login()
+        self.assertEqual(AuthService.revocar_otras_sesiones(self.user, excluir_sid=actual), 2)
+        self.registro.flush()
+        self.assertEqual(list(Sesion.objects.values_list("refresh_token_jti", flat=True)), [actual])
+
+    def test_alta_de_otro_proceso_tras_revocar_otras_se_descarta(self):
+        otro_proceso = RegistroSesiones()
+        actual = self._login()
+        self._login(otro_proceso)
+        AuthService.revocar_otras_sesiones(self.user, excluir_sid=actual)
+        otro_proceso.flush()
+        self.assertEqual(otro_proceso.pendientes(), 0)
+        self.assertEqual(list(Sesion.objects.values_list("refresh_token_jti", flat=True)), [actual])
+
+    def test_solo_vacia_las_altas_del_usuario(self):
+        otro = User.objects.create(email="otro@test.invalid", verified_email=True)
+        self._login()
+        AuthService.tokens_para_usuario(otro)
+        AuthService.listar_sesiones(otro)
+        self.assertEqual(self.registro.pendientes(), 1)
+        self.assertEqual(list(Sesion.objects.values_list("usuario_id", flat=True)), [otro.pk])
@@ -0,0 +1,121 @@
+"""
+Motor de envío del outbox (core/jobs/smtp.py) contra el SMTP local de `manage.py smtp_sink`.
+Uso: python manage.py test core.tests.test_smtp
+
+El sink corre en un hilo con su propio event loop en un puerto libre; cuenta conexiones y mensajes.
+"""
+import asyncio
+import socket
+import threading
+import time
+from io import StringIO
+
+from django.test import SimpleTestCase, override_settings
+
+from core.jobs.smtp import MotorEmail
+from core.management.commands.smtp_sink import Command as SmtpSink
+from core.models import EmailSaliente
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class SmtpSinkTestCase(SimpleTestCase):
+    fallar_cada = 0
+
+    def setUp(self):
+        self.puerto = _puerto_libre()
+        self.sink = SmtpSink(stdout=StringIO())
+        self.sink.latencia, self.sink.fallar_cada = 0.0, self.fallar_cada
+        self.sink.conexiones = self.sink.mensajes = 0
+        self.loop = asyncio.new_event_loop()
+        servir = self.loop.create_task(self.sink._servir("127.0.0.1", self.puerto))
+
+        def correr():
+            try:
+                self.loop.run_until_complete(servir)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self.loop.close()
+
+        hilo = threading.Thread(target=correr, daemon=True)
+        hilo.start()
+
+        def parar():
+            self.loop.call_soon_threadsafe(servir.cancel)
+            hilo.join(5)
+
+        self.addCleanup(parar)
+        self._esperar_sink()
+        ajustes = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=self.puerto,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+            EMAIL_TIMEOUT=5,
+            EMAIL_SMTP_POOL_SIZE=1,
+            EMAIL_SMTP_BATCH=10,
+            EMAIL_THROTTLE_POR_DOMINIO=0,
+            EMAIL_THROTTLE_DOMINIOS="lento.invalid=2",
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.motor = MotorEmail()
+        self.addCleanup(self.motor.pool.cerrar)
+
+    def _esperar_sink(self) -> None:
+        """Una conexión de prueba, y a cero el contador cuando el sink la haya atendido."""
+        limite = time.monotonic() + 5
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", self.puerto), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > limite:
+                    raise
+                time.sleep(0.02)
+        while not self.sink.conexiones and time.monotonic() < limite:
+            time.sleep(0.01)
+        self.sink.conexiones = 0
+
+    @staticmethod
+    def _emails(n: int, dominio: str = "test.invalid") -> list:
+        return [
+            EmailSaliente(tipo="otp", destinatario=f"u{i}@{dominio}", remitente="no-reply@test.invalid",
+                          asunto="Código", cuerpo="123456")
+            for i in range(n)
+        ]
+
+
+class MotorEmailTests(SmtpSinkTestCase):
+    def test_lotes_sobre_una_conexion_reutilizada(self):
+        resultados = self.motor.enviar(self._emails(25))  # 3 lotes de hasta 10
+        self.assertEqual([r.error for r in resultados], [None] * 25)
+        self.assertEqual(self.sink.mensajes, 25)
+        self.assertEqual(self.sink.conexiones, 1)
+        self.motor.enviar(self._emails(5))  # el pool la conserva entre llamadas
+        self.assertEqual(self.sink.conexiones, 1)
+
+    def test_ritmo_por_dominio_aplaza_sin_intentar(self):
+        resultados = self.motor.enviar(self._emails(5, "lento.invalid") + self._emails(2))
+        aplazados = [r for r in resultados if r.aplazar]
+        self.assertEqual(len(aplazados), 3)  # ráfaga de 2 en lento.invalid
+        self.assertTrue(all(r.email.destinatario.endswith("@lento.invalid") for r in aplazados))
+        self.assertEqual(self.sink.mensajes, 4)
+
+
+class MotorEmailRechazosTests(SmtpSinkTestCase):
+    fallar_cada = 4
+
+    def test_un_rechazo_no_corta_el_lote(self):
+        resultados = self.motor.enviar(self._emails(10))
+        fallidos = [r.email.destinatario for r in resultados if r.error]
+        self.assertEqual(fallidos, ["u3@test.invalid", "u7@test.invalid"])
+        self.assertEqual(self.sink.mensajes, 10)
+        self.assertEqual(self.sink.conexiones, 1)
@@ -27,3 +27,30 @@ urlpatterns = [
     path("cambiar-password/", views.CambiarPasswordView.as_view(), name="auth-cambiar-password"),
     path("", include(router.urls)),
 ]
+
+# Máximo de queries por petición, medido con el snapshot del usuario en cache y la configuración
+# por defecto; en PostgreSQL el BEGIN no cuenta. El proyecto lo registra en su MetricsMiddleware
+# y core/tests/test_presupuestos_queries.py los verifica todos: una ruta nueva necesita
+# presupuesto y caso.
+PRESUPUESTOS_QUERIES = {
+    "auth-registro": 6,
+    "auth-login": 2,
+    "auth-verificar-email": 7,
+    "auth-verificar-otp": 3,
+    "auth-restablecer-solicitar": 4,
+    "auth-restablecer": 6,
+    "token_refresh": 5,
+    "auth-me": 0,
+    "auth-cambiar-password": 4,
+    "perfil-list": 0,
+    "perfil-actualizar": 1,
+    "perfil-avatar": 1,
+    "sesiones-list": 1,
+    "sesiones-revocar": 4,
+    "sesiones-revocar-otras": 3,
+    "2fa-setup": 0,
+    "2fa-activar": 9,
+    "2fa-estado": 0,
+    "2fa-desactivar": 5,
+    "api-root": 0,
+}
@@ -46,6 +46,12 @@ def _request_meta(request):
     }
 
 
+def _tokens_sesion_actual(request) -> dict:
+    """Tras subir la generación de tokens, access + refresh nuevos para la sesión de la petición."""
+    sid = request.auth.get("sid") if request.auth else None
+    return AuthService.renovar_tokens(request.user, str(sid)) if sid else {}
+
+
 # --- Registro (público) ---
 class RegistroView(APIView):
     permission_classes = [AllowAny]
@@ -114,7 +120,7 @@ class LoginView(APIView):
         ser.is_valid(raise_exception=True)
         email = ser.validated_data["email"]
         password = ser.validated_data["password"]
-        user = User.objects.filter(email__iexact=email).first()
+        user = User.objects.por_email(email).select_related("rol").first()  # rol: claims del token
         if not user or not user.check_password(password):
             return Response({"detail": "Credenciales incorrectas."}, status=status.HTTP_401_UNAUTHORIZED)
         if not user.is_active:
@@ -178,7 +184,8 @@ class CambiarPasswordView(APIView):
             )
         except ValueError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        return Response({"detail": "Contraseña actualizada."})
+        # Las demás sesiones quedan cerradas; esta sigue con tokens nuevos
+        return Response({"detail": "Contraseña actualizada.", **_tokens_sesion_actual(request)})
 
 
 # --- Perfil (autenticado) ---
@@ -201,11 +208,8 @@ class PerfilViewSet(GenericViewSet):
         """PATCH /api/auth/perfil/actualizar/ — actualizar nombre, apellido, teléfonos."""
         ser = ActualizarPerfilSerializer(data=request.data, partial=True)
         ser.is_valid(raise_exception=True)
-        ProfileService.actualizar_perfil(request.user, **ser.validated_data)
-        perfil = getattr(request.user, "perfil", None)
-        if perfil:
-            perfil.refresh_from_db()
-        return Response(PerfilSerializer(perfil).data if perfil else {})
+        perfil = ProfileService.actualizar_perfil(request.user, **ser.validated_data)
+        return Response(PerfilSerializer(perfil).data)
 
     @action(detail=False, methods=["post"], url_path="avatar")
     def avatar(self, request):
@@ -213,9 +217,8 @@ class PerfilViewSet(GenericViewSet):
         archivo = request.FILES.get("avatar")
         if not archivo:
             return Response({"detail": "Falta el archivo 'avatar'."}, status=status.HTTP_400_BAD_REQUEST)
-        ProfileService.actualizar_avatar(request.user, archivo)
-        perfil = getattr(request.user, "perfil", None)
-        return Response(PerfilSerializer(perfil).data if perfil else {})
+        perfil = ProfileService.actualizar_avatar(request.user, archivo)
+        return Response(PerfilSerializer(perfil).data)
 
 
 # --- Sesiones (autenticado) ---
@@ -227,8 +230,7 @@ class SesionesViewSet(GenericViewSet):
 
     def list(self, request):
         """GET /api/auth/sesiones/ — listar sesiones activas."""
-        qs = self.get_queryset().order_by("-ultima_actividad")
-        ser = SesionSerializer(qs, many=True)
+        ser = SesionSerializer(AuthService.listar_sesiones(request.user), many=True)
         return Response(ser.data)
 
     @action(detail=True, methods=["post"], url_path="revocar")
@@ -242,9 +244,10 @@ class SesionesViewSet(GenericViewSet):
 
     @action(detail=False, methods=["post"], url_path="revocar-otras")
     def revocar_otras(self, request):
-        """POST /api/auth/sesiones/revocar-otras/ — revocar todas excepto la actual (por jti no implementado aquí, revoca todas)."""
-        n = AuthService.revocar_otras_sesiones(request.user)
-        return Response({"detail": f"Se revocaron {n} sesión(es)."})
+        """POST /api/auth/sesiones/revocar-otras/ — revocar todas excepto la actual (devuelve sus tokens nuevos)."""
+        sid = request.auth.get("sid") if request.auth else None
+        n = AuthService.revocar_otras_sesiones(request.user, excluir_sid=str(sid or ""))
+        return Response({"detail": f"Se revocaron {n} sesión(es).", **_tokens_sesion_actual(request)})
 
 
 # --- 2FA (autenticado) ---
@@ -277,12 +280,14 @@ class TwoFAViewSet(GenericViewSet):
             )
         except ValueError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        return Response({"detail": "2FA activado.", "backup_codes": backup_codes})
+        return Response({"detail": "2FA activado.", "backup_codes": backup_codes, **_tokens_sesion_actual(request)})
 
     @action(detail=False, methods=["get"], url_path="estado")
     def estado(self, request):
         """GET /api/auth/2fa/estado/ — saber si el usuario tiene 2FA activo."""
-        tiene = TOTP2FA.objects.filter(usuario=request.user, activo=True).exists()
+        tiene = getattr(request.user, "tiene_2fa", None)  # del snapshot de autenticación
+        if tiene is None:
+            tiene = TOTP2FA.objects.filter(usuario=request.user, activo=True).exists()
         return Response({"tiene_2fa": tiene})
 
     @action(detail=False, methods=["post"], url_path="desactivar")
@@ -294,4 +299,4 @@ class TwoFAViewSet(GenericViewSet):
             AuthService.desactivar_2fa(request.user, ser.validated_data["codigo"])
         except ValueError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        return Response({"detail": "2FA desactivado."})
+        return Response({"detail": "2FA desactivado.", **_tokens_sesion_actual(request)})
@@ -10,6 +10,7 @@ def root(request):
         "service": "safelease-ai Django",
         "admin": "/admin/",
         "api_health": "/api/health",
+        "metrics": "/metrics",
         "api_auth": "/api/auth/",
     })
 
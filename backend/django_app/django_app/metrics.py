@@ -0,0 +1,267 @@
+"""
+Métricas Prometheus de Django: latencia por ruta, peticiones en vuelo y número/tiempo
+de queries a la BD por petición (para distinguir PBKDF2 de PostgreSQL en un login lento).
+
+Presupuesto de queries: cada app declara el máximo por vista (PRESUPUESTOS_QUERIES en
+core/urls.py) y el proyecto lo registra con registrar_presupuestos() (django_app/urls.py). Si una petición lo supera se cuenta en django_db_query_budget_exceeded_total y,
+con DEBUG, se registra un warning con las SQL repetidas (patrón N+1); con QUERY_BUDGET_ESTRICTO=1
+(desarrollo, CI) además falla con PresupuestoQueriesExcedido. core/tests/test_presupuestos_queries.py
+recorre todas las rutas de core contra sus presupuestos.
+
+Con varios workers (gunicorn -w N) definir PROMETHEUS_MULTIPROC_DIR (directorio vacío,
+escribible y común a los workers); /metrics agrega los valores de todos ellos.
+"""
+import hmac
+import ipaddress
+import logging
+import os
+import time
+from collections import Counter as _Contador
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+logger = logging.getLogger(__name__)
+
+LATENCIA_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_DURATION = Histogram(
+    "django_http_request_duration_seconds",
+    "Latencia total de la petición en Django",
+    ["method", "route", "status"],
+    buckets=LATENCIA_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "django_http_requests_in_flight",
+    "Peticiones en curso en Django",
+    multiprocess_mode="livesum",
+)
+DB_QUERIES = Histogram(
+    "django_db_queries_per_request",
+    "Queries SQL ejecutadas por petición",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+DB_QUERIES_DUPLICADAS = Counter(
+    "django_db_duplicate_queries_total",
+    "Queries con la misma SQL (sin parámetros) repetida dentro de una petición",
+    ["route"],
+)
+DB_PRESUPUESTO_EXCEDIDO = Counter(
+    "django_db_query_budget_exceeded_total",
+    "Peticiones que superan el presupuesto de queries declarado para su vista",
+    ["route"],
+)
+DB_TIME = Histogram(
+    "django_db_query_seconds_per_request",
+    "Tiempo total en queries SQL por petición",
+    ["route"],
+    buckets=LATENCIA_BUCKETS,
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "django_password_hash_seconds",
+    "Hash/verificación de contraseña, incluida la espera por el pool",
+    ["operacion"],
+    buckets=LATENCIA_BUCKETS,
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "django_password_hash_rejected_total",
+    "Hashes rechazados (503) por pool de hashing saturado",
+    ["operacion"],
+)
+
+SESIONES_FLUSH_DURATION = Histogram(
+    "django_sesiones_flush_seconds",
+    "Duración de cada escritura en lote de sesiones (altas + actividad)",
+    buckets=LATENCIA_BUCKETS,
+)
+SESIONES_PENDIENTES = Gauge(
+    "django_sesiones_pendientes",
+    "Altas y actividades de sesión en memoria sin escribir",
+    multiprocess_mode="livesum",
+)
+SESIONES_DESCARTADAS = Counter(
+    "django_sesiones_descartadas_total",
+    "Registros de sesión descartados sin escribir: violan una restricción, sesión revocada o buffer lleno",
+    ["motivo"],
+)
+
+EMAIL_SEND_DURATION = Histogram(
+    "django_email_send_seconds",
+    "Envío de un email por la conexión SMTP del pool",
+    ["resultado"],
+    buckets=LATENCIA_BUCKETS,
+)
+EMAIL_FAILURES = Counter(
+    "django_email_failures_total",
+    "Emails no enviados: rechazo del mensaje o conexión SMTP imposible",
+    ["motivo"],
+)
+EMAIL_THROTTLED = Counter(
+    "django_email_throttled_total",
+    "Emails aplazados por el límite de ritmo por dominio",
+)
+EMAIL_SMTP_CONNECTIONS = Gauge(
+    "django_email_smtp_connections",
+    "Conexiones SMTP abiertas en el pool",
+    multiprocess_mode="livesum",
+)
+
+TAREAS_COLA = Gauge(
+    "django_tareas_cola",
+    "Tareas activas en core_tarea (medido por los workers)",
+    ["estado"],
+    multiprocess_mode="mostrecent",
+)
+TAREAS_ESPERA = Histogram(
+    "django_tareas_espera_seconds",
+    "Desde que la tarea vence hasta que un worker la reclama",
+    ["tarea"],
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+TAREAS_DURACION = Histogram(
+    "django_tareas_duracion_seconds",
+    "Ejecución de una tarea",
+    ["tarea", "resultado"],
+    buckets=LATENCIA_BUCKETS + (30.0, 60.0, 300.0),
+)
+PURGA_FILAS = Counter(
+    "django_purga_filas_total",
+    "Filas caducadas borradas por la purga por lotes",
+    ["tabla"],
+)
+PURGA_DURACION = Histogram(
+    "django_purga_duracion_seconds",
+    "Pasada de purga de una tabla (todos sus lotes)",
+    ["tabla"],
+    buckets=(0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+AUTH_SNAPSHOT = Counter(
+    "django_auth_snapshot_total",
+    "Usuario autenticado desde el snapshot en cache (hit) o leído de la BD (miss)",
+    ["resultado"],
+)
+BLACKLIST_CHECKS = Counter(
+    "django_blacklist_checks_total",
+    "Comprobaciones de refresh en blacklist: memoria (descartado por el filtro), pendiente, bd...",
+    ["resultado"],
+)
+BLACKLIST_PENDIENTES = Gauge(
+    "django_blacklist_pendientes",
+    "OutstandingToken / BlacklistedToken pendientes de escribir en lote",
+    multiprocess_mode="livesum",
+)
+
+
+# nombre de vista (resolver_match.view_name) -> máximo de queries por petición
+PRESUPUESTOS: dict = {}
+
+
+def registrar_presupuestos(presupuestos: dict) -> None:
+    PRESUPUESTOS.update(presupuestos)
+
+
+class PresupuestoQueriesExcedido(Exception):
+    pass
+
+
+class ContadorQueries:
+    """execute_wrapper: cuenta y cronometra las queries de la conexión por defecto; agrupa por SQL."""
+
+    def __init__(self):
+        self.n = 0
+        self.segundos = 0.0
+        self.sql = _Contador()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.n += 1
+            self.segundos += time.perf_counter() - inicio
+            self.sql[sql] += 1
+
+    @property
+    def duplicadas(self) -> int:
+        return sum(n - 1 for n in self.sql.values())
+
+    def repetidas(self, maximo: int = 3) -> list:
+        """[(n, sql)] de las SQL ejecutadas más de una vez, de más a menos."""
+        return [(n, sql) for sql, n in self.sql.most_common(maximo) if n > 1]
+
+
+def _comprobar_presupuesto(request, route: str, contador: ContadorQueries) -> None:
+    match = getattr(request, "resolver_match", None)
+    presupuesto = PRESUPUESTOS.get(match.view_name) if match is not None else None
+    if presupuesto is None or contador.n <= presupuesto:
+        return
+    DB_PRESUPUESTO_EXCEDIDO.labels(route).inc()
+    mensaje = f"{request.method} {route}: {contador.n} queries (presupuesto {presupuesto})"
+    # En producción los fallos de cache (snapshot del usuario) también lo superan: solo la métrica
+    nivel = logging.WARNING if settings.DEBUG or settings.QUERY_BUDGET_ESTRICTO else logging.DEBUG
+    logger.log(nivel, "%s; repetidas: %s", mensaje, contador.repetidas() or "ninguna")
+    if settings.QUERY_BUDGET_ESTRICTO:
+        raise PresupuestoQueriesExcedido(mensaje)
+
+
+def _route(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None or not match.route:
+        return "unmatched"
+    return "/" + match.route.rstrip("$")
+
+
+class MetricsMiddleware:
+    """Primer middleware de MIDDLEWARE: mide la petición completa."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        contador = ContadorQueries()
+        request.contador_queries = contador  # los tests lo leen de response.wsgi_request
+        REQUESTS_IN_FLIGHT.inc()
+        inicio = time.perf_counter()
+        status = 500
+        try:
+            with connection.execute_wrapper(contador):
+                response = self.get_response(request)
+            status = response.status_code
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = _route(request)
+            REQUEST_DURATION.labels(request.method, route, str(status)).observe(time.perf_counter() - inicio)
+            DB_QUERIES.labels(route).observe(contador.n)
+            DB_TIME.labels(route).observe(contador.segundos)
+            if contador.duplicadas:
+                DB_QUERIES_DUPLICADAS.labels(route).inc(contador.duplicadas)
+        _comprobar_presupuesto(request, route, contador)
+        return response
+
+
+def _metrics_permitido(request) -> bool:
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    if token and hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        return True
+    try:
+        ip = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(ip in ipaddress.ip_network(red, strict=False) for red in settings.METRICS_ALLOWED_IPS)
+
+
+def metrics(request):
+    """GET /metrics — formato texto Prometheus (METRICS_ALLOWED_IPS o METRICS_TOKEN; si no, 403)."""
+    if not _metrics_permitido(request):
+        return HttpResponseForbidden("Métricas solo desde METRICS_ALLOWED_IPS o con METRICS_TOKEN.")
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
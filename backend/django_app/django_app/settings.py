@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -57,6 +58,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero: mide la petición completa (latencia, queries por petición) → GET /metrics
+    "django_app.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -67,6 +70,14 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Presupuesto de queries por vista (django_app/metrics.py): 1 = superarlo es un error (desarrollo, CI)
+QUERY_BUDGET_ESTRICTO = os.getenv("QUERY_BUDGET_ESTRICTO", "0") == "1"
+
+# /metrics (django_app/metrics.py): sin token solo desde estas redes (REMOTE_ADDR); con
+# `Authorization: Bearer <METRICS_TOKEN>` desde cualquiera. Mismas variables que FastAPI
+METRICS_ALLOWED_IPS = [r.strip() for r in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1/32,::1/128").split(",") if r.strip()]
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 ROOT_URLCONF = "django_app.urls"
 
 TEMPLATES = [
@@ -102,6 +113,28 @@ DATABASES = {
     }
 }
 
+# Cache: sin URL, memoria por proceso; con redis://... compartida entre procesos (requiere redis-py)
+DJANGO_CACHE_URL = os.getenv("DJANGO_CACHE_URL", "")
+CACHES = {
+    "default": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": DJANGO_CACHE_URL}
+        if DJANGO_CACHE_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    ),
+}
+# La revocación de tokens (core/revocacion.py), el snapshot del usuario (core/snapshot.py) y la
+# rotación de refresh (core/blacklist.py) fían la cache: con varios procesos tiene que ser
+# compartida. DJANGO_CACHE_LOCAL=1 declara un único proceso (la cache en memoria basta).
+DJANGO_CACHE_LOCAL = os.getenv("DJANGO_CACHE_LOCAL", "0") == "1"
+if not DJANGO_CACHE_URL and not DEBUG and not DJANGO_CACHE_LOCAL:
+    raise ImproperlyConfigured(
+        "DJANGO_CACHE_URL vacío con DJANGO_DEBUG=0: con la cache en memoria de cada proceso, una "
+        "revocación o un usuario desactivado no se ven en los demás procesos hasta "
+        "TOKENS_VERSION_CACHE_TTL / AUTH_SNAPSHOT_TTL s. Configura DJANGO_CACHE_URL=redis://... o, "
+        "si Django corre en un único proceso, DJANGO_CACHE_LOCAL=1."
+    )
+
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -118,6 +151,26 @@ else:
         {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
     ]
 
+# Hashing de contraseñas: hasher preferido (pbkdf2 | argon2, este requiere argon2-cffi).
+# Los hashes con otro algoritmo o parámetros se re-hashean al hacer login (core/hashers.py).
+_HASHERS = {
+    "pbkdf2": "core.hashers.PBKDF2ConfigurablePasswordHasher",
+    "argon2": "core.hashers.Argon2idConfigurablePasswordHasher",
+}
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "pbkdf2")
+if PASSWORD_HASHER not in _HASHERS:
+    raise ImproperlyConfigured(f"PASSWORD_HASHER={PASSWORD_HASHER!r} no es válido; opciones: {', '.join(_HASHERS)}.")
+PASSWORD_HASHERS = [_HASHERS[PASSWORD_HASHER]] + [h for k, h in _HASHERS.items() if k != PASSWORD_HASHER] + [
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "870000"))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST", "2"))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv("PASSWORD_ARGON2_MEMORY_COST", "102400"))  # KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", "8"))
+# Pool de procesos para hashear (core/hashing.py): 0 = en el hilo de la petición
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "2"))
+
 # Custom user model (módulo 1 - Autenticación)
 AUTH_USER_MODEL = "core.Usuario"
 
@@ -149,7 +202,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # REST Framework + JWT (módulo 1 - Autenticación)
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.JWTSesionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -163,8 +216,45 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
+    # Compartidos con FastAPI (shared.config) para verificar access tokens en el edge
+    "ALGORITHM": os.getenv("JWT_ALGORITHM", "HS256"),
+    "SIGNING_KEY": os.getenv("JWT_SIGNING_KEY") or SECRET_KEY,
+    "LEEWAY": int(os.getenv("JWT_LEEWAY", "0")),
+    # Rotación con la blacklist en memoria y escrituras en lote (core/blacklist.py)
+    "TOKEN_REFRESH_SERIALIZER": "core.serializers.TokenRefreshRotativoSerializer",
 }
 
+# Blacklist de refresh en memoria (core/blacklist.py); 0 = comportamiento de SimpleJWT
+BLACKLIST_FILTRO = os.getenv("BLACKLIST_FILTRO", "1") == "1"
+BLACKLIST_SYNC_INTERVAL_MS = int(os.getenv("BLACKLIST_SYNC_INTERVAL_MS", "1000"))
+BLACKLIST_FLUSH_INTERVAL_MS = int(os.getenv("BLACKLIST_FLUSH_INTERVAL_MS", "500"))
+BLACKLIST_FLUSH_BATCH = int(os.getenv("BLACKLIST_FLUSH_BATCH", "500"))
+# Rotación: por defecto el jti rotado se reclama con cache.add (cache compartida o un único proceso,
+# ver DJANGO_CACHE_LOCAL); 1 = reclamarlo con un INSERT en la BD en cada refresh (opcional)
+BLACKLIST_ROTACION_BD = os.getenv("BLACKLIST_ROTACION_BD", "0") == "1"
+BLACKLIST_BLOOM_CAPACIDAD = int(os.getenv("BLACKLIST_BLOOM_CAPACIDAD", "200000"))  # jti por día de expiración
+BLACKLIST_BLOOM_ERROR = float(os.getenv("BLACKLIST_BLOOM_ERROR", "0.001"))
+
+# Tokens efímeros de verificación / restablecer y OTP (core/services/tokens.py): "bd" o "cache"
+AUTH_TOKENS_BACKEND = os.getenv("AUTH_TOKENS_BACKEND", "bd")
+AUTH_TOKENS_CACHE = os.getenv("AUTH_TOKENS_CACHE", "default")
+OTP_TTL_MINUTOS = int(os.getenv("OTP_TTL_MINUTOS", "10"))
+OTP_MAX_INTENTOS = int(os.getenv("OTP_MAX_INTENTOS", "5"))
+# Generación de tokens por usuario (core/revocacion.py): segundos de copia en la cache
+TOKENS_VERSION_CACHE_TTL = int(os.getenv("TOKENS_VERSION_CACHE_TTL", "60"))
+# Snapshot del usuario autenticado (core/snapshot.py): segundos en la cache; 0 = leer core_usuario en cada petición
+AUTH_SNAPSHOT_TTL = int(os.getenv("AUTH_SNAPSHOT_TTL", "60"))
+
+# Sesiones write-behind (core/sesiones.py): altas y última actividad se escriben en lote
+SESIONES_WRITE_BEHIND = os.getenv("SESIONES_WRITE_BEHIND", "1") == "1"
+SESIONES_FLUSH_INTERVAL_MS = int(os.getenv("SESIONES_FLUSH_INTERVAL_MS", "500"))
+SESIONES_FLUSH_BATCH = int(os.getenv("SESIONES_FLUSH_BATCH", "200"))
+SESIONES_BUFFER_MAX = int(os.getenv("SESIONES_BUFFER_MAX", "10000"))
+SESIONES_TOUCH_INTERVAL = int(os.getenv("SESIONES_TOUCH_INTERVAL", "60"))  # s entre toques de una misma sesión
+
+# Canal NOTIFY para invalidar el cache de /me/ y /perfil/ en FastAPI (core/signals.py)
+AUTH_CACHE_NOTIFY_CHANNEL = os.getenv("AUTH_CACHE_NOTIFY_CHANNEL", "auth_usuario_cambio")
+
 # CORS: frontend (React) en desarrollo
 CORS_ALLOWED_ORIGINS = os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173").split(",")
 CORS_ALLOW_CREDENTIALS = True
@@ -172,5 +262,36 @@ CORS_ALLOW_CREDENTIALS = True
 # Email (desarrollo: consola; producción: SMTP)
 EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "noreply@safelease.local")
+EMAIL_HOST = os.getenv("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", "25"))
+EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "0") == "1"
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", "10"))
 FRONTEND_VERIFY_EMAIL_URL = os.getenv("FRONTEND_VERIFY_EMAIL_URL", "http://localhost:5173/verificar-email")
 FRONTEND_RESET_PASSWORD_URL = os.getenv("FRONTEND_RESET_PASSWORD_URL", "http://localhost:5173/restablecer-password")
+
+# Outbox de emails (core/jobs/outbox.py): envío tras el commit, reintentos con backoff y dead-letter
+EMAIL_OUTBOX_WORKERS = int(os.getenv("EMAIL_OUTBOX_WORKERS", "2"))  # hilos por proceso web; 0 = solo procesar_outbox
+EMAIL_OUTBOX_BATCH = int(os.getenv("EMAIL_OUTBOX_BATCH", "20"))
+EMAIL_OUTBOX_POLL_INTERVAL = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL", "5"))
+EMAIL_OUTBOX_LEASE = int(os.getenv("EMAIL_OUTBOX_LEASE", "300"))
+EMAIL_OUTBOX_MAX_INTENTOS = int(os.getenv("EMAIL_OUTBOX_MAX_INTENTOS", "8"))
+EMAIL_OUTBOX_BACKOFF_BASE = float(os.getenv("EMAIL_OUTBOX_BACKOFF_BASE", "10"))
+# Motor SMTP (core/jobs/smtp.py): pool de conexiones persistentes, lote por conexión y ritmo por dominio
+EMAIL_SMTP_POOL_SIZE = int(os.getenv("EMAIL_SMTP_POOL_SIZE", "4"))
+EMAIL_SMTP_BATCH = int(os.getenv("EMAIL_SMTP_BATCH", "50"))
+EMAIL_SMTP_IDLE_TIMEOUT = float(os.getenv("EMAIL_SMTP_IDLE_TIMEOUT", "60"))
+EMAIL_THROTTLE_POR_DOMINIO = float(os.getenv("EMAIL_THROTTLE_POR_DOMINIO", "10"))  # mensajes/s; 0 = sin límite
+EMAIL_THROTTLE_DOMINIOS = os.getenv("EMAIL_THROTTLE_DOMINIOS", "")  # "gmail.com=20,outlook.com=5"
+
+# Cola de tareas en BD (core/jobs/cola.py): `python manage.py procesar_tareas`
+TAREAS_POLL_INTERVAL = float(os.getenv("TAREAS_POLL_INTERVAL", "1"))  # s de espera de un hilo sin trabajo
+TAREAS_LEASE = int(os.getenv("TAREAS_LEASE", "600"))  # s antes de dar por muerto un worker a mitad de tarea
+TAREAS_BACKOFF_BASE = float(os.getenv("TAREAS_BACKOFF_BASE", "10"))
+
+# Purga por lotes de filas caducadas (core/jobs/purga.py): tarea horaria y `manage.py purgar`
+PURGA_LOTE = int(os.getenv("PURGA_LOTE", "1000"))
+PURGA_PAUSA_MS = int(os.getenv("PURGA_PAUSA_MS", "50"))
+PURGA_RETENCION_HORAS = float(os.getenv("PURGA_RETENCION_HORAS", "24"))  # tokens de verificación y OTP tras expirar
+PURGA_RETENCION_HISTORICO_DIAS = float(os.getenv("PURGA_RETENCION_HISTORICO_DIAS", "7"))  # outbox y tareas terminadas
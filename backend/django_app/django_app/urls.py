@@ -20,12 +20,17 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
-from . import api_views
+from core.urls import PRESUPUESTOS_QUERIES
+
+from . import api_views, metrics
+
+metrics.registrar_presupuestos(PRESUPUESTOS_QUERIES)
 
 urlpatterns = [
     path("", api_views.root),
     path("admin/", admin.site.urls),
     path("api/health", api_views.health),
+    path("metrics", metrics.metrics),
     path("api/auth/", include("core.urls")),
 ]
 if settings.DEBUG:
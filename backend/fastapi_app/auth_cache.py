@@ -0,0 +1,258 @@
+"""
+Cache read-through por usuario para GET /api/auth/me/ y /api/auth/perfil/.
+
+- La clave sale de los claims verificados por JWTGateMiddleware (scope[SCOPE_CLAIMS]): usuario,
+  generación de tokens (`ver`) y sesión (`sid`).
+- Invalidación: local al pasar una petición mutante del mismo usuario, y entre workers
+  por PostgreSQL LISTEN/NOTIFY (Django notifica al confirmar cambios en Usuario/Perfil).
+- stale-if-error: si Django falla (excepción o 5xx) se sirve la última copia aunque haya vencido,
+  como mucho hasta `stale_ttl` después de guardarla.
+- Backends: memoria (por proceso) o Redis (compartido, opcional).
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from starlette.responses import Response
+
+from shared.config import get_auth_cache_channel, get_database_dsn
+
+from fastapi_app.jwt_gate import SCOPE_CLAIMS
+
+logger = logging.getLogger(__name__)
+
+RUTAS_CACHEABLES = ("/api/auth/me/", "/api/auth/perfil/")
+
+
+@dataclass
+class Entrada:
+    body: bytes
+    content_type: str
+    guardado: float
+
+    def serializar(self) -> bytes:
+        return json.dumps([self.content_type, self.guardado]).encode() + b"\n" + self.body
+
+    @classmethod
+    def deserializar(cls, data: bytes) -> "Entrada":
+        cabecera, body = data.split(b"\n", 1)
+        content_type, guardado = json.loads(cabecera)
+        return cls(body=body, content_type=content_type, guardado=guardado)
+
+
+class MemoriaBackend:
+    """Backend en memoria del proceso, LRU por usuario; cada entrada caduca a los `ttl` s."""
+
+    def __init__(self, max_usuarios: int = 10000):
+        self.max_usuarios = max_usuarios
+        self._datos: "OrderedDict[str, dict]" = OrderedDict()  # usuario -> {clave: (entrada, expira)}
+
+    async def get(self, usuario_id: str, clave: str) -> Optional[Entrada]:
+        entradas = self._datos.get(usuario_id)
+        if entradas is None or clave not in entradas:
+            return None
+        entrada, expira = entradas[clave]
+        if time.time() >= expira:
+            del entradas[clave]
+            return None
+        self._datos.move_to_end(usuario_id)
+        return entrada
+
+    async def set(self, usuario_id: str, clave: str, entrada: Entrada, ttl: int) -> None:
+        ahora = time.time()
+        entradas = self._datos.setdefault(usuario_id, {})
+        # Claves de tokens anteriores (otro `ver`/`sid`) que nadie volverá a leer
+        for vieja in [c for c, (_, expira) in entradas.items() if ahora >= expira]:
+            del entradas[vieja]
+        entradas[clave] = (entrada, ahora + ttl)
+        self._datos.move_to_end(usuario_id)
+        while len(self._datos) > self.max_usuarios:
+            self._datos.popitem(last=False)
+
+    async def invalidar(self, usuario_id: str) -> None:
+        self._datos.pop(usuario_id, None)
+
+    async def close(self) -> None:
+        self._datos.clear()
+
+
+class RedisBackend:
+    """Backend compartido entre workers (paquete redis, en requirements.txt). Un hash por usuario."""
+
+    def __init__(self, url: str, prefijo: str = "authcache:"):
+        import redis.asyncio as redis  # import diferido: solo si se configura FASTAPI_AUTH_CACHE_URL
+
+        self._redis = redis.from_url(url)
+        self.prefijo = prefijo
+
+    async def get(self, usuario_id: str, clave: str) -> Optional[Entrada]:
+        data = await self._redis.hget(self.prefijo + usuario_id, clave)
+        return Entrada.deserializar(data) if data else None
+
+    async def set(self, usuario_id: str, clave: str, entrada: Entrada, ttl: int) -> None:
+        key = self.prefijo + usuario_id
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, clave, entrada.serializar())
+            pipe.expire(key, ttl)
+            await pipe.execute()
+
+    async def invalidar(self, usuario_id: str) -> None:
+        await self._redis.delete(self.prefijo + usuario_id)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class AuthCache:
+    """Política del cache: frescura (`ttl`) y ventana stale-if-error (`stale_ttl`)."""
+
+    def __init__(self, backend, ttl: int = 60, stale_ttl: int = 3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "invalidaciones": 0}
+
+    async def get(self, usuario_id: str, clave: str) -> Optional[Entrada]:
+        """Entrada guardada hace menos de `stale_ttl` (fresca o no)."""
+        try:
+            entrada = await self.backend.get(usuario_id, clave)
+        except Exception:
+            logger.exception("auth_cache: error leyendo backend")
+            return None
+        # En Redis el EXPIRE es del hash del usuario: otra clave guardada después lo alarga
+        if entrada is None or time.time() - entrada.guardado > self.stale_ttl:
+            return None
+        return entrada
+
+    async def set(self, usuario_id: str, clave: str, body: bytes, content_type: str) -> None:
+        try:
+            await self.backend.set(usuario_id, clave, Entrada(body, content_type, time.time()), self.stale_ttl)
+        except Exception:
+            logger.exception("auth_cache: error escribiendo backend")
+
+    async def invalidar(self, usuario_id: str) -> None:
+        self.stats["invalidaciones"] += 1
+        try:
+            await self.backend.invalidar(usuario_id)
+        except Exception:
+            logger.exception("auth_cache: error invalidando usuario %s", usuario_id)
+
+    def fresca(self, entrada: Entrada) -> bool:
+        return time.time() - entrada.guardado < self.ttl
+
+
+def crear_auth_cache(url: str = "", ttl: int = 60, stale_ttl: int = 3600) -> AuthCache:
+    """Cache con backend Redis si se da `url` (redis://...), si no en memoria."""
+    backend = RedisBackend(url) if url else MemoriaBackend()
+    return AuthCache(backend, ttl=ttl, stale_ttl=stale_ttl)
+
+
+async def escuchar_invalidaciones(cache: AuthCache, reintento: float = 5.0) -> None:
+    """
+    Tarea de fondo: LISTEN en PostgreSQL e invalidación por usuario_id recibido.
+    Reconecta si se pierde la conexión; sin psycopg no hace nada (solo invalidación local).
+    """
+    try:
+        import psycopg
+    except ImportError:
+        logger.warning("auth_cache: psycopg no instalado; sin invalidación LISTEN/NOTIFY")
+        return
+    canal = get_auth_cache_channel()
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(get_database_dsn(), autocommit=True) as conn:
+                await conn.execute(f'LISTEN "{canal}"')
+                async for notify in conn.notifies():
+                    await cache.invalidar(notify.payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("auth_cache: LISTEN %s interrumpido; reintentando en %ss", canal, reintento)
+            await asyncio.sleep(reintento)
+
+
+class AuthCacheMiddleware:
+    """
+    Middleware ASGI (va dentro de JWTGateMiddleware para leer sus claims del scope).
+    Sin claims verificados no cachea nada.
+    """
+
+    def __init__(self, app, cache: AuthCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/auth/"):
+            await self.app(scope, receive, send)
+            return
+        claims = scope.get(SCOPE_CLAIMS)
+        if claims is None:
+            await self.app(scope, receive, send)
+            return
+        usuario_id = str(claims.get("user_id"))
+        if scope["method"] != "GET":
+            await self._mutante(scope, receive, send, usuario_id)
+            return
+        if scope["path"] not in RUTAS_CACHEABLES or scope.get("query_string"):
+            await self.app(scope, receive, send)
+            return
+        # Generación (`ver`) y sesión (`sid`) en la clave: un token revocado no reutiliza la respuesta
+        # cacheada para otro; la revocación además invalida al usuario entero (NOTIFY)
+        accept = dict(scope["headers"]).get(b"accept", b"").decode("latin-1")
+        clave = f"{scope['path']}|{accept}|{claims.get('ver', 0)}|{claims.get('sid', '')}"
+        entrada = await self.cache.get(usuario_id, clave)
+        if entrada is not None and self.cache.fresca(entrada):
+            self.cache.stats["hits"] += 1
+            await self._responder(entrada, "HIT", scope, receive, send)
+            return
+        self.cache.stats["misses"] += 1
+
+        # Se bufferiza la respuesta (JSON pequeño) para decidir si guardarla o servir stale
+        inicio, cuerpo = {}, []
+
+        async def capturar(message):
+            if message["type"] == "http.response.start":
+                inicio.update(message)
+            elif message["type"] == "http.response.body":
+                cuerpo.append(message.get("body", b""))
+
+        try:
+            await self.app(scope, receive, capturar)
+            error = inicio.get("status", 500) >= 500
+        except Exception:
+            if entrada is None:
+                raise
+            error = True
+        if error and entrada is not None:
+            self.cache.stats["stale"] += 1
+            await self._responder(entrada, "STALE", scope, receive, send)
+            return
+        body = b"".join(cuerpo)
+        headers = dict(inicio.get("headers", []))
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        if inicio.get("status") == 200 and "application/json" in content_type:
+            await self.cache.set(usuario_id, clave, body, content_type)
+        await send(dict(inicio, headers=list(inicio.get("headers", [])) + [(b"x-cache", b"MISS")]))
+        await send({"type": "http.response.body", "body": body})
+
+    async def _mutante(self, scope, receive, send, usuario_id):
+        """PATCH/POST/... del usuario: invalida su entrada al terminar con éxito."""
+        status = {}
+
+        async def observar(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        await self.app(scope, receive, observar)
+        if status.get("code", 500) < 400:
+            await self.cache.invalidar(usuario_id)
+
+    @staticmethod
+    async def _responder(entrada: Entrada, estado: str, scope, receive, send):
+        response = Response(entrada.body, media_type=entrada.content_type, headers={"X-Cache": estado})
+        await response(scope, receive, send)
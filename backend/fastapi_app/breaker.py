@@ -0,0 +1,106 @@
+"""
+Circuit breaker hacia Django y sonda de salud en segundo plano.
+
+- closed: las peticiones pasan; `umbral_fallos` fallos seguidos abren el circuito.
+- open: se rechaza al instante (503) durante `recuperacion` segundos.
+- half-open: pasa una única petición/sonda de prueba; si va bien se cierra, si falla se reabre.
+  Si no llega a Django (limitador saturado, cliente desconectado) la prueba queda libre.
+
+La sonda consulta /api/health cada `intervalo` segundos con timeout corto, así que un
+Django caído se detecta sin que ninguna petición de usuario espere INTERNAL_TIMEOUT.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from shared.clients import call_django_health_async
+
+logger = logging.getLogger(__name__)
+
+CERRADO = "closed"
+ABIERTO = "open"
+SEMIABIERTO = "half-open"
+
+
+class CircuitBreaker:
+    def __init__(self, umbral_fallos: int = 5, recuperacion: float = 10.0):
+        self.umbral_fallos = umbral_fallos
+        self.recuperacion = recuperacion
+        self._estado = CERRADO
+        self._fallos = 0
+        self._abierto_en = 0.0
+        self._prueba_en_curso = False
+        self.ultima_sonda: Optional[dict] = None
+
+    @property
+    def estado(self) -> str:
+        if self._estado == ABIERTO and time.monotonic() - self._abierto_en >= self.recuperacion:
+            self._estado = SEMIABIERTO
+            self._prueba_en_curso = False
+        return self._estado
+
+    def permitir(self) -> bool:
+        """True si la petición puede ir a Django; en half-open solo deja pasar una prueba."""
+        estado = self.estado
+        if estado == CERRADO:
+            return True
+        if estado == SEMIABIERTO and not self._prueba_en_curso:
+            self._prueba_en_curso = True
+            return True
+        return False
+
+    def soltar_prueba(self) -> None:
+        """La petición de prueba terminó sin registrar resultado: la siguiente puede probar."""
+        if self._estado == SEMIABIERTO:
+            self._prueba_en_curso = False
+
+    def reintentar_en(self) -> int:
+        """Segundos hasta el próximo intento (para Retry-After)."""
+        if self._estado != ABIERTO:
+            return 1
+        return max(1, int(self.recuperacion - (time.monotonic() - self._abierto_en)) + 1)
+
+    def registrar_exito(self) -> None:
+        self._estado = CERRADO
+        self._fallos = 0
+        self._prueba_en_curso = False
+
+    def registrar_fallo(self) -> None:
+        self._fallos += 1
+        if self.estado == SEMIABIERTO or self._fallos >= self.umbral_fallos:
+            if self._estado != ABIERTO:
+                logger.warning("breaker: circuito hacia Django abierto tras %s fallo(s)", self._fallos)
+            self._estado = ABIERTO
+            self._abierto_en = time.monotonic()
+            self._prueba_en_curso = False
+
+    def info(self) -> dict:
+        return {
+            "estado": self.estado,
+            "fallos_consecutivos": self._fallos,
+            "umbral_fallos": self.umbral_fallos,
+            "recuperacion_s": self.recuperacion,
+            "ultima_sonda": self.ultima_sonda,
+        }
+
+
+async def sondear_django(breaker: CircuitBreaker, intervalo: float = 2.0, timeout: float = 1.0) -> None:
+    """Tarea de fondo: GET /api/health periódico; actualiza el breaker y la latencia de la sonda."""
+    while True:
+        inicio = time.perf_counter()
+        try:
+            await call_django_health_async(timeout=timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            breaker.registrar_fallo()
+            breaker.ultima_sonda = {"ok": False, "error": str(e) or type(e).__name__, "en": time.time()}
+        else:
+            breaker.registrar_exito()
+            breaker.ultima_sonda = {
+                "ok": True,
+                "latencia_ms": round((time.perf_counter() - inicio) * 1000, 2),
+                "en": time.time(),
+            }
+        await asyncio.sleep(intervalo)
@@ -0,0 +1,44 @@
+"""
+Single-flight: coalesce peticiones GET idénticas y concurrentes hacia Django.
+La primera petición con una clave lanza la llamada; las que llegan mientras está en vuelo
+esperan el mismo resultado. La llamada corre en su propia tarea, así que si el cliente
+que la inició se desconecta las demás siguen recibiendo la respuesta.
+"""
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    def __init__(self, max_claves: int = 1024):
+        self.max_claves = max_claves
+        self._en_vuelo: dict = {}
+        self.stats = {"lideres": 0, "compartidas": 0, "sin_coalescer": 0}
+
+    async def ejecutar(self, clave: Hashable, fn: Callable[[], Awaitable]):
+        tarea = self._en_vuelo.get(clave)
+        if tarea is not None:
+            self.stats["compartidas"] += 1
+            return await asyncio.shield(tarea)
+        if len(self._en_vuelo) >= self.max_claves:
+            # Acotado: por encima del límite se pasa directo, sin registrar la clave
+            self.stats["sin_coalescer"] += 1
+            return await fn()
+        self.stats["lideres"] += 1
+        tarea = asyncio.ensure_future(fn())
+        self._en_vuelo[clave] = tarea
+        tarea.add_done_callback(lambda t: self._terminar(clave, t))
+        return await asyncio.shield(tarea)
+
+    def _terminar(self, clave, tarea) -> None:
+        self._en_vuelo.pop(clave, None)
+        if not tarea.cancelled():
+            tarea.exception()  # marcar como recuperada aunque todos los que esperaban se hayan ido
+
+    def info(self) -> dict:
+        total = sum(self.stats.values())
+        return {
+            **self.stats,
+            "en_vuelo": len(self._en_vuelo),
+            "max_claves": self.max_claves,
+            "ratio_compartidas": round(self.stats["compartidas"] / total, 4) if total else 0.0,
+        }
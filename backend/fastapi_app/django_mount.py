@@ -0,0 +1,83 @@
+"""
+Modo in-process: la aplicación ASGI de Django se monta dentro del proceso FastAPI
+para servir /api/auth/* sin salto HTTP (sin socket por petición); las vistas corren en un pool
+de hilos acotado (HandlerPool).
+Por defecto se mantiene el modo de procesos separados (proxy HTTP).
+"""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.db import close_old_connections
+from django.http import FileResponse
+
+# backend/django_app: contiene el paquete django_app (settings, asgi) y la app core
+_DJANGO_DIR = Path(__file__).resolve().parent.parent / "django_app"
+
+
+def get_django_asgi_app(max_threads: int = 16) -> "HandlerPool":
+    """Inicializa Django y devuelve su aplicación ASGI con las vistas en un pool de `max_threads` hilos."""
+    if str(_DJANGO_DIR) not in sys.path:
+        sys.path.insert(0, str(_DJANGO_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_app.settings")
+    import django_app.asgi  # noqa: F401  (django.setup())
+    return HandlerPool(max_threads)
+
+
+class HandlerPool(ASGIHandler):
+    """
+    ASGIHandler con la cadena síncrona de middlewares y la vista en un ThreadPoolExecutor propio.
+
+    El ASGIHandler de Django adapta las vistas síncronas con sync_to_async(thread_sensitive=True):
+    todas comparten un único hilo. Aquí corren hasta `max_threads` a la vez; el resto espera en la
+    cola del pool.
+
+    Conexiones a la BD: son por hilo, así que hay como mucho `max_threads`. Django emite
+    request_started / request_finished en otro hilo, así que no cierran estas; cada hilo del pool
+    llama a close_old_connections antes y después de la petición (respeta CONN_MAX_AGE y descarta
+    las rotas).
+    """
+
+    def __init__(self, max_threads: int = 16):
+        BaseHandler.__init__(self)  # sin la cadena asíncrona de ASGIHandler
+        self.load_middleware(is_async=False)
+        self.max_threads = max_threads
+        self._ejecutor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="django-vista")
+
+    async def run_get_response(self, request):
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self._ejecutor, self._atender, request)
+        response._handler_class = self.__class__
+        if isinstance(response, FileResponse):
+            response.block_size = self.chunk_size
+        return response
+
+    def _atender(self, request):
+        close_old_connections()
+        try:
+            return self.get_response(request)
+        finally:
+            close_old_connections()
+
+    def cerrar(self) -> None:
+        self._ejecutor.shutdown(wait=False, cancel_futures=True)
+
+
+class DjangoMount:
+    """
+    Envoltorio ASGI para montar Django bajo un prefijo de FastAPI: Starlette deja el prefijo
+    montado en `root_path`; Django lo restaría de `path` y no resolvería `api/auth/...`, así que
+    se restaura el root_path de la app.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            scope = dict(scope, root_path=scope.get("app_root_path", ""))
+        await self.app(scope, receive, send)
@@ -0,0 +1,85 @@
+"""
+Verificación de access tokens (SimpleJWT) en el edge, antes de llegar a Django.
+Tokens ausentes, mal formados, con firma inválida o expirados se rechazan con 401
+sin consumir un worker de Django ni una conexión a la BD. Los claims verificados quedan en el
+scope ASGI (SCOPE_CLAIMS) para los middlewares interiores; a Django no le llegan.
+"""
+import jwt  # PyJWT, la misma librería que usa SimpleJWT
+from starlette.responses import JSONResponse
+
+from shared.config import get_jwt_algorithm, get_jwt_leeway, get_jwt_signing_key
+
+# Clave del scope con los claims verificados (la lee auth_cache). La cabecera X-Auth-Claims ya
+# no se emite, pero se sigue eliminando la que envíe el cliente: nadie debe poder fingir claims
+SCOPE_CLAIMS = "auth_claims"
+HEADER_CLAIMS = b"x-auth-claims"
+
+# Rutas /api/auth/* que no requieren JWT (ver core/urls.py)
+RUTAS_PUBLICAS = (
+    "registro/",
+    "login/",
+    "verificar-email/",
+    "verificar-otp/",
+    "restablecer-password/",
+    "token/refresh/",
+)
+
+
+class TokenInvalido(Exception):
+    pass
+
+
+def requiere_token(path: str) -> bool:
+    """True si la ruta relativa a /api/auth/ es de las autenticadas."""
+    return not path.startswith(RUTAS_PUBLICAS)
+
+
+def verificar_access_token(authorization: str) -> dict:
+    """Valida `Authorization: Bearer <jwt>` como lo haría JWTAuthentication; devuelve los claims."""
+    if not authorization:
+        raise TokenInvalido("Falta la cabecera Authorization.")
+    partes = authorization.split()
+    if len(partes) != 2 or partes[0] != "Bearer":
+        raise TokenInvalido("Cabecera Authorization inválida.")
+    try:
+        claims = jwt.decode(
+            partes[1],
+            get_jwt_signing_key(),
+            algorithms=[get_jwt_algorithm()],
+            leeway=get_jwt_leeway(),
+            options={"require": ["exp", "jti", "token_type", "user_id"]},
+        )
+    except jwt.PyJWTError as e:
+        raise TokenInvalido(str(e))
+    if claims.get("token_type") != "access":
+        raise TokenInvalido("El token no es de tipo access.")
+    return claims
+
+
+class JWTGateMiddleware:
+    """Middleware ASGI: aplica la verificación a /api/auth/* (proxy HTTP o Django montado)."""
+
+    def __init__(self, app, prefijo: str = "/api/auth/"):
+        self.app = app
+        self.prefijo = prefijo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefijo):
+            await self.app(scope, receive, send)
+            return
+        headers = [(k, v) for k, v in scope["headers"] if k != HEADER_CLAIMS]
+        scope = dict(scope, headers=headers)
+        if scope["method"] != "OPTIONS" and requiere_token(scope["path"][len(self.prefijo):]):
+            authorization = next((v for k, v in headers if k == b"authorization"), b"")
+            try:
+                claims = verificar_access_token(authorization.decode("latin-1"))
+            except TokenInvalido as e:
+                response = JSONResponse(
+                    {"detail": "El token no es válido o ha expirado.", "code": "token_not_valid", "motivo": str(e)},
+                    status_code=401,
+                    headers={"WWW-Authenticate": 'Bearer realm="api"'},
+                )
+                await response(scope, receive, send)
+                return
+            scope[SCOPE_CLAIMS] = claims
+        await self.app(scope, receive, send)
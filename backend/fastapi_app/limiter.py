@@ -0,0 +1,175 @@
+"""
+Limitador de concurrencia adaptativo (AIMD) delante del proxy a Django, con prioridades.
+
+- El límite sube +1/límite por petición sana (≈ +1 por ventana) y baja ×`beta` cuando la
+  latencia upstream supera `tolerancia` veces la línea base de esa ruta o Django falla
+  (como mucho una bajada por `enfriamiento`). La línea base por ruta es el mínimo observado,
+  que deriva lentamente al alza: así login (PBKDF2, ~1 s) y /me/ (ms) conviven.
+- Prioridades: cada clase solo puede ocupar una fracción del límite, así que refresh/login
+  siguen entrando cuando lecturas de perfil y avatares ya se están rechazando; en la cola
+  pasan delante y, si está llena, desalojan al de menor prioridad.
+- Sin hueco: cola acotada y espera corta (`espera_max`); si la cola está llena o vence la
+  espera, 503 inmediato con Retry-After.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+
+from fastapi_app.metrics import LIMITER_IN_FLIGHT, LIMITER_LIMIT, LIMITER_QUEUE, LIMITER_SHED, ruta_auth
+
+CRITICA = 0   # login, token refresh, verificar OTP
+NORMAL = 1    # lecturas de perfil, sesiones, 2FA...
+BAJA = 2      # subidas de avatar
+
+NOMBRES = {CRITICA: "critica", NORMAL: "normal", BAJA: "baja"}
+FRACCION_LIMITE = {CRITICA: 1.0, NORMAL: 0.9, BAJA: 0.6}
+
+_RUTAS_CRITICAS = ("/api/auth/login/", "/api/auth/token/refresh/", "/api/auth/verificar-otp/")
+
+
+def prioridad_de(method: str, path: str) -> int:
+    if path.startswith(_RUTAS_CRITICAS):
+        return CRITICA
+    if path.startswith("/api/auth/perfil/avatar/"):
+        return BAJA
+    return NORMAL
+
+
+class Saturado(Exception):
+    """No hay capacidad para la petición: responder 503 con Retry-After."""
+
+
+class AdaptiveLimiter:
+    def __init__(self, limite_inicial: float = 100, minimo: float = 10, maximo: float = 1000,
+                 tolerancia: float = 2.0, beta: float = 0.9, enfriamiento: float = 0.5,
+                 deriva: float = 0.001, max_cola: int = 50, espera_max: float = 0.1):
+        self.limite = float(limite_inicial)
+        self.minimo = minimo
+        self.maximo = maximo
+        self.tolerancia = tolerancia
+        self.beta = beta
+        self.enfriamiento = enfriamiento
+        self.deriva = deriva
+        self.max_cola = max_cola
+        self.espera_max = espera_max
+        self.en_vuelo = 0
+        self._base: dict = {}
+        self._ultima_bajada = 0.0
+        self._cola: list = []  # heap (prioridad, seq, future)
+        self._seq = itertools.count()
+        self.rechazadas = {nombre: 0 for nombre in NOMBRES.values()}
+        LIMITER_LIMIT.set(self.limite)
+
+    def _hay_hueco(self, prioridad: int) -> bool:
+        return self.en_vuelo < max(1, int(self.limite * FRACCION_LIMITE[prioridad]))
+
+    def _rechazar(self, prioridad: int) -> Saturado:
+        self.rechazadas[NOMBRES[prioridad]] += 1
+        LIMITER_SHED.labels(NOMBRES[prioridad]).inc()
+        return Saturado()
+
+    def _ocupar(self) -> None:
+        self.en_vuelo += 1
+        LIMITER_IN_FLIGHT.inc()
+
+    async def adquirir(self, prioridad: int) -> None:
+        """Reserva un hueco o lanza Saturado."""
+        while self._cola and self._cola[0][2].done():
+            heapq.heappop(self._cola)
+        if self._hay_hueco(prioridad) and (not self._cola or self._cola[0][0] > prioridad):
+            self._ocupar()
+            return
+        if self.espera_max <= 0 or (len(self._cola) >= self.max_cola and not self._desalojar(prioridad)):
+            raise self._rechazar(prioridad)
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._cola, (prioridad, next(self._seq), fut))
+        LIMITER_QUEUE.inc()
+        try:
+            await asyncio.wait_for(fut, self.espera_max)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                return  # el hueco llegó justo al vencer la espera: ya está ocupado a su nombre
+            raise self._rechazar(prioridad)
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                self._soltar()  # cancelada con el hueco ya ocupado a su nombre: devolverlo
+            raise
+        finally:
+            LIMITER_QUEUE.dec()
+
+    def _desalojar(self, prioridad: int) -> bool:
+        """Cola llena: expulsa al último en espera de menor prioridad que `prioridad`, si lo hay."""
+        vivos = [e for e in self._cola if not e[2].done()]
+        peor = max(vivos, default=None)
+        if peor is None or peor[0] <= prioridad:
+            return False
+        self._cola = [e for e in vivos if e is not peor]
+        heapq.heapify(self._cola)
+        peor[2].set_exception(self._rechazar(peor[0]))
+        return True
+
+    def liberar(self, ruta: str, latencia: float, ok: bool) -> None:
+        """Devuelve el hueco y ajusta el límite con la latencia upstream observada."""
+        base = self._base.get(ruta)
+        base = latencia if base is None else min(latencia, base * (1 + self.deriva))
+        self._base[ruta] = base
+        ahora = time.monotonic()
+        if not ok or latencia > base * self.tolerancia:
+            if ahora - self._ultima_bajada >= self.enfriamiento:
+                self.limite = max(self.minimo, self.limite * self.beta)
+                self._ultima_bajada = ahora
+        else:
+            self.limite = min(self.maximo, self.limite + 1 / self.limite)
+        LIMITER_LIMIT.set(self.limite)
+        self._soltar()
+
+    def _soltar(self) -> None:
+        self.en_vuelo -= 1
+        LIMITER_IN_FLIGHT.dec()
+        self._despachar()
+
+    def _despachar(self) -> None:
+        """Da paso a los primeros de la cola (mayor prioridad, FIFO) mientras haya hueco."""
+        while self._cola:
+            prioridad, _, fut = self._cola[0]
+            if fut.done():  # venció su espera
+                heapq.heappop(self._cola)
+                continue
+            if not self._hay_hueco(prioridad):
+                return
+            heapq.heappop(self._cola)
+            self._ocupar()
+            fut.set_result(None)
+
+    def info(self) -> dict:
+        return {
+            "limite": round(self.limite, 2),
+            "en_vuelo": self.en_vuelo,
+            "en_cola": sum(1 for *_, fut in self._cola if not fut.done()),
+            "max_cola": self.max_cola,
+            "rechazadas": dict(self.rechazadas),
+        }
+
+
+@asynccontextmanager
+async def limitado(limiter, method: str, path: str):
+    """
+    `async with limitado(limiter, method, path) as resultado:` reserva hueco (o lanza Saturado)
+    y al salir lo libera con la latencia medida; `resultado["ok"] = False` marca fallo de Django.
+    Con `limiter=None` no limita.
+    """
+    if limiter is None:
+        yield {"ok": True}
+        return
+    await limiter.adquirir(prioridad_de(method, path))
+    resultado = {"ok": True}
+    inicio = time.perf_counter()
+    try:
+        yield resultado
+    except BaseException:
+        resultado["ok"] = False
+        raise
+    finally:
+        limiter.liberar(ruta_auth(path), time.perf_counter() - inicio, resultado["ok"])
@@ -1,13 +1,122 @@
+import asyncio
 import os
+import time
+from contextlib import asynccontextmanager
+
+import httpx
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 
 # Cliente HTTP interno para llamar a Django (shared)
 from shared.config import get_django_internal_url
-from shared.clients import get_django_async_client, call_django_health_async
+from fastapi_app.breaker import ABIERTO, SEMIABIERTO, CircuitBreaker, sondear_django
+from fastapi_app.coalescing import SingleFlight
+from fastapi_app.auth_cache import AuthCacheMiddleware, crear_auth_cache, escuchar_invalidaciones
+from fastapi_app.django_mount import DjangoMount, get_django_asgi_app
+from fastapi_app.jwt_gate import JWTGateMiddleware
+from fastapi_app.limiter import AdaptiveLimiter, Saturado, limitado
+from fastapi_app.rate_limit import RateLimitMiddleware, crear_rate_limiter
+from fastapi_app.metrics import MetricsMiddleware, metrics_permitido, metrics_response, observar_upstream
+from shared.clients import (
+    call_django_health_async,
+    close_django_async_pool,
+    django_async_client,
+    django_pool_stats,
+    get_django_async_client,
+    get_django_async_pool,
+    open_django_async_pool,
+)
+
+
+# Modo in-process: Django ASGI montado en /api/auth/* dentro de este proceso (opt-in)
+DJANGO_INPROCESS = os.getenv("FASTAPI_DJANGO_INPROCESS", "0") == "1"
+DJANGO_INPROCESS_THREADS = int(os.getenv("FASTAPI_DJANGO_THREADS", "16"))
+django_asgi_app = get_django_asgi_app(DJANGO_INPROCESS_THREADS) if DJANGO_INPROCESS else None
+
+# Cache read-through de /me/ y /perfil/ por usuario (opt-in; requiere FASTAPI_JWT_GATE=1)
+AUTH_CACHE = os.getenv("FASTAPI_AUTH_CACHE", "0") == "1"
+auth_cache = crear_auth_cache(
+    url=os.getenv("FASTAPI_AUTH_CACHE_URL", ""),
+    ttl=int(os.getenv("FASTAPI_AUTH_CACHE_TTL", "60")),
+    stale_ttl=int(os.getenv("FASTAPI_AUTH_CACHE_STALE_TTL", "3600")),
+) if AUTH_CACHE else None
+
+# Circuit breaker hacia Django + sonda de /api/health en segundo plano (modo proxy HTTP)
+breaker = CircuitBreaker(
+    umbral_fallos=int(os.getenv("FASTAPI_BREAKER_FAILURES", "5")),
+    recuperacion=float(os.getenv("FASTAPI_BREAKER_RECOVERY", "10")),
+)
+HEALTH_PROBE_INTERVAL = float(os.getenv("FASTAPI_HEALTH_PROBE_INTERVAL", "2"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("FASTAPI_HEALTH_PROBE_TIMEOUT", "1"))
+
+
+# Rate limiting por IP/email/usuario_id en login, verificar-OTP y solicitar reset (antes de Django)
+rate_limiter = crear_rate_limiter(
+    url=os.getenv("FASTAPI_RATE_LIMIT_URL", ""),
+    reglas={
+        "/api/auth/login/": os.getenv("FASTAPI_RATE_LIMIT_LOGIN"),
+        "/api/auth/verificar-otp/": os.getenv("FASTAPI_RATE_LIMIT_OTP"),
+        "/api/auth/restablecer-password/solicitar/": os.getenv("FASTAPI_RATE_LIMIT_RESET"),
+    },
+) if os.getenv("FASTAPI_RATE_LIMIT", "1") == "1" else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Abre el pool hacia Django y las tareas de fondo al arrancar; lo cierra todo al apagar."""
+    await open_django_async_pool(app=django_asgi_app)
+    tareas = []
+    if not DJANGO_INPROCESS:
+        tareas.append(asyncio.create_task(sondear_django(breaker, HEALTH_PROBE_INTERVAL, HEALTH_PROBE_TIMEOUT)))
+    if auth_cache:
+        tareas.append(asyncio.create_task(escuchar_invalidaciones(auth_cache)))
+    try:
+        yield
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+        if auth_cache:
+            await auth_cache.backend.close()
+        if rate_limiter:
+            await rate_limiter.backend.close()
+        await close_django_async_pool()
+        if django_asgi_app:
+            django_asgi_app.cerrar()
+
+
+app = FastAPI(title="safelease-ai - api", lifespan=lifespan)
+
+# Modo streaming del proxy: cuerpo de petición y respuesta pasan chunk a chunk sin decodificar
+PROXY_STREAMING = os.getenv("FASTAPI_PROXY_STREAMING", "0") == "1"
+
+# Single-flight: GET idénticos y concurrentes (misma ruta, query y Authorization) comparten una llamada
+PROXY_COALESCING = os.getenv("FASTAPI_PROXY_COALESCING", "1") == "1"
+single_flight = SingleFlight(max_claves=int(os.getenv("FASTAPI_COALESCE_MAX_KEYS", "1024")))
+
+# Limitador de concurrencia adaptativo hacia Django, con prioridades (login/refresh primero)
+limiter = AdaptiveLimiter(
+    limite_inicial=float(os.getenv("FASTAPI_LIMITER_INITIAL", "100")),
+    minimo=float(os.getenv("FASTAPI_LIMITER_MIN", "10")),
+    maximo=float(os.getenv("FASTAPI_LIMITER_MAX", "1000")),
+    tolerancia=float(os.getenv("FASTAPI_LIMITER_TOLERANCE", "2.0")),
+    max_cola=int(os.getenv("FASTAPI_LIMITER_QUEUE", "50")),
+    espera_max=float(os.getenv("FASTAPI_LIMITER_QUEUE_WAIT", "0.1")),
+) if os.getenv("FASTAPI_LIMITER", "1") == "1" else None
+LIMITER_RETRY_AFTER = int(os.getenv("FASTAPI_LIMITER_RETRY_AFTER", "1"))
 
-app = FastAPI(title="safelease-ai - api")
+# Cabeceras hop-by-hop (RFC 7230 §6.1): no se reenvían en ninguno de los dos sentidos
+HOP_BY_HOP = frozenset({
+    b"connection",
+    b"keep-alive",
+    b"proxy-authenticate",
+    b"proxy-authorization",
+    b"te",
+    b"trailer",
+    b"transfer-encoding",
+    b"upgrade",
+})
 
 
 @app.get("/")
@@ -18,10 +127,29 @@ def root():
         "docs": "/docs",
         "health": "/health",
         "django_status": "/django-status",
+        "django_pool": "/django-pool",
+        "metrics": "/metrics",
+        "django_mode": "inprocess" if DJANGO_INPROCESS else "http",
         "api_auth": "/api/auth/",
     }
 
 
+# Cache de /me/ y /perfil/: dentro del gate JWT para leer los claims verificados
+if auth_cache:
+    app.add_middleware(AuthCacheMiddleware, cache=auth_cache)
+
+# Verificación de access tokens en el edge (antes que CORS para que los 401 lleven cabeceras CORS)
+if os.getenv("FASTAPI_JWT_GATE", "1") == "1":
+    app.add_middleware(JWTGateMiddleware)
+
+# Rate limiting de login/OTP/reset (dentro de CORS para que los 429 lleven cabeceras CORS)
+if rate_limiter:
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=rate_limiter,
+        proxies_confiables=int(os.getenv("FASTAPI_RATE_LIMIT_TRUSTED_PROXIES", "0")),
+    )
+
 # CORS para frontend (React)
 app.add_middleware(
     CORSMiddleware,
@@ -31,6 +159,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas: el middleware más externo, mide también las respuestas del gate y de CORS
+app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/health")
 def health():
@@ -46,11 +177,18 @@ def config():
 async def django_status():
     """
     Ejemplo de comunicación FastAPI → Django por HTTP interno.
-    Llama a GET {DJANGO_INTERNAL_URL}/api/health y devuelve la respuesta.
+    Llama a GET {DJANGO_INTERNAL_URL}/api/health y devuelve la respuesta junto con el estado
+    del circuit breaker; con el circuito abierto responde 503 sin esperar a Django.
     """
+    if breaker.estado == ABIERTO:
+        raise HTTPException(
+            status_code=503,
+            detail={"detail": "Django no disponible (circuito abierto).", "breaker": breaker.info()},
+            headers={"Retry-After": str(breaker.reintentar_en())},
+        )
     try:
-        data = await call_django_health_async()
-        return {"django_url": get_django_internal_url(), "django": data}
+        data = await call_django_health_async(timeout=HEALTH_PROBE_TIMEOUT)
+        return {"django_url": get_django_internal_url(), "django": data, "breaker": breaker.info()}
     except Exception as e:
         raise HTTPException(
             status_code=503,
@@ -58,28 +196,205 @@ async def django_status():
         )
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    """Métricas en formato Prometheus (agregadas entre workers con PROMETHEUS_MULTIPROC_DIR)."""
+    ip = request.client.host if request.client else ""
+    if not metrics_permitido(ip, request.headers.get("authorization", "")):
+        raise HTTPException(status_code=403, detail="Métricas solo desde METRICS_ALLOWED_IPS o con METRICS_TOKEN.")
+    return metrics_response()
+
+
+@app.get("/django-pool")
+def django_pool():
+    """Ocupación del pool de conexiones FastAPI → Django."""
+    return django_pool_stats()
+
+
+@app.get("/proxy-coalescing")
+def proxy_coalescing():
+    """Peticiones GET coalescidas por el proxy (líderes vs. compartidas)."""
+    return {"activo": PROXY_COALESCING, **single_flight.info()}
+
+
+def _sin_hop_by_hop(raw_headers, excluir=()) -> list:
+    """Filtra cabeceras hop-by-hop de una lista (nombre, valor) conservando las repetidas."""
+    return [
+        (k, v) for k, v in raw_headers
+        if k.lower() not in HOP_BY_HOP and k.lower() not in excluir
+    ]
+
+
+def _saturado() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Servicio saturado; reintenta en unos segundos.",
+        headers={"Retry-After": str(LIMITER_RETRY_AFTER)},
+    )
+
+
+def _registrar_en_breaker(status_code: int) -> None:
+    """502/503/504 de Django (o de lo que tenga delante) cuentan como fallo; el resto, éxito."""
+    if status_code in (502, 503, 504):
+        breaker.registrar_fallo()
+    else:
+        breaker.registrar_exito()
+
+
+async def _proxy_streaming(request: Request, url: str) -> Response:
+    """
+    Passthrough sin buffer: el cuerpo de la petición se envía a Django a medida que llega
+    y la respuesta se devuelve tal cual (bytes crudos, status y cabeceras múltiples como Set-Cookie).
+    """
+    pool = get_django_async_pool()
+    client = pool or get_django_async_client()
+    upstream = client.build_request(
+        method=request.method,
+        url=url,
+        params=request.url.query,
+        headers=_sin_hop_by_hop(request.headers.raw, excluir=(b"host",)),
+        content=request.stream(),
+    )
+    try:
+        async with limitado(limiter, request.method, request.url.path) as resultado:
+            inicio = time.perf_counter()
+            try:
+                r = await client.send(upstream, stream=True)
+            except Exception as e:
+                breaker.registrar_fallo()
+                observar_upstream(request.method, request.url.path, None, time.perf_counter() - inicio)
+                raise HTTPException(status_code=502, detail=f"Error proxy auth: {e!s}")
+            # El hueco se libera al llegar las cabeceras: el relay del cuerpo ya no ocupa a Django
+            resultado["ok"] = r.status_code not in (502, 503, 504)
+    except (HTTPException, Saturado) as e:
+        if pool is None:
+            await client.aclose()
+        raise _saturado() if isinstance(e, Saturado) else e
+    observar_upstream(request.method, request.url.path, r.status_code, time.perf_counter() - inicio)
+    _registrar_en_breaker(r.status_code)
+
+    async def cerrar():
+        await r.aclose()
+        if pool is None:
+            await client.aclose()
+
+    response = StreamingResponse(r.aiter_raw(), status_code=r.status_code, background=BackgroundTask(cerrar))
+    # aiter_raw no descomprime: content-encoding y content-length de Django siguen siendo válidos
+    response.raw_headers = _sin_hop_by_hop(r.headers.raw)
+    return response
+
+
+@app.get("/proxy-limiter")
+def proxy_limiter():
+    """Límite adaptativo, peticiones en vuelo/en cola y rechazos por prioridad."""
+    return {"activo": limiter is not None, **(limiter.info() if limiter else {})}
+
+
+@app.get("/rate-limit")
+def rate_limit():
+    """Reglas activas y contadores del rate limiter del edge."""
+    return {"activo": rate_limiter is not None, **(rate_limiter.info() if rate_limiter else {})}
+
+
+@app.get("/auth-cache")
+def auth_cache_stats():
+    """Aciertos/fallos del cache de /me/ y /perfil/."""
+    return {"activo": auth_cache is not None, **(auth_cache.stats if auth_cache else {})}
+
+
+async def _pedir_a_django(method: str, url: str, query: str, body: bytes, headers: dict) -> httpx.Response:
+    """Petición con buffer a Django; registra el resultado en el breaker."""
+    path = httpx.URL(url).path
+    try:
+        async with limitado(limiter, method, path) as resultado, django_async_client() as client:
+            inicio = time.perf_counter()
+            try:
+                r = await client.request(method=method, url=url, params=query, content=body, headers=headers)
+            except Exception as e:
+                breaker.registrar_fallo()
+                observar_upstream(method, path, None, time.perf_counter() - inicio)
+                raise HTTPException(status_code=502, detail=f"Error proxy auth: {e!s}")
+            resultado["ok"] = r.status_code not in (502, 503, 504)
+    except Saturado:
+        raise _saturado()
+    observar_upstream(method, path, r.status_code, time.perf_counter() - inicio)
+    _registrar_en_breaker(r.status_code)
+    return r
+
+
+async def _pedir_coalescido(request: Request, url: str) -> httpx.Response:
+    """GET con buffer; si está activo el single-flight, comparte la llamada con GET idénticos en vuelo."""
+    headers = dict(request.headers)
+    headers.pop("host", None)
+
+    def pedir():
+        return _pedir_a_django("GET", url, request.url.query, b"", headers)
+
+    if not PROXY_COALESCING:
+        return await pedir()
+    clave = (
+        request.url.path,
+        request.url.query,
+        request.headers.get("authorization", ""),
+        request.headers.get("cookie", ""),  # la sesión puede ir en cookie en vez de Authorization
+        request.headers.get("accept", ""),
+    )
+    return await single_flight.ejecutar(clave, pedir)
+
+
 # Proxy de auth a Django (módulo 1): el frontend puede usar solo FastAPI como base URL
-@app.api_route("/api/auth/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
 async def proxy_auth(request: Request, path: str):
     """Reenvía todas las peticiones /api/auth/* a Django."""
     django_url = get_django_internal_url().rstrip("/")
     url = f"{django_url}/api/auth/{path}"
-    async with get_django_async_client() as client:
-        body = await request.body()
+    prueba = breaker.estado == SEMIABIERTO
+    if not breaker.permitir():
+        raise HTTPException(
+            status_code=503,
+            detail="Django no disponible (circuito abierto).",
+            headers={"Retry-After": str(breaker.reintentar_en())},
+        )
+    try:
+        return await _reenviar(request, url)
+    finally:
+        if prueba:
+            breaker.soltar_prueba()  # sin resultado (limitador saturado, cliente desconectado...)
+
+
+async def _reenviar(request: Request, url: str) -> Response:
+    if PROXY_STREAMING and (request.method != "GET" or not PROXY_COALESCING):
+        # Sin single-flight un GET no comparte respuesta: también va chunk a chunk
+        return await _proxy_streaming(request, url)
+    if request.method == "GET":
+        r = await _pedir_coalescido(request, url)
+        if PROXY_STREAMING:
+            # Respuesta compartida ya en memoria: mismas cabeceras que el modo streaming
+            response = Response(content=r.content, status_code=r.status_code)
+            response.raw_headers = _sin_hop_by_hop(
+                r.headers.raw, excluir=(b"content-length", b"content-encoding")
+            ) + [(b"content-length", str(len(r.content)).encode())]
+            return response
+    else:
         headers = dict(request.headers)
         headers.pop("host", None)
-        try:
-            r = await client.request(
-                method=request.method,
-                url=url,
-                content=body,
-                headers=headers,
-            )
-            if not r.content:
-                return Response(status_code=r.status_code)
-            ct = r.headers.get("content-type", "")
-            if "application/json" in ct:
-                return JSONResponse(status_code=r.status_code, content=r.json())
-            return Response(status_code=r.status_code, content=r.content, media_type=ct)
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"Error proxy auth: {e!s}")
+        r = await _pedir_a_django(request.method, url, request.url.query, await request.body(), headers)
+    try:
+        if not r.content:
+            return Response(status_code=r.status_code)
+        ct = r.headers.get("content-type", "")
+        if "application/json" in ct:
+            return JSONResponse(status_code=r.status_code, content=r.json())
+        return Response(status_code=r.status_code, content=r.content, media_type=ct)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Error proxy auth: {e!s}")
+
+
+# /api/auth/*: Django montado en el mismo proceso (opt-in) o proxy HTTP (por defecto)
+if DJANGO_INPROCESS:
+    app.mount("/api/auth", DjangoMount(django_asgi_app))
+else:
+    app.add_api_route(
+        "/api/auth/{path:path}",
+        proxy_auth,
+        methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+    )
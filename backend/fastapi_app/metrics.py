@@ -0,0 +1,156 @@
+"""
+Métricas Prometheus de FastAPI: latencia por ruta, peticiones en vuelo y tiempo upstream
+(Django) frente al tiempo total de cada petición proxied.
+
+Con varios workers (uvicorn --workers N / gunicorn) definir PROMETHEUS_MULTIPROC_DIR
+(directorio vacío y escribible, el mismo para todos los workers) antes de arrancar:
+cada worker escribe sus valores ahí y /metrics los agrega.
+"""
+import hmac
+import ipaddress
+import os
+import re
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from starlette.responses import Response
+
+from shared.config import get_metrics_allowed_ips, get_metrics_token
+
+# Desde lecturas cacheadas (ms) hasta login con PBKDF2 (~1 s) y el timeout interno (10 s)
+LATENCIA_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_DURATION = Histogram(
+    "fastapi_http_request_duration_seconds",
+    "Latencia total de la petición en FastAPI",
+    ["method", "route", "status"],
+    buckets=LATENCIA_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "fastapi_http_requests_in_flight",
+    "Peticiones en curso en FastAPI",
+    multiprocess_mode="livesum",
+)
+UPSTREAM_DURATION = Histogram(
+    "fastapi_proxy_upstream_duration_seconds",
+    "Tiempo de Django (hasta cabeceras de respuesta) en peticiones proxied",
+    ["method", "route", "status"],
+    buckets=LATENCIA_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "fastapi_proxy_upstream_errors_total",
+    "Errores de transporte hacia Django",
+    ["route"],
+)
+
+LIMITER_LIMIT = Gauge(
+    "fastapi_limiter_limit",
+    "Límite de concurrencia adaptativo hacia Django",
+    multiprocess_mode="livesum",
+)
+LIMITER_IN_FLIGHT = Gauge(
+    "fastapi_limiter_in_flight",
+    "Peticiones hacia Django dentro del limitador",
+    multiprocess_mode="livesum",
+)
+LIMITER_QUEUE = Gauge(
+    "fastapi_limiter_queue_depth",
+    "Peticiones esperando hueco en el limitador",
+    multiprocess_mode="livesum",
+)
+LIMITER_SHED = Counter(
+    "fastapi_limiter_shed_total",
+    "Peticiones rechazadas con 503 por el limitador",
+    ["prioridad"],
+)
+
+RATE_LIMIT_DECISIONS = Counter(
+    "fastapi_rate_limit_decisions_total",
+    "Decisiones del rate limiter del edge por regla",
+    ["route", "clave", "decision"],
+)
+
+_SEGMENTO_ID = re.compile(r"/\d+(?=/|$)")
+
+# Rutas de core/urls.py: cualquier otra ruta bajo /api/auth/ se etiqueta "unmatched"
+RUTAS_AUTH = frozenset("/api/auth/" + r for r in (
+    "", "registro/", "login/", "verificar-email/", "verificar-otp/",
+    "restablecer-password/solicitar/", "restablecer-password/", "token/refresh/",
+    "me/", "cambiar-password/", "perfil/", "perfil/actualizar/", "perfil/avatar/",
+    "sesiones/", "sesiones/{id}/revocar/", "sesiones/revocar-otras/",
+    "2fa/setup/", "2fa/activar/", "2fa/estado/", "2fa/desactivar/",
+))
+
+
+def ruta_auth(path: str) -> str:
+    """Etiqueta para /api/auth/*: ids numéricos como {id} y solo rutas conocidas (cardinalidad acotada)."""
+    route = _SEGMENTO_ID.sub("/{id}", path)
+    return route if route in RUTAS_AUTH else "unmatched"
+
+
+def observar_upstream(method: str, path: str, status, segundos: float) -> None:
+    route = ruta_auth(path)
+    if status is None:
+        UPSTREAM_ERRORS.labels(route).inc()
+        return
+    UPSTREAM_DURATION.labels(method, route, str(status)).observe(segundos)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI más externo: mide todas las respuestas, incluidas las del gate JWT o CORS."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_con_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_con_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_DURATION.labels(scope["method"], self._route(scope, status["code"]), str(status["code"])).observe(
+                time.perf_counter() - inicio
+            )
+
+    @staticmethod
+    def _route(scope, status: int) -> str:
+        if status == 404:
+            return "unmatched"
+        if scope["path"].startswith("/api/auth/"):
+            return ruta_auth(scope["path"])
+        route = scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+
+def metrics_permitido(ip: str, authorization: str) -> bool:
+    """IP del socket dentro de METRICS_ALLOWED_IPS, o Bearer igual a METRICS_TOKEN."""
+    token = get_metrics_token()
+    if token and hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        return True
+    try:
+        ip = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(ip in red for red in get_metrics_allowed_ips())
+
+
+def metrics_response() -> Response:
+    """Exposición en formato texto Prometheus (agregada entre workers si hay PROMETHEUS_MULTIPROC_DIR)."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,250 @@
+"""
+Rate limiting en el edge para login, verificar-OTP y solicitar restablecimiento de password.
+
+- Contador de ventana deslizante (ventana actual + anterior ponderada): memoria acotada y
+  sin ráfagas dobles en el cambio de ventana como en las ventanas fijas.
+- Claves por IP, email y usuario_id leídos del cuerpo JSON; las reglas se evalúan en orden y
+  la primera que se excede corta (un IP bloqueado no sigue sumando en el email de la víctima).
+- Se rechaza con 429 + Retry-After antes de llegar a Django, es decir, antes de PBKDF2; un
+  cuerpo de más de MAX_CUERPO, con 413.
+- Backends: memoria (por proceso) o Redis (compartido entre workers, opcional). Si el backend
+  falla se deja pasar la petición (fail-open) y se registra en el log.
+"""
+import hashlib
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.responses import JSONResponse
+
+from fastapi_app.metrics import RATE_LIMIT_DECISIONS
+
+logger = logging.getLogger(__name__)
+
+# Login/OTP/reset ocupan unos cientos de bytes: un cuerpo mayor se rechaza con 413 (sin
+# inspeccionarlo se saltarían las reglas por email y usuario_id)
+MAX_CUERPO = 16 * 1024
+
+# ruta -> [(campo, límite, ventana_s)]; campo: ip | email | usuario_id
+REGLAS_POR_DEFECTO = {
+    "/api/auth/login/": "ip=20/60,email=10/300",
+    "/api/auth/verificar-otp/": "ip=20/60,usuario_id=5/300",
+    "/api/auth/restablecer-password/solicitar/": "ip=10/300,email=3/900",
+}
+
+
+def parsear_reglas(texto: str) -> list:
+    """`"ip=20/60,email=10/300"` -> [("ip", 20, 60.0), ("email", 10, 300.0)]."""
+    reglas = []
+    for parte in texto.split(","):
+        if not parte.strip():
+            continue
+        campo, _, valor = parte.strip().partition("=")
+        limite, _, ventana = valor.partition("/")
+        if campo not in ("ip", "email", "usuario_id"):
+            raise ValueError(f"Campo de rate limit desconocido: {campo!r}")
+        reglas.append((campo, int(limite), float(ventana)))
+    return reglas
+
+
+def _estimar(anterior: int, actual: int, inicio: float, ventana: float, ahora: float) -> float:
+    """Peticiones en la última `ventana` s suponiendo las de la ventana anterior uniformes."""
+    return anterior * (1 - (ahora - inicio) / ventana) + actual
+
+
+def _reintentar_en(anterior: int, actual: int, inicio: float, ventana: float, ahora: float, limite: int) -> int:
+    """Segundos hasta que la estimación baje de `limite` (al menos 1)."""
+    if anterior and actual < limite:
+        # la parte ponderada de la ventana anterior tiene que bajar lo suficiente
+        fin = inicio + ventana * (1 - (limite - actual) / anterior)
+        return max(1, math.ceil(fin - ahora))
+    return max(1, math.ceil(inicio + ventana - ahora))
+
+
+class MemoriaBackend:
+    """Contadores en memoria del proceso, LRU acotado por número de claves."""
+
+    def __init__(self, max_claves: int = 100000):
+        self.max_claves = max_claves
+        self._datos: "OrderedDict[str, list]" = OrderedDict()  # clave -> [inicio, anterior, actual]
+
+    async def consumir(self, clave: str, limite: int, ventana: float) -> tuple:
+        ahora = time.time()
+        inicio = ahora - ahora % ventana
+        datos = self._datos.get(clave)
+        if datos is None or datos[0] < inicio - ventana:
+            datos = [inicio, 0, 0]
+        elif datos[0] < inicio:
+            datos = [inicio, datos[2], 0]
+        self._datos[clave] = datos
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_claves:
+            self._datos.popitem(last=False)
+        if _estimar(datos[1], datos[2], inicio, ventana, ahora) >= limite:
+            return False, _reintentar_en(datos[1], datos[2], inicio, ventana, ahora, limite)
+        datos[2] += 1
+        return True, 0
+
+    async def close(self) -> None:
+        self._datos.clear()
+
+
+class RedisBackend:
+    """Contadores compartidos entre workers (paquete redis, en requirements.txt). Una clave por ventana."""
+
+    def __init__(self, url: str, prefijo: str = "ratelimit:"):
+        import redis.asyncio as redis  # import diferido: solo si se configura FASTAPI_RATE_LIMIT_URL
+
+        self._redis = redis.from_url(url)
+        self.prefijo = prefijo
+
+    async def consumir(self, clave: str, limite: int, ventana: float) -> tuple:
+        ahora = time.time()
+        inicio = ahora - ahora % ventana
+        n = int(inicio // ventana)
+        key = f"{self.prefijo}{clave}:{int(ventana)}:"
+        # INCR primero (atómico entre workers) y se deshace si la petición no entra
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.get(key + str(n - 1))
+            pipe.incr(key + str(n))
+            pipe.expire(key + str(n), math.ceil(2 * ventana))
+            anterior, actual, _ = await pipe.execute()
+        anterior, actual = int(anterior or 0), actual - 1
+        if _estimar(anterior, actual, inicio, ventana, ahora) >= limite:
+            await self._redis.decr(key + str(n))
+            return False, _reintentar_en(anterior, actual, inicio, ventana, ahora, limite)
+        return True, 0
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class RateLimiter:
+    def __init__(self, backend, reglas: dict):
+        self.backend = backend
+        self.reglas = reglas  # ruta -> [(campo, límite, ventana)]
+        self.stats = {"permitidas": 0, "rechazadas": 0, "errores": 0}
+
+    async def comprobar(self, ruta: str, valores: dict) -> int:
+        """0 si la petición pasa; si no, segundos para Retry-After. Consume en cada regla aplicada."""
+        for campo, limite, ventana in self.reglas.get(ruta, ()):
+            valor = valores.get(campo)
+            if valor is None:
+                continue
+            clave = f"{ruta}|{campo}|{valor}"
+            try:
+                permitida, reintentar = await self.backend.consumir(clave, limite, ventana)
+            except Exception:
+                self.stats["errores"] += 1
+                logger.exception("rate_limit: error en el backend, se deja pasar")
+                return 0
+            RATE_LIMIT_DECISIONS.labels(ruta, campo, "permitida" if permitida else "rechazada").inc()
+            if not permitida:
+                self.stats["rechazadas"] += 1
+                return reintentar
+        self.stats["permitidas"] += 1
+        return 0
+
+    def info(self) -> dict:
+        return {
+            "reglas": {ruta: [f"{c}={limite}/{int(v)}" for c, limite, v in r] for ruta, r in self.reglas.items()},
+            **self.stats,
+        }
+
+
+def crear_rate_limiter(url: str = "", reglas: Optional[dict] = None) -> RateLimiter:
+    """
+    Backend Redis si se da `url` (redis://...), si no en memoria. `reglas`: ruta -> texto que
+    sustituye al de REGLAS_POR_DEFECTO (None: el de por defecto; "": sin límite en esa ruta).
+    """
+    reglas = {**REGLAS_POR_DEFECTO, **{r: t for r, t in (reglas or {}).items() if t is not None}}
+    backend = RedisBackend(url) if url else MemoriaBackend()
+    return RateLimiter(backend, {ruta: parsear_reglas(texto) for ruta, texto in reglas.items() if texto})
+
+
+def _hash(valor: str) -> str:
+    # emails fuera del backend en claro (Redis compartido)
+    return hashlib.sha256(valor.encode()).hexdigest()[:32]
+
+
+def ip_cliente(scope, proxies_confiables: int = 0) -> Optional[str]:
+    """
+    IP del cliente. Con `proxies_confiables=N` se toma la entrada N-ésima desde la derecha de
+    X-Forwarded-For (la que añadió el primer proxy propio); lo de la izquierda lo controla el cliente.
+    """
+    if proxies_confiables:
+        xff = next((v for k, v in scope["headers"] if k == b"x-forwarded-for"), b"").decode("latin-1")
+        saltos = [s.strip() for s in xff.split(",") if s.strip()]
+        if len(saltos) >= proxies_confiables:
+            return saltos[-proxies_confiables]
+    cliente = scope.get("client")
+    return cliente[0] if cliente else None
+
+
+def _valores(cuerpo: bytes) -> dict:
+    try:
+        data = json.loads(cuerpo)
+    except (ValueError, UnicodeDecodeError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    valores = {}
+    email = data.get("email")
+    if isinstance(email, str) and email.strip():
+        valores["email"] = _hash(email.strip().lower())
+    usuario_id = data.get("usuario_id")
+    if isinstance(usuario_id, (int, str)) and str(usuario_id).strip().isdigit():
+        valores["usuario_id"] = str(int(usuario_id))
+    return valores
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI: lee el cuerpo de los POST con reglas, decide y lo reinyecta intacto."""
+
+    def __init__(self, app, limiter: RateLimiter, proxies_confiables: int = 0):
+        self.app = app
+        self.limiter = limiter
+        self.proxies_confiables = proxies_confiables
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.limiter.reglas:
+            await self.app(scope, receive, send)
+            return
+        mensajes, cuerpo = [], b""
+        while True:
+            message = await receive()
+            mensajes.append(message)
+            if message["type"] != "http.request":
+                break
+            cuerpo += message.get("body", b"")
+            if not message.get("more_body") or len(cuerpo) > MAX_CUERPO:
+                break
+        if len(cuerpo) > MAX_CUERPO:
+            RATE_LIMIT_DECISIONS.labels(scope["path"], "cuerpo", "rechazada").inc()
+            response = JSONResponse(
+                {"detail": "Cuerpo de la petición demasiado grande.", "code": "payload_too_large"},
+                status_code=413,
+            )
+            await response(scope, receive, send)
+            return
+        valores = _valores(cuerpo)
+        ip = ip_cliente(scope, self.proxies_confiables)
+        if ip:
+            valores["ip"] = ip
+        reintentar = await self.limiter.comprobar(scope["path"], valores)
+        if reintentar:
+            response = JSONResponse(
+                {"detail": f"Demasiados intentos. Reintenta en {reintentar} s.", "code": "rate_limited"},
+                status_code=429,
+                headers={"Retry-After": str(reintentar)},
+            )
+            await response(scope, receive, send)
+            return
+
+        async def receive_reinyectado():
+            return mensajes.pop(0) if mensajes else await receive()
+
+        await self.app(scope, receive_reinyectado, send)
@@ -0,0 +1,102 @@
+"""
+Circuit breaker hacia Django (fastapi_app/breaker.py) y su uso en el proxy.
+Uso (desde backend/): python -m pytest fastapi_app/tests
+"""
+import unittest
+from unittest import mock
+
+import httpx
+
+from fastapi_app import main
+from fastapi_app.breaker import ABIERTO, CERRADO, SEMIABIERTO, CircuitBreaker
+from fastapi_app.tests.test_limiter import _lleno
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self) -> float:
+        return self.ahora
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def setUp(self):
+        self.reloj = Reloj()
+        parche = mock.patch("fastapi_app.breaker.time.monotonic", self.reloj)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.breaker = CircuitBreaker(umbral_fallos=3, recuperacion=10)
+
+    def _abrir(self):
+        for _ in range(3):
+            self.breaker.registrar_fallo()
+
+    def test_se_abre_tras_el_umbral_de_fallos_seguidos(self):
+        self.breaker.registrar_fallo()
+        self.breaker.registrar_fallo()
+        self.breaker.registrar_exito()  # el éxito reinicia la cuenta
+        self.breaker.registrar_fallo()
+        self.breaker.registrar_fallo()
+        self.assertEqual(self.breaker.estado, CERRADO)
+        self.breaker.registrar_fallo()
+        self.assertEqual(self.breaker.estado, ABIERTO)
+        self.assertFalse(self.breaker.permitir())
+        self.assertEqual(self.breaker.reintentar_en(), 11)
+
+    def test_half_open_deja_pasar_una_sola_prueba(self):
+        self._abrir()
+        self.reloj.ahora += 10
+        self.assertEqual(self.breaker.estado, SEMIABIERTO)
+        self.assertTrue(self.breaker.permitir())
+        self.assertFalse(self.breaker.permitir())
+
+    def test_prueba_correcta_cierra(self):
+        self._abrir()
+        self.reloj.ahora += 10
+        self.breaker.permitir()
+        self.breaker.registrar_exito()
+        self.assertEqual(self.breaker.estado, CERRADO)
+        self.assertTrue(self.breaker.permitir())
+
+    def test_prueba_fallida_reabre_con_un_solo_fallo(self):
+        self._abrir()
+        self.reloj.ahora += 10
+        self.breaker.permitir()
+        self.breaker.registrar_fallo()
+        self.assertEqual(self.breaker.estado, ABIERTO)
+        self.reloj.ahora += 9
+        self.assertFalse(self.breaker.permitir())
+
+    def test_prueba_sin_resultado_queda_libre(self):
+        self._abrir()
+        self.reloj.ahora += 10
+        self.assertTrue(self.breaker.permitir())
+        self.breaker.soltar_prueba()
+        self.assertEqual(self.breaker.estado, SEMIABIERTO)
+        self.assertTrue(self.breaker.permitir())
+
+
+class ProxyBreakerTests(unittest.IsolatedAsyncioTestCase):
+    async def _post_login(self) -> httpx.Response:
+        transporte = httpx.ASGITransport(app=main.app, client=("127.0.0.1", 5000))
+        async with httpx.AsyncClient(transport=transporte, base_url="http://edge") as cliente:
+            return await cliente.post("/api/auth/login/", json={"email": "a@b.invalid", "password": "x"})
+
+    async def test_circuito_abierto_responde_503_sin_llamar_a_django(self):
+        breaker = CircuitBreaker(umbral_fallos=1, recuperacion=30)
+        breaker.registrar_fallo()
+        with mock.patch.object(main, "breaker", breaker), mock.patch.object(main, "_reenviar") as reenviar:
+            r = await self._post_login()
+        self.assertEqual(r.status_code, 503)
+        self.assertIn(r.headers["retry-after"], ("30", "31"))  # recuperación restante + 1
+        reenviar.assert_not_called()
+
+    async def test_prueba_rechazada_por_el_limitador_no_bloquea_el_half_open(self):
+        breaker = CircuitBreaker(umbral_fallos=1, recuperacion=0)
+        breaker.registrar_fallo()
+        with mock.patch.object(main, "breaker", breaker), mock.patch.object(main, "limiter", _lleno(espera_max=0)):
+            r = await self._post_login()
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(breaker.estado, SEMIABIERTO)
+        self.assertTrue(breaker.permitir())
@@ -0,0 +1,116 @@
+"""
+Single-flight de GET idénticos (fastapi_app/coalescing.py).
+Uso (desde backend/): python -m pytest fastapi_app/tests
+"""
+import asyncio
+import unittest
+from unittest import mock
+
+import httpx
+
+from fastapi_app import main
+from fastapi_app.coalescing import SingleFlight
+
+
+class SingleFlightTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.sf = SingleFlight()
+        self.llamadas = 0
+        self.liberar = asyncio.Event()
+
+    async def _pedir(self, resultado="respuesta"):
+        self.llamadas += 1
+        await self.liberar.wait()
+        if isinstance(resultado, Exception):
+            raise resultado
+        return resultado
+
+    async def _lanzar(self, n: int, clave="k", resultado="respuesta") -> list:
+        tareas = [asyncio.create_task(self.sf.ejecutar(clave, lambda: self._pedir(resultado))) for _ in range(n)]
+        await asyncio.sleep(0)
+        return tareas
+
+    async def test_una_llamada_para_todas_las_concurrentes(self):
+        tareas = await self._lanzar(5)
+        self.liberar.set()
+        self.assertEqual(await asyncio.gather(*tareas), ["respuesta"] * 5)
+        self.assertEqual(self.llamadas, 1)
+        self.assertEqual(self.sf.stats, {"lideres": 1, "compartidas": 4, "sin_coalescer": 0})
+        self.assertEqual(self.sf.info()["en_vuelo"], 0)
+
+    async def test_claves_distintas_no_se_comparten(self):
+        tareas = await self._lanzar(2, "a") + await self._lanzar(2, "b")
+        self.liberar.set()
+        await asyncio.gather(*tareas)
+        self.assertEqual(self.llamadas, 2)
+
+    async def test_terminada_la_llamada_la_siguiente_es_nueva(self):
+        self.liberar.set()
+        await self.sf.ejecutar("k", self._pedir)
+        await self.sf.ejecutar("k", self._pedir)
+        self.assertEqual(self.llamadas, 2)
+
+    async def test_el_error_llega_a_todas(self):
+        tareas = await self._lanzar(3, resultado=ConnectionError("caído"))
+        self.liberar.set()
+        resultados = await asyncio.gather(*tareas, return_exceptions=True)
+        self.assertTrue(all(isinstance(r, ConnectionError) for r in resultados))
+        self.assertEqual(self.llamadas, 1)
+
+    async def test_si_el_lider_se_va_las_demas_reciben_la_respuesta(self):
+        lider, *resto = await self._lanzar(3)
+        lider.cancel()
+        await asyncio.sleep(0)
+        self.liberar.set()
+        self.assertEqual(await asyncio.gather(*resto), ["respuesta"] * 2)
+        self.assertTrue(lider.cancelled())
+        self.assertEqual(self.llamadas, 1)
+
+    async def test_por_encima_de_max_claves_no_coalesce(self):
+        self.sf = SingleFlight(max_claves=1)
+        tareas = await self._lanzar(1, "a") + await self._lanzar(2, "b")
+        self.liberar.set()
+        await asyncio.gather(*tareas)
+        self.assertEqual(self.llamadas, 3)
+        self.assertEqual(self.sf.stats["sin_coalescer"], 2)
+
+
+class ProxyCoalescingTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.llamadas = []
+        self.liberar = asyncio.Event()
+
+        async def pedir_a_django(method, url, query, body, headers):
+            self.llamadas.append(headers.get("cookie"))
+            await self.liberar.wait()
+            return httpx.Response(200, json={"cookie": headers.get("cookie")})
+
+        for parche in (
+            mock.patch.object(main, "_pedir_a_django", pedir_a_django),
+            mock.patch.object(main, "single_flight", SingleFlight()),
+            mock.patch.object(main, "PROXY_COALESCING", True),
+            mock.patch.object(main, "PROXY_STREAMING", False),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    async def _gets(self, cookies: list) -> list:
+        transporte = httpx.ASGITransport(app=main.app, client=("127.0.0.1", 5000))
+        async with httpx.AsyncClient(transport=transporte, base_url="http://edge") as cliente:
+            tareas = [
+                asyncio.create_task(cliente.get("/api/auth/verificar-email/?token=t", headers={"Cookie": c}))
+                for c in cookies
+            ]
+            async with asyncio.timeout(5):
+                while len(self.llamadas) + main.single_flight.stats["compartidas"] < len(cookies):
+                    await asyncio.sleep(0.001)
+            self.liberar.set()
+            return [r.json()["cookie"] for r in await asyncio.gather(*tareas)]
+
+    async def test_cookies_distintas_no_comparten_respuesta(self):
+        self.assertEqual(await self._gets(["sessionid=a", "sessionid=b"]), ["sessionid=a", "sessionid=b"])
+        self.assertEqual(sorted(self.llamadas), ["sessionid=a", "sessionid=b"])
+
+    async def test_misma_cookie_comparte(self):
+        self.assertEqual(await self._gets(["sessionid=a"] * 3), ["sessionid=a"] * 3)
+        self.assertEqual(self.llamadas, ["sessionid=a"])
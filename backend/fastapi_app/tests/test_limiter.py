@@ -0,0 +1,105 @@
+"""
+Limitador de concurrencia (fastapi_app/limiter.py) y su 503 en el proxy.
+Uso (desde backend/): python -m pytest fastapi_app/tests
+"""
+import asyncio
+import unittest
+from unittest import mock
+
+import httpx
+
+from fastapi_app import main
+from fastapi_app.limiter import BAJA, CRITICA, NORMAL, AdaptiveLimiter, Saturado
+
+
+def _lleno(**opciones) -> AdaptiveLimiter:
+    """Límite 1 con el hueco ya ocupado."""
+    limiter = AdaptiveLimiter(limite_inicial=1, minimo=1, **opciones)
+    limiter._ocupar()
+    return limiter
+
+
+class AdaptiveLimiterTests(unittest.IsolatedAsyncioTestCase):
+    async def test_sin_espera_rechaza_al_instante(self):
+        limiter = _lleno(espera_max=0)
+        with self.assertRaises(Saturado):
+            await limiter.adquirir(NORMAL)
+        self.assertEqual(limiter.rechazadas["normal"], 1)
+
+    async def test_espera_vencida_rechaza(self):
+        limiter = _lleno(espera_max=0.01)
+        with self.assertRaises(Saturado):
+            await limiter.adquirir(NORMAL)
+        self.assertEqual(limiter.info()["en_cola"], 0)
+
+    async def test_cola_llena_desaloja_al_de_menor_prioridad(self):
+        limiter = _lleno(max_cola=1, espera_max=5)
+        baja = asyncio.create_task(limiter.adquirir(BAJA))
+        await asyncio.sleep(0)
+        critica = asyncio.create_task(limiter.adquirir(CRITICA))
+        with self.assertRaises(Saturado):
+            await baja
+        limiter.liberar("/api/auth/login/", 0.01, True)
+        await critica
+        self.assertEqual(limiter.en_vuelo, 1)
+        self.assertEqual(limiter.rechazadas, {"critica": 0, "normal": 0, "baja": 1})
+
+    async def test_cola_llena_sin_nadie_peor_rechaza(self):
+        limiter = _lleno(max_cola=1, espera_max=5)
+        critica = asyncio.create_task(limiter.adquirir(CRITICA))
+        await asyncio.sleep(0)
+        with self.assertRaises(Saturado):
+            await limiter.adquirir(NORMAL)
+        critica.cancel()
+
+    async def test_despacha_por_prioridad(self):
+        limiter = _lleno(espera_max=5)
+        orden = []
+
+        async def esperar(prioridad):
+            await limiter.adquirir(prioridad)
+            orden.append(prioridad)
+
+        tareas = [asyncio.create_task(esperar(p)) for p in (NORMAL, CRITICA)]
+        await asyncio.sleep(0)
+        limiter.liberar("/api/auth/me/", 0.01, True)  # límite 2: normal solo puede ocupar 1 (90 %)
+        await asyncio.sleep(0.01)
+        self.assertEqual(orden, [CRITICA])
+        limiter.liberar("/api/auth/login/", 0.01, True)
+        await asyncio.gather(*tareas)
+        self.assertEqual(orden, [CRITICA, NORMAL])
+
+    async def test_cancelada_tras_recibir_hueco_lo_devuelve(self):
+        limiter = _lleno(espera_max=5)
+        espera = asyncio.create_task(limiter.adquirir(NORMAL))
+        await asyncio.sleep(0)
+        limiter.liberar("/api/auth/me/", 0.01, True)  # el hueco pasa a `espera`
+        espera.cancel()
+        try:
+            await espera
+        except asyncio.CancelledError:
+            self.assertEqual(limiter.en_vuelo, 0)
+        else:  # Python < 3.12: wait_for devuelve el resultado y la petición sigue con su hueco
+            self.assertEqual(limiter.en_vuelo, 1)
+
+    async def test_latencia_alta_baja_el_limite_y_la_sana_lo_sube(self):
+        limiter = AdaptiveLimiter(limite_inicial=100, enfriamiento=0)
+        for latencia in (0.01, 0.05):  # línea base 10 ms; 50 ms > tolerancia (2x)
+            await limiter.adquirir(NORMAL)
+            limiter.liberar("/api/auth/me/", latencia, True)
+        bajado = limiter.limite
+        self.assertAlmostEqual(bajado, (100 + 1 / 100) * 0.9)
+        await limiter.adquirir(NORMAL)
+        limiter.liberar("/api/auth/me/", 0.01, True)
+        self.assertGreater(limiter.limite, bajado)
+
+
+class ProxySaturadoTests(unittest.IsolatedAsyncioTestCase):
+    async def test_503_con_retry_after(self):
+        with mock.patch.object(main, "limiter", _lleno(espera_max=0)), \
+                mock.patch.object(main, "LIMITER_RETRY_AFTER", 3):
+            transporte = httpx.ASGITransport(app=main.app, client=("127.0.0.1", 5000))
+            async with httpx.AsyncClient(transport=transporte, base_url="http://edge") as cliente:
+                r = await cliente.post("/api/auth/login/", json={"email": "a@b.invalid", "password": "x"})
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(r.headers["retry-after"], "3")
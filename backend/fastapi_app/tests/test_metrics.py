@@ -0,0 +1,31 @@
+"""
+Acceso a /metrics del edge: red permitida (METRICS_ALLOWED_IPS) o METRICS_TOKEN.
+Uso (desde backend/): python -m pytest fastapi_app/tests
+"""
+import os
+import unittest
+from unittest import mock
+
+import httpx
+
+from fastapi_app import main
+
+
+class MetricsAccesoTests(unittest.IsolatedAsyncioTestCase):
+    async def _get(self, ip: str, headers: dict | None = None) -> httpx.Response:
+        transporte = httpx.ASGITransport(app=main.app, client=(ip, 5000))
+        async with httpx.AsyncClient(transport=transporte, base_url="http://edge") as cliente:
+            return await cliente.get("/metrics", headers=headers or {})
+
+    @mock.patch.dict(os.environ, {"METRICS_ALLOWED_IPS": "127.0.0.1/32,10.1.0.0/16", "METRICS_TOKEN": ""})
+    async def test_solo_desde_la_red_permitida(self):
+        self.assertEqual((await self._get("127.0.0.1")).status_code, 200)
+        self.assertEqual((await self._get("10.1.2.3")).status_code, 200)
+        self.assertEqual((await self._get("203.0.113.7")).status_code, 403)
+        # Sin METRICS_TOKEN, un "Bearer " vacío no abre nada
+        self.assertEqual((await self._get("203.0.113.7", {"Authorization": "Bearer "})).status_code, 403)
+
+    @mock.patch.dict(os.environ, {"METRICS_ALLOWED_IPS": "127.0.0.1/32", "METRICS_TOKEN": "s3creto"})
+    async def test_token_desde_fuera(self):
+        self.assertEqual((await self._get("203.0.113.7", {"Authorization": "Bearer s3creto"})).status_code, 200)
+        self.assertEqual((await self._get("203.0.113.7", {"Authorization": "Bearer otro"})).status_code, 403)
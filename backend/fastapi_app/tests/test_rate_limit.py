@@ -0,0 +1,106 @@
+"""
+Rate limiting del edge (fastapi_app/rate_limit.py): ventana deslizante, 429 con Retry-After y 413.
+Uso (desde backend/): python -m pytest fastapi_app/tests
+"""
+import json
+import unittest
+from unittest import mock
+
+import httpx
+
+from fastapi_app.rate_limit import MAX_CUERPO, MemoriaBackend, RateLimiter, RateLimitMiddleware, parsear_reglas
+
+LOGIN = "/api/auth/login/"
+
+
+class VentanaDeslizanteTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.ahora = 600.0  # inicio de una ventana de 60 s
+        parche = mock.patch("fastapi_app.rate_limit.time.time", lambda: self.ahora)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.backend = MemoriaBackend()
+
+    async def _consumir(self) -> tuple:
+        return await self.backend.consumir("clave", 3, 60)
+
+    async def test_limite_en_la_ventana_actual(self):
+        for _ in range(3):
+            self.assertEqual(await self._consumir(), (True, 0))
+        self.ahora = 630
+        self.assertEqual(await self._consumir(), (False, 30))  # hasta que empiece la siguiente
+
+    async def test_la_ventana_anterior_cuenta_ponderada(self):
+        for _ in range(3):
+            await self._consumir()
+        self.ahora = 690  # mitad de la siguiente: 3 * 0.5 = 1.5 de la anterior
+        self.assertEqual(await self._consumir(), (True, 0))
+        self.assertEqual(await self._consumir(), (True, 0))
+        # 1.5 + 2 >= 3; la parte de la anterior baja de 1 a los 700 s
+        self.assertEqual(await self._consumir(), (False, 10))
+        self.ahora = 780  # dos ventanas después: nada cuenta
+        self.assertEqual(await self._consumir(), (True, 0))
+
+    async def test_lru_acotado(self):
+        backend = MemoriaBackend(max_claves=2)
+        for clave in ("a", "b", "c"):
+            await backend.consumir(clave, 1, 60)
+        self.assertEqual(list(backend._datos), ["b", "c"])
+
+    def test_parsear_reglas(self):
+        self.assertEqual(parsear_reglas("ip=20/60, email=10/300,"), [("ip", 20, 60.0), ("email", 10, 300.0)])
+        with self.assertRaises(ValueError):
+            parsear_reglas("cookie=1/60")
+
+
+class MiddlewareTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.recibidos = []
+
+        async def eco(scope, receive, send):
+            cuerpo, mas = b"", True
+            while mas:
+                message = await receive()
+                cuerpo += message.get("body", b"")
+                mas = message.get("more_body", False)
+            self.recibidos.append(cuerpo)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        self.limiter = RateLimiter(MemoriaBackend(), {LOGIN: parsear_reglas("ip=100/60,email=2/60")})
+        self.app = RateLimitMiddleware(eco, self.limiter)
+
+    async def _post(self, cuerpo, ruta: str = LOGIN) -> httpx.Response:
+        transporte = httpx.ASGITransport(app=self.app, client=("10.0.0.1", 5000))
+        async with httpx.AsyncClient(transport=transporte, base_url="http://edge") as cliente:
+            return await cliente.post(ruta, content=cuerpo if isinstance(cuerpo, bytes) else json.dumps(cuerpo))
+
+    async def test_429_con_retry_after_por_email_normalizado(self):
+        self.assertEqual((await self._post({"email": "Ana@Test.invalid"})).status_code, 200)
+        self.assertEqual((await self._post({"email": " ana@test.invalid"})).status_code, 200)
+        r = await self._post({"email": "ANA@test.invalid"})
+        self.assertEqual(r.status_code, 429)
+        self.assertEqual(r.json()["code"], "rate_limited")
+        self.assertTrue(1 <= int(r.headers["retry-after"]) <= 60)
+        self.assertEqual((await self._post({"email": "otra@test.invalid"})).status_code, 200)
+        self.assertEqual(self.limiter.stats["rechazadas"], 1)
+
+    async def test_el_cuerpo_llega_intacto(self):
+        cuerpo = json.dumps({"email": "ana@test.invalid", "password": "x" * 1000}).encode()
+        await self._post(cuerpo)
+        self.assertEqual(self.recibidos, [cuerpo])
+
+    async def test_413_sin_llegar_a_la_app(self):
+        r = await self._post(b"x" * (MAX_CUERPO + 1))
+        self.assertEqual(r.status_code, 413)
+        self.assertEqual(r.json()["code"], "payload_too_large")
+        self.assertEqual(self.recibidos, [])
+
+    async def test_rutas_sin_reglas_pasan(self):
+        for _ in range(3):
+            self.assertEqual((await self._post({"email": "ana@test.invalid"}, "/api/auth/registro/")).status_code, 200)
+
+    async def test_backend_caido_deja_pasar(self):
+        with mock.patch.object(MemoriaBackend, "consumir", side_effect=ConnectionError):
+            self.assertEqual((await self._post({"email": "ana@test.invalid"})).status_code, 200)
+        self.assertEqual(self.limiter.stats["errores"], 1)
@@ -2,12 +2,25 @@
 Clientes HTTP para comunicación interna entre Django y FastAPI.
 Usar httpx para no bloquear en async y tener timeout/retry sencillo.
 """
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
 import httpx
-from .config import get_django_internal_url, get_fastapi_internal_url
+from .config import (
+    get_django_internal_url,
+    get_fastapi_internal_url,
+    get_django_pool_max_connections,
+    get_django_pool_max_keepalive,
+    get_django_pool_keepalive_expiry,
+    get_django_http2,
+)
 
 # Timeout por defecto para llamadas internas
 INTERNAL_TIMEOUT = 10.0
 
+# Pool compartido FastAPI → Django (lo abre/cierra el lifespan de FastAPI)
+_django_async_pool: Optional[httpx.AsyncClient] = None
+
 
 def get_django_client() -> httpx.Client:
     """Cliente HTTP síncrono para llamar a Django (desde FastAPI sync o Django)."""
@@ -27,6 +40,97 @@ def get_django_async_client() -> httpx.AsyncClient:
     )
 
 
+def _django_pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=get_django_pool_max_connections(),
+        max_keepalive_connections=get_django_pool_max_keepalive(),
+        keepalive_expiry=get_django_pool_keepalive_expiry(),
+    )
+
+
+def _http2_disponible() -> bool:
+    """HTTP/2 solo si se pidió por config y el paquete h2 está instalado."""
+    if not get_django_http2():
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def open_django_async_pool(app=None) -> httpx.AsyncClient:
+    """
+    Crea el pool compartido hacia Django (idempotente). Llamar desde el lifespan.
+    Si se pasa `app` (Django ASGI en modo in-process), las llamadas no salen por socket.
+    """
+    global _django_async_pool
+    if _django_async_pool is None:
+        transport = httpx.ASGITransport(app=app) if app is not None else None
+        _django_async_pool = httpx.AsyncClient(
+            base_url=get_django_internal_url(),
+            timeout=INTERNAL_TIMEOUT,
+            headers={"User-Agent": "safelease-ai-internal"},
+            limits=_django_pool_limits(),
+            http2=_http2_disponible(),
+            transport=transport,
+        )
+    return _django_async_pool
+
+
+async def close_django_async_pool() -> None:
+    """Cierra el pool compartido (conexiones keep-alive incluidas)."""
+    global _django_async_pool
+    if _django_async_pool is not None:
+        pool, _django_async_pool = _django_async_pool, None
+        await pool.aclose()
+
+
+def get_django_async_pool() -> Optional[httpx.AsyncClient]:
+    """Pool compartido si el lifespan lo abrió; None en scripts o tests."""
+    return _django_async_pool
+
+
+@asynccontextmanager
+async def django_async_client() -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Cliente para llamar a Django: reutiliza el pool compartido si existe;
+    si no (scripts, tests sin lifespan), abre un cliente efímero y lo cierra al salir.
+    """
+    if _django_async_pool is not None:
+        yield _django_async_pool
+        return
+    async with get_django_async_client() as client:
+        yield client
+
+
+def django_pool_stats() -> dict:
+    """Ocupación del pool compartido: conexiones abiertas/ociosas y peticiones activas/en cola."""
+    limits = _django_pool_limits()
+    stats = {
+        "abierto": _django_async_pool is not None,
+        "max_connections": limits.max_connections,
+        "max_keepalive_connections": limits.max_keepalive_connections,
+        "keepalive_expiry": limits.keepalive_expiry,
+        "http2": _http2_disponible(),
+        "connections": 0,
+        "idle": 0,
+        "active_requests": 0,
+        "queued_requests": 0,
+    }
+    # httpcore no expone estas métricas públicamente; se leen de forma defensiva
+    pool = getattr(getattr(_django_async_pool, "_transport", None), "_pool", None)
+    if pool is None:
+        return stats
+    conexiones = list(getattr(pool, "connections", []))
+    stats["connections"] = len(conexiones)
+    stats["idle"] = sum(1 for c in conexiones if c.is_idle())
+    en_cola = [r.is_queued() for r in getattr(pool, "_requests", [])]
+    stats["active_requests"] = en_cola.count(False)
+    stats["queued_requests"] = en_cola.count(True)
+    return stats
+
+
 def get_fastapi_client() -> httpx.Client:
     """Cliente HTTP síncrono para llamar a FastAPI (desde Django)."""
     return httpx.Client(
@@ -44,9 +148,9 @@ def call_django_health() -> dict:
         return r.json()
 
 
-async def call_django_health_async() -> dict:
-    """Llamada de ejemplo: GET /api/health de Django. Asíncrono."""
-    async with get_django_async_client() as client:
-        r = await client.get("/api/health")
+async def call_django_health_async(timeout: Optional[float] = None) -> dict:
+    """Llamada de ejemplo: GET /api/health de Django. Asíncrono (usa el pool compartido)."""
+    async with django_async_client() as client:
+        r = await client.get("/api/health", timeout=timeout or INTERNAL_TIMEOUT)
         r.raise_for_status()
         return r.json()
@@ -2,6 +2,7 @@
 Configuración compartida: URLs internas de Django y FastAPI.
 Cargar .env antes de usar (Django/FastAPI ya lo hacen en su arranque).
 """
+import ipaddress
 import os
 from pathlib import Path
 
@@ -23,3 +24,73 @@ def get_django_internal_url() -> str:
 def get_fastapi_internal_url() -> str:
     """URL base de FastAPI para llamadas HTTP internas (desde Django u otros)."""
     return os.getenv("FASTAPI_INTERNAL_URL", "http://127.0.0.1:8001").rstrip("/")
+
+
+# --- Pool de conexiones FastAPI → Django ---
+
+def get_django_pool_max_connections() -> int:
+    """Máximo de conexiones simultáneas del pool hacia Django."""
+    return int(os.getenv("DJANGO_POOL_MAX_CONNECTIONS", "100"))
+
+
+def get_django_pool_max_keepalive() -> int:
+    """Máximo de conexiones ociosas (keep-alive) que conserva el pool."""
+    return int(os.getenv("DJANGO_POOL_MAX_KEEPALIVE", "20"))
+
+
+def get_django_pool_keepalive_expiry() -> float:
+    """Segundos que una conexión ociosa permanece abierta antes de cerrarse."""
+    return float(os.getenv("DJANGO_POOL_KEEPALIVE_EXPIRY", "30"))
+
+
+def get_django_http2() -> bool:
+    """Usar HTTP/2 hacia Django (requiere el paquete h2 y TLS/ALPN en Django)."""
+    return os.getenv("DJANGO_HTTP2", "0") == "1"
+
+
+# --- JWT (mismos valores que SIMPLE_JWT en Django) ---
+
+def get_jwt_signing_key() -> str:
+    """Clave de firma de los JWT; por defecto la SECRET_KEY de Django, como SimpleJWT."""
+    return os.getenv("JWT_SIGNING_KEY") or os.getenv("DJANGO_SECRET_KEY", "dev-only")
+
+
+def get_jwt_algorithm() -> str:
+    return os.getenv("JWT_ALGORITHM", "HS256")
+
+
+def get_jwt_leeway() -> int:
+    """Margen en segundos para exp/nbf (SIMPLE_JWT["LEEWAY"])."""
+    return int(os.getenv("JWT_LEEWAY", "0"))
+
+
+# --- Base de datos (FastAPI la usa solo para LISTEN/NOTIFY) ---
+
+def get_database_dsn() -> str:
+    """DSN de PostgreSQL construido con las mismas variables DB_* que Django."""
+    return (
+        f"host={os.getenv('DB_HOST', '127.0.0.1')} port={os.getenv('DB_PORT', '5432')} "
+        f"dbname={os.getenv('DB_NAME', 'safelease')} user={os.getenv('DB_USER', 'safelease')} "
+        f"password={os.getenv('DB_PASSWORD', 'safelease')}"
+    )
+
+
+def get_auth_cache_channel() -> str:
+    """Canal NOTIFY por el que Django avisa de cambios en usuario/perfil (payload: usuario_id)."""
+    return os.getenv("AUTH_CACHE_NOTIFY_CHANNEL", "auth_usuario_cambio")
+
+
+# --- /metrics (no es público: red permitida o token) ---
+
+def get_metrics_allowed_ips() -> list:
+    """Redes que leen /metrics sin token (METRICS_ALLOWED_IPS, CIDR separados por comas; por defecto loopback)."""
+    return [
+        ipaddress.ip_network(red.strip(), strict=False)
+        for red in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1/32,::1/128").split(",")
+        if red.strip()
+    ]
+
+
+def get_metrics_token() -> str:
+    """`Authorization: Bearer <METRICS_TOKEN>` abre /metrics desde cualquier IP; vacío = solo la red permitida."""
+    return os.getenv("METRICS_TOKEN", "")
@@ -102,7 +102,8 @@ export const authApi = {
   },
 
   async cambiarPassword(accessToken: string, password_actual: string, nueva_password: string, nueva_password_confirm: string) {
-    const r = await client.post<{ detail: string }>(
+    // Cierra las demás sesiones: devuelve tokens nuevos para esta
+    const r = await client.post<{ detail: string } & Partial<Tokens>>(
       "/auth/cambiar-password/",
       { password_actual, nueva_password, nueva_password_confirm },
       { headers: { Authorization: `Bearer ${accessToken}` } }
@@ -165,7 +166,7 @@ export const authApi = {
   },
 
   async activar2FA(accessToken: string, secret: string, codigo: string) {
-    const r = await client.post<{ detail: string; backup_codes: string[] }>(
+    const r = await client.post<{ detail: string; backup_codes: string[] } & Partial<Tokens>>(
       "/auth/2fa/activar/",
       { secret, codigo },
       { headers: { Authorization: `Bearer ${accessToken}` } }
@@ -174,7 +175,7 @@ export const authApi = {
   },
 
   async desactivar2FA(accessToken: string, codigo: string) {
-    const r = await client.post<{ detail: string }>("/auth/2fa/desactivar/", { codigo }, {
+    const r = await client.post<{ detail: string } & Partial<Tokens>>("/auth/2fa/desactivar/", { codigo }, {
       headers: { Authorization: `Bearer ${accessToken}` },
     });
     return r.data;
@@ -1,6 +1,6 @@
 import { useState } from "react";
 import { useAuth } from "../contexts/AuthContext";
-import { authApi } from "../api/auth";
+import { authApi, type Tokens } from "../api/auth";
 
 export default function ChangePassword() {
   const [password_actual, setPasswordActual] = useState("");
@@ -9,7 +9,7 @@ export default function ChangePassword() {
   const [error, setError] = useState("");
   const [success, setSuccess] = useState("");
   const [loading, setLoading] = useState(false);
-  const { getAccessToken } = useAuth();
+  const { getAccessToken, setTokens } = useAuth();
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -23,7 +23,8 @@ export default function ChangePassword() {
     setSuccess("");
     setLoading(true);
     try {
-      await authApi.cambiarPassword(token, password_actual, nueva_password, nueva_password_confirm);
+      const r = await authApi.cambiarPassword(token, password_actual, nueva_password, nueva_password_confirm);
+      if (r.access && r.refresh) setTokens(r as Tokens);
       setSuccess("Contraseña actualizada.");
       setPasswordActual("");
       setNuevaPassword("");
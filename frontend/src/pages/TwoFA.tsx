@@ -1,7 +1,7 @@
 import { useState, useEffect } from "react";
 import { QRCodeSVG } from "qrcode.react";
 import { useAuth } from "../contexts/AuthContext";
-import { authApi } from "../api/auth";
+import { authApi, type Tokens } from "../api/auth";
 
 const APPS_2FA = [
   { name: "Google Authenticator", url: "https://support.google.com/accounts/answer/1066447" },
@@ -11,7 +11,7 @@ const APPS_2FA = [
 ];
 
 export default function TwoFA() {
-  const { getAccessToken } = useAuth();
+  const { getAccessToken, setTokens } = useAuth();
   const [tiene2FA, setTiene2FA] = useState(false);
   const [setup, setSetup] = useState<{ secret: string; provisioning_uri: string } | null>(null);
   const [modalPaso, setModalPaso] = useState<1 | 2>(1);
@@ -56,6 +56,7 @@ export default function TwoFA() {
     try {
       const r = await authApi.activar2FA(token, setup.secret, codigo);
       setBackupCodes(r.backup_codes);
+      if (r.access && r.refresh) setTokens(r as Tokens);
       setTiene2FA(true);
       cerrarModal();
       setSuccess("2FA activado. Guarda los códigos de respaldo.");
@@ -72,7 +73,8 @@ export default function TwoFA() {
     setError("");
     setLoading(true);
     try {
-      await authApi.desactivar2FA(token, codigo);
+      const r = await authApi.desactivar2FA(token, codigo);
+      if (r.access && r.refresh) setTokens(r as Tokens);
       setTiene2FA(false);
       setCodigo("");
       setSuccess("2FA desactivado.");